@@ -1,5 +1,5 @@
 // src/pages/KeyVaultPage.js
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Table,
   TableBody,
@@ -173,6 +173,31 @@ const KeyVaultPage = () => {
     }
   }, [filters]);
 
+  // Live updates: the backend pushes KPI changes and changed objects
+  // (syncs, alert runs), so the page refetches only when something changed
+  const fetchKeyVaultDataRef = useRef(fetchKeyVaultData);
+  fetchKeyVaultDataRef.current = fetchKeyVaultData;
+
+  useEffect(() => {
+    const events = new EventSource(`${process.env.REACT_APP_API_BASE_URL}/api/events`);
+
+    events.addEventListener('kpi', (event) => {
+      const { summary } = JSON.parse(event.data);
+      setSystemStatus(prev => ({
+        ...prev,
+        totalSecrets: summary.total_secrets,
+        totalCertificates: summary.total_certificates,
+        expiring60Days: summary.expiring_60_days,
+        expiring30Days: summary.expiring_30_days,
+        emailsSentToday: summary.alerts_sent_today
+      }));
+    });
+    events.addEventListener('objects', () => fetchKeyVaultDataRef.current());
+    events.addEventListener('resync', () => fetchKeyVaultDataRef.current());
+
+    return () => events.close();
+  }, []);
+
   const handleManualRefresh = async () => {
     setLoading(true);
     try {
@@ -0,0 +1,306 @@
+# benchmarks/load_test.py
+"""
+HTTP load test of the API with latency SLO gates.
+
+Runs the FastAPI app in-process (httpx ASGITransport, no sockets) on the
+SQLite storage backend, with an in-memory stand-in for Key Vault and no
+email delivery. Concurrent simulated dashboard users replay a weighted mix
+of read routes while syncs and alert runs are triggered through the API
+in the background. Throughput and p50/p95/p99 are reported per route, for
+each concurrency level; the exit status is 1 if any SLO is exceeded.
+
+Client and server share one event loop, so latencies include the client's
+own (small) overhead: compare runs with each other rather than with
+production numbers.
+
+Usage (from kvs_backend/):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 10,50,200 --duration 20 \\
+        --mix objects=5,objects_filtered=2,kpi=3,history=1 \\
+        --slo objects:p95=150 --slo kpi:p99=100 --json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+SUBSCRIPTION_ID = "00000000-0000-0000-0000-000000000000"
+
+# name -> (method, path, JSON body); {vault} and {page} are filled per request
+ROUTES: Dict[str, Tuple[str, str, Optional[Dict[str, Any]]]] = {
+    "objects": ("GET", "/api/keyvault/objects?page={page}&page_size=50", None),
+    "objects_filtered": ("GET", "/api/keyvault/objects?vault_name=vault-{vault}&expiration_window=30", None),
+    "objects_search": ("GET", "/api/keyvault/objects?search_text=secret-1&object_type=Secret", None),
+    "kpi": ("GET", "/api/keyvault/kpi", None),
+    "history": ("GET", "/api/alerts/history?days=7", None),
+    "sync": ("POST", "/api/keyvault/sync", {"subscription_ids": None}),
+    "alerts": ("POST", "/api/alerts/send", {"object_names": None, "force_send": False}),
+}
+DEFAULT_MIX = "objects=6,objects_filtered=2,objects_search=1,kpi=3,history=1"
+# route:percentile=milliseconds
+DEFAULT_SLOS = ["objects:p95=250", "objects_filtered:p95=250", "kpi:p95=100", "history:p95=250"]
+
+
+class FakeKeyVaultClient:
+    """
+    In-memory KeyVaultClient: `vaults` vaults of `objects_per_vault`
+    objects (one in ten a certificate). Every sync sees `churn` of the
+    secrets with a new expiry so the diff, change feed and live updates
+    do real work.
+    """
+
+    def __init__(self, vaults: int, objects_per_vault: int, churn: float = 0.01, latency: float = 0.0):
+        self.vaults = vaults
+        self.objects_per_vault = objects_per_vault
+        self.churn = churn
+        self.latency = latency
+        self._round = 0
+
+    async def list_subscriptions(self) -> List[Dict[str, Any]]:
+        return [{"subscription_id": SUBSCRIPTION_ID, "display_name": "load-test", "state": "Enabled"}]
+
+    async def list_key_vaults(self, subscription_id: str) -> List[Dict[str, Any]]:
+        self._round += 1
+        return [
+            {"name": f"vault-{v}", "vault_uri": f"https://vault-{v}.vault.azure.net/",
+             "resource_group": "load-test", "location": "local", "subscription_id": subscription_id}
+            for v in range(self.vaults)
+        ]
+
+    async def get_secrets(self, vault_url: str, vault_name: str, subscription_id: str):
+        return await self._objects("Secret", vault_name, subscription_id)
+
+    async def get_certificates(self, vault_url: str, vault_name: str, subscription_id: str):
+        return await self._objects("Certificate", vault_name, subscription_id)
+
+    async def _objects(self, object_type: str, vault_name: str, subscription_id: str):
+        from src.models.records import KeyVaultObjectRecord
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        now = datetime.now(timezone.utc)
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        churned = int(self.objects_per_vault * self.churn)
+        records = []
+        for i in range(self.objects_per_vault):
+            if (i % 10 == 0) != (object_type == "Certificate"):
+                continue
+            days = i % 400 + (self._round if i < churned else 0)
+            properties = SimpleNamespace(
+                name=f"{object_type.lower()}-{i}",
+                expires_on=start + timedelta(days=days),
+                created_on=start - timedelta(days=30),
+                tags={"owner": f"owner{i % 50}@contoso.com"}
+            )
+            records.append(KeyVaultObjectRecord.from_properties(
+                properties, object_type, vault_name, subscription_id, now,
+                issuer="CN=Load Test CA" if object_type == "Certificate" else None
+            ))
+        return records
+
+
+class QuietEmailClient:
+    """EmailClient that accepts every alert without logging each one"""
+
+    async def send_alert_email(self, recipient: str, objects: List[Dict[str, Any]],
+                               template_type: str = "expiration_alert") -> bool:
+        return True
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile in milliseconds"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))] * 1000
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route '{name}' (choose from {', '.join(ROUTES)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def parse_slos(slos: List[str]) -> List[Tuple[str, float, float]]:
+    """route:pNN=ms -> (route, NN, ms)"""
+    parsed = []
+    for slo in slos:
+        route, _, rest = slo.partition(":")
+        percentile, _, threshold = rest.partition("=")
+        if route not in ROUTES or not percentile.startswith("p") or not threshold:
+            raise ValueError(f"Invalid SLO '{slo}', expected route:p95=250")
+        parsed.append((route, float(percentile[1:]), float(threshold)))
+    return parsed
+
+
+async def _request(client, route: str, stats: Dict[str, RouteStats], vaults: int) -> None:
+    method, path, body = ROUTES[route]
+    path = path.format(vault=random.randrange(vaults), page=random.randint(1, 5))
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, json=body)
+        ok = response.status_code < 400
+    except Exception:
+        ok = False
+    elapsed = time.perf_counter() - start
+    route_stats = stats.setdefault(route, RouteStats())
+    route_stats.latencies.append(elapsed)
+    if not ok:
+        route_stats.errors += 1
+
+
+async def _user(client, weights: Dict[str, float], stats, deadline: float, think_time: float, vaults: int) -> None:
+    names, route_weights = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        await _request(client, random.choices(names, route_weights)[0], stats, vaults)
+        if think_time:
+            await asyncio.sleep(random.uniform(0, 2 * think_time))
+
+
+async def _trigger(client, route: str, interval: float, stats, deadline: float, vaults: int) -> None:
+    """Fire a pipeline every `interval` seconds (never overlapping itself)"""
+    while True:
+        await asyncio.sleep(interval)
+        if time.perf_counter() >= deadline:
+            return
+        await _request(client, route, stats, vaults)
+
+
+async def run_stage(client, args, weights: Dict[str, float], concurrency: int) -> Tuple[Dict[str, RouteStats], float]:
+    stats: Dict[str, RouteStats] = {}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    tasks = [_user(client, weights, stats, deadline, args.think_time, args.vaults) for _ in range(concurrency)]
+    if args.sync_interval:
+        tasks.append(_trigger(client, "sync", args.sync_interval, stats, deadline, args.vaults))
+    if args.alert_interval:
+        tasks.append(_trigger(client, "alerts", args.alert_interval, stats, deadline, args.vaults))
+    await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - started
+
+
+def report(concurrency: int, stats: Dict[str, RouteStats], elapsed: float,
+           slos: List[Tuple[str, float, float]]) -> Tuple[Dict[str, Any], List[str]]:
+    print(f"\nconcurrency {concurrency}, {elapsed:.1f}s")
+    print(f"{'route':<18}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    routes = {}
+    for route, route_stats in sorted(stats.items()):
+        row = {
+            "requests": len(route_stats.latencies),
+            "errors": route_stats.errors,
+            "rps": len(route_stats.latencies) / elapsed,
+            "p50_ms": route_stats.percentile(50),
+            "p95_ms": route_stats.percentile(95),
+            "p99_ms": route_stats.percentile(99),
+            "max_ms": route_stats.percentile(100),
+        }
+        routes[route] = row
+        print(f"{route:<18}{row['requests']:>9}{row['errors']:>8}{row['rps']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}")
+
+    violations = []
+    for route, percentile, threshold in slos:
+        if route not in stats:
+            continue
+        observed = stats[route].percentile(percentile)
+        if observed > threshold:
+            violations.append(f"{route} p{percentile:g} {observed:.1f}ms > {threshold:g}ms")
+    for route, route_stats in stats.items():
+        if route_stats.errors:
+            violations.append(f"{route}: {route_stats.errors} failed requests")
+    for violation in violations:
+        print(f"SLO FAILED: {violation}")
+    return {"concurrency": concurrency, "elapsed_s": elapsed, "routes": routes, "violations": violations}, violations
+
+
+async def run(args) -> int:
+    # Settings are read at import time, so configure before importing the app
+    workdir = tempfile.mkdtemp(prefix="kvs-load-")
+    os.environ.update({
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "inventory.sqlite"),
+        "SCHEDULER_ENABLED": "false",
+        "LEADER_LEASE": "none",
+        "SYNC_MODE": "single",
+        "FAST_START": "true",
+    })
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    import httpx
+    from src import main, dependencies
+
+    logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
+    await main.startup_event()
+    # SQLite without scheduled syncs needs no Azure token: warm-up only opens the file
+    await dependencies.warm_up_task
+    if not dependencies.is_ready():
+        raise RuntimeError(f"App not ready after warm-up: {dependencies.readiness}")
+    kv_client = FakeKeyVaultClient(args.vaults, args.objects_per_vault, args.churn, args.kv_latency)
+    dependencies.keyvault_client = dependencies.keyvault_service.kv_client = kv_client
+    dependencies.email_client = dependencies.alert_service.email_client = QuietEmailClient()
+
+    weights = parse_mix(args.mix)
+    slos = parse_slos(args.slo or DEFAULT_SLOS)
+    results, failed = [], False
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            seeded = time.perf_counter()
+            await dependencies.keyvault_service.sync_inventory()
+            await dependencies.alert_service.process_alerts()
+            print(f"Seeded {args.vaults * args.objects_per_vault} objects in {time.perf_counter() - seeded:.1f}s")
+
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                stats, elapsed = await run_stage(client, args, weights, concurrency)
+                result, violations = report(concurrency, stats, elapsed, slos)
+                results.append(result)
+                failed = failed or bool(violations)
+    finally:
+        await main.shutdown_event()
+
+    passing = [r["concurrency"] for r in results if not r["violations"]]
+    print(f"\nHighest concurrency within SLOs: {max(passing) if passing else 'none'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"slos": args.slo or DEFAULT_SLOS, "stages": results}, f, indent=2)
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", default="10,50,100", help="Simulated users, one stage per comma-separated level")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per stage")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted read routes, e.g. objects=6,kpi=3")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds a user waits between requests")
+    parser.add_argument("--sync-interval", type=float, default=5.0, help="Seconds between syncs (0 disables)")
+    parser.add_argument("--alert-interval", type=float, default=5.0, help="Seconds between alert runs (0 disables)")
+    parser.add_argument("--slo", action="append", help=f"route:pNN=ms, repeatable (default: {' '.join(DEFAULT_SLOS)})")
+    parser.add_argument("--vaults", type=int, default=20)
+    parser.add_argument("--objects-per-vault", type=int, default=500)
+    parser.add_argument("--churn", type=float, default=0.01, help="Fraction of secrets changed per sync")
+    parser.add_argument("--kv-latency", type=float, default=0.0, help="Simulated seconds per Key Vault list call")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/record_memory.py
+"""
+Compare retained per-object memory of the dict-based pipeline representation
+(KeyVaultObjectEntity built from a Key Vault properties dict) with KeyVaultObjectRecord.
+
+Usage (from kvs_backend/): python -m benchmarks.record_memory [object_count]
+"""
+
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.models.entities import KeyVaultObjectEntity
+from src.models.records import KeyVaultObjectRecord
+
+VAULTS = 50
+OWNERS = 200
+
+
+def _properties(i: int, now: datetime) -> SimpleNamespace:
+    return SimpleNamespace(
+        name=f"secret-{i}",
+        expires_on=now + timedelta(days=i % 400),
+        created_on=now - timedelta(days=30),
+        updated_on=now,
+        enabled=True,
+        # Fresh strings per object, as the SDK deserializes them
+        tags={"owner": f"owner{i % OWNERS}@contoso.com".lower(), "env": "prod".lower()}
+    )
+
+
+def build_dicts(count: int, now: datetime) -> list:
+    entities = []
+    for i in range(count):
+        props = _properties(i, now)
+        obj_data = {
+            "object_name": props.name,
+            "object_type": "Secret",
+            "expiration_date": props.expires_on,
+            "created_date": props.created_on,
+            "updated_date": props.updated_on,
+            "enabled": props.enabled,
+            "tags": props.tags or {}
+        }
+        vault_name = f"vault-{i % VAULTS}".lower()
+        entities.append(KeyVaultObjectEntity(
+            PartitionKey=vault_name,
+            RowKey=f"{obj_data['object_name']}_{obj_data['object_type']}",
+            object_name=obj_data["object_name"],
+            object_type=obj_data["object_type"],
+            vault_name=vault_name,
+            subscription_id="00000000-0000-0000-0000-000000000000".lower(),
+            expiration_date=obj_data["expiration_date"],
+            days_remaining=(obj_data["expiration_date"] - now).days,
+            owner=obj_data["tags"].get("owner"),
+            distribution_email=None,
+            issuer=None,
+            thumbprint=None,
+            created_at=obj_data["created_date"],
+            updated_at=now
+        ))
+    return entities
+
+
+def build_records(count: int, now: datetime) -> list:
+    return [
+        KeyVaultObjectRecord.from_properties(
+            _properties(i, now), "Secret", f"vault-{i % VAULTS}".lower(),
+            "00000000-0000-0000-0000-000000000000".lower(), now
+        )
+        for i in range(count)
+    ]
+
+
+def measure(builder, count: int) -> float:
+    now = datetime.now(timezone.utc)
+    tracemalloc.start()
+    objects = builder(count, now)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / count
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dict_bytes = measure(build_dicts, count)
+    record_bytes = measure(build_records, count)
+    print(f"objects:           {count}")
+    print(f"dict pipeline:     {dict_bytes:8.0f} bytes/object")
+    print(f"slotted records:   {record_bytes:8.0f} bytes/object")
+    print(f"reduction:         {100 * (1 - record_bytes / dict_bytes):8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
 # main_uvicorn.py
+import os
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Several workers share the snapshot file and elect a leader for
+    # scheduled jobs; set PROMETHEUS_MULTIPROC_DIR to aggregate /metrics.
+    # Auto-reload is a development feature and only works with one worker.
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    reload = workers == 1 and os.getenv("RELOAD", "true").lower() == "true"
+    uvicorn.run("src.main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")), reload=reload, workers=workers)
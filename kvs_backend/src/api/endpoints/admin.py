@@ -0,0 +1,29 @@
+# src/api/endpoints/admin.py
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import PlainTextResponse
+import logging
+
+from src import profiling
+from src.profiling import require_admin_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)]
+)
+
+@router.get("/profiles/{pipeline}", response_class=PlainTextResponse)
+async def get_pipeline_profile(pipeline: str, reset: bool = False):
+    """
+    Aggregated stack samples for a pipeline ("sync" or "alerts")
+    in collapsed-stack format, ready for flamegraph.pl or speedscope
+    """
+    sampler = profiling.pipeline_sampler
+    if sampler is None:
+        raise HTTPException(status_code=404, detail="Continuous sampling is disabled (set PROFILE_SAMPLING_HZ)")
+    data = sampler.collapsed(pipeline)
+    if reset:
+        sampler.reset(pipeline)
+    return data
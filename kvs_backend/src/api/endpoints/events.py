@@ -0,0 +1,45 @@
+# src/api/endpoints/events.py
+import asyncio
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.services.live_updates import LiveUpdates, sse_frame
+from src.dependencies import get_live_updates
+
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api", tags=["events"])
+
+
+@router.get("/events")
+async def live_events(
+    last_event_id: Optional[str] = Header(None),
+    live_updates: LiveUpdates = Depends(get_live_updates)
+):
+    """
+    Server-Sent Events stream of inventory updates, replacing polling:
+    kpi (on connect and whenever it changes), objects (changes from
+    syncs and alert runs) and resync (refetch everything).
+    Browsers reconnect with Last-Event-ID and get what they missed.
+    """
+    if live_updates is None:
+        raise HTTPException(status_code=503, detail="Live updates are not available")
+    queue = live_updates.broker.connect()
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Too many live update clients")
+    try:
+        initial = await asyncio.to_thread(live_updates.replay, last_event_id)
+        summary = await live_updates.kpi_summary()
+        initial.insert(0, sse_frame("kpi", {"summary": summary, "delta": {}}))
+    except Exception as e:
+        live_updates.broker.disconnect(queue)
+        logger.error(f"Live events subscription failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Live events failed: {str(e)}")
+
+    return StreamingResponse(
+        live_updates.broker.stream(queue, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
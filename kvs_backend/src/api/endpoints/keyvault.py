@@ -1,20 +1,26 @@
 
 # src/api/endpoints/keyvault.py
 from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, HTTPException, Query, Depends
+from functools import lru_cache
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic.networks import validate_email
 import logging
 
 from src.services.keyvault_service import KeyVaultService
-from src.clients.table_client import AzureTableClient
+from src.clients.storage_backend import StorageBackend
 from src.models.schemas import (
     ManualSyncRequest,
     PaginatedResponse,
     KPISummaryResponse,
     KeyVaultObjectResponse,
     ExpirationWindow,
+    ExportFormat,
     ObjectType,
     QueryFilters
 )
+from src.models.records import KeyVaultObjectRecord
+from src.services import export_service
 from src.dependencies import get_table_client, get_keyvault_service
 
 
@@ -22,6 +28,38 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/keyvault", tags=["keyvault"])
 
 
+@lru_cache(maxsize=4096)
+def _normalize_email(value: str) -> str:
+    """EmailStr validation and normalization, cached: owners repeat across rows"""
+    return validate_email(value)[1]
+
+
+def to_object_response(record: KeyVaultObjectRecord) -> KeyVaultObjectResponse:
+    """
+    Response model for a stored record without full revalidation. Gives the
+    same values as validating KeyVaultObjectResponse and, like validation,
+    raises ValueError for a row that does not fit the model.
+    """
+    if record.created_at is None or record.updated_at is None:
+        raise ValueError(f"{record.vault_name}/{record.row_key} has no created_at/updated_at")
+    return KeyVaultObjectResponse.model_construct(
+        object_name=record.object_name,
+        object_type=ObjectType(record.object_type),
+        vault_name=record.vault_name,
+        subscription_id=record.subscription_id,
+        expiration_date=record.expiration_date,
+        days_remaining=record.days_remaining,
+        owner=_normalize_email(record.owner) if record.owner is not None else None,
+        distribution_email=(
+            _normalize_email(record.distribution_email) if record.distribution_email is not None else None
+        ),
+        issuer=record.issuer,
+        thumbprint=record.thumbprint,
+        created_at=record.created_at,
+        updated_at=record.updated_at
+    )
+
+
 @router.post("/sync", response_model=Dict[str, Any])
 async def sync_inventory(
     request: ManualSyncRequest,
@@ -40,7 +78,8 @@ async def sync_inventory(
         logger.error(f"Sync inventory failed: {e}")
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
-@router.get("/objects", response_model=PaginatedResponse)
+# Serialized by the handler itself; responses= keeps the schema in OpenAPI
+@router.get("/objects", response_class=JSONResponse, responses={200: {"model": PaginatedResponse}})
 async def query_objects(
     # Pipeline ③: Query parameters
     expiration_window: Optional[ExpirationWindow] = Query(None, description="Filter by expiration window"),
@@ -48,9 +87,11 @@ async def query_objects(
     vault_name: Optional[str] = Query(None, description="Filter by vault name"),
     search_text: Optional[str] = Query(None, description="Free text search in object names"),
     object_type: Optional[ObjectType] = Query(None, description="Filter by object type"),
+    object_name: Optional[str] = Query(None, description="Exact object name"),
+    name_prefix: Optional[str] = Query(None, description="Object name prefix"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=200, description="Page size"),
-    table_client: AzureTableClient = Depends(get_table_client)
+    table_client: StorageBackend = Depends(get_table_client)
 ):
     """
     Pipeline ③: Query Key Vault objects with filters and pagination
@@ -61,45 +102,70 @@ async def query_objects(
             owner=owner,
             vault_name=vault_name,
             search_text=search_text,
-            object_type=object_type
+            object_type=object_type,
+            object_name=object_name,
+            name_prefix=name_prefix
         )
         
         result = await table_client.query_entities(filters, page, page_size)
         
-        # Convert entities to response models
-        items = [
-            KeyVaultObjectResponse(
-                object_name=entity.get("object_name"),
-                object_type=entity.get("object_type"),
-                vault_name=entity.get("vault_name"),
-                subscription_id=entity.get("subscription_id"),
-                expiration_date=entity.get("expiration_date"),
-                days_remaining=entity.get("days_remaining"),
-                owner=entity.get("owner"),
-                distribution_email=entity.get("distribution_email"),
-                issuer=entity.get("issuer"),
-                thumbprint=entity.get("thumbprint"),
-                created_at=entity.get("created_at"),
-                updated_at=entity.get("updated_at")
-            )
-            for entity in result["entities"]
-        ]
+        # Records come from our own store, so build response models without
+        # revalidating them and dump the whole page in one pydantic-core pass
+        # An invalid row fails the page, as validating the response model did
+        items = [to_object_response(record) for record in result["records"]]
         
-        return PaginatedResponse(
+        response = PaginatedResponse.model_construct(
             items=items,
             total_count=result["total_count"],
             page=result["page"],
             page_size=result["page_size"],
             has_next=result["has_next"]
         )
+        return Response(content=response.model_dump_json(), media_type="application/json")
         
     except Exception as e:
         logger.error(f"Query objects failed: {e}")
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
+@router.get("/export")
+async def export_objects(
+    fmt: ExportFormat = Query(ExportFormat.NDJSON, alias="format", description="Export file format"),
+    expiration_window: Optional[ExpirationWindow] = Query(None, description="Filter by expiration window"),
+    owner: Optional[str] = Query(None, description="Filter by owner email"),
+    vault_name: Optional[str] = Query(None, description="Filter by vault name"),
+    search_text: Optional[str] = Query(None, description="Free text search in object names"),
+    object_type: Optional[ObjectType] = Query(None, description="Filter by object type"),
+    object_name: Optional[str] = Query(None, description="Exact object name"),
+    name_prefix: Optional[str] = Query(None, description="Object name prefix"),
+    table_client: StorageBackend = Depends(get_table_client)
+):
+    """
+    Stream every object matching the filters as NDJSON, CSV or Parquet.
+    Storage pages are written to the response as they arrive, so memory
+    stays flat and the table is scanned once per export.
+    """
+    if fmt == ExportFormat.PARQUET and not export_service.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    filters = QueryFilters(
+        expiration_window=expiration_window,
+        owner=owner,
+        vault_name=vault_name,
+        search_text=search_text,
+        object_type=object_type,
+        object_name=object_name,
+        name_prefix=name_prefix
+    )
+    pages = table_client.iter_record_pages(filters)
+    return StreamingResponse(
+        export_service.WRITERS[fmt](pages),
+        media_type=export_service.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="keyvault-objects.{fmt.value}"'}
+    )
+
 @router.get("/kpi", response_model=KPISummaryResponse)
 async def get_kpi_summary(
-    table_client: AzureTableClient = Depends(get_table_client)
+    table_client: StorageBackend = Depends(get_table_client)
 ):
     """
     Pipeline ④: Get KPI Summary / Health Overview
@@ -0,0 +1,49 @@
+# src/clients/credential.py
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MANAGEMENT_SCOPE = "https://management.azure.com/.default"
+
+
+class LazyCredential:
+    """
+    Token credential that imports azure.identity and builds the real
+    credential on first use, so startup does not wait for the Azure CLI.
+    Anything other than get_token is delegated to the real credential.
+    """
+
+    def __init__(self, kind: str = "cli"):
+        self.kind = kind
+        self._credential = None
+        self._lock = threading.Lock()
+
+    @property
+    def credential(self):
+        if self._credential is None:
+            with self._lock:
+                if self._credential is None:
+                    if self.kind == "default":
+                        from azure.identity import DefaultAzureCredential
+                        self._credential = DefaultAzureCredential()
+                    else:
+                        from azure.identity import AzureCliCredential
+                        self._credential = AzureCliCredential()
+        return self._credential
+
+    def get_token(self, *scopes, **kwargs):
+        return self.credential.get_token(*scopes, **kwargs)
+
+    def warm_up(self):
+        """Acquire a management token so the first Azure call does not pay for it"""
+        token = self.credential.get_token(MANAGEMENT_SCOPE)
+        logger.info(f"[TOKEN ACQUIRED] Expires at {token.expires_on}")
+        return token
+
+    def __getattr__(self, name):
+        # Only reached for attributes not defined above (e.g. get_token_info, close)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.credential, name)
@@ -3,6 +3,8 @@
 from typing import List, Dict, Any
 import logging
 
+from src.metrics import instrumented
+
 logger = logging.getLogger(__name__)
 
 class EmailClient:
@@ -11,6 +13,7 @@ class EmailClient:
         self.smtp_port = smtp_port
         # TODO: Initialize email client (SMTP, SendGrid, etc.)
         
+    @instrumented("email")
     async def send_alert_email(self, 
                              recipient: str,
                              objects: List[Dict[str, Any]],
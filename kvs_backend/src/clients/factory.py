@@ -0,0 +1,21 @@
+# src/clients/factory.py
+
+import os
+
+from src.clients.storage_backend import StorageBackend
+from src.clients.table_client import AzureTableClient
+from src.clients.sqlite_client import SqliteTableClient
+from src.clients.snapshot_store import InventorySnapshot
+
+
+def create_storage_backend(credential) -> StorageBackend:
+    """Storage selected by STORAGE_BACKEND: azure (Table Storage) or sqlite"""
+    if os.getenv("STORAGE_BACKEND", "azure").lower() == "sqlite":
+        return SqliteTableClient(os.getenv("SQLITE_PATH", "data/inventory.sqlite"))
+    snapshot_path = os.getenv("SNAPSHOT_PATH", "data/inventory_snapshot.sqlite")
+    return AzureTableClient(
+        credential=credential,
+        table_name=os.getenv("TABLE_NAME", "keyvaultobjects"),
+        snapshot=InventorySnapshot(snapshot_path) if snapshot_path else None,
+        alert_log_table_name=os.getenv("ALERT_LOG_TABLE_NAME", "alertlog")
+    )
@@ -1,19 +1,29 @@
 # src/clients/keyvault_client.py
 
-from azure.keyvault.secrets import SecretClient
-from azure.keyvault.certificates import CertificateClient
-from azure.mgmt.keyvault import KeyVaultManagementClient
-from azure.mgmt.resource import SubscriptionClient
 from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
 import logging
 
+from src.metrics import instrumented, track_call
+from src.models.records import KeyVaultObjectRecord
+
 logger = logging.getLogger(__name__)
 
 class KeyVaultClient:
+    # Azure SDK modules are imported on first use to keep startup fast
+
     def __init__(self, credential):
         self.credential = credential
-        self.subscription_client = SubscriptionClient(self.credential)
+        self._subscription_client = None
+
+    @property
+    def subscription_client(self):
+        if self._subscription_client is None:
+            from azure.mgmt.resource import SubscriptionClient
+            self._subscription_client = SubscriptionClient(self.credential)
+        return self._subscription_client
         
+    @instrumented("keyvault")
     async def list_subscriptions(self) -> List[Dict[str, Any]]:
         """List all available Azure subscriptions"""
         try:
@@ -29,9 +39,11 @@ class KeyVaultClient:
             logger.error(f"Failed to list subscriptions: {e}")
             raise
 
+    @instrumented("keyvault")
     async def list_key_vaults(self, subscription_id: str) -> List[Dict[str, Any]]:
         """List all Key Vaults in a subscription"""
         try:
+            from azure.mgmt.keyvault import KeyVaultManagementClient
             kv_client = KeyVaultManagementClient(self.credential, subscription_id)
             vaults = []
             
@@ -48,54 +60,43 @@ class KeyVaultClient:
             logger.error(f"Failed to list Key Vaults for subscription {subscription_id}: {e}")
             raise
 
-    async def get_secrets(self, vault_url: str) -> List[Dict[str, Any]]:
+    @instrumented("keyvault")
+    async def get_secrets(self, vault_url: str, vault_name: str, subscription_id: str) -> List[KeyVaultObjectRecord]:
         """Get all secrets from a Key Vault"""
         try:
+            from azure.keyvault.secrets import SecretClient
             client = SecretClient(vault_url=vault_url, credential=self.credential)
-            secrets = []
-            
-            for secret_properties in client.list_properties_of_secrets():
-                secret_data = {
-                    "object_name": secret_properties.name,
-                    "object_type": "Secret",
-                    "expiration_date": secret_properties.expires_on,
-                    "created_date": secret_properties.created_on,
-                    "updated_date": secret_properties.updated_on,
-                    "enabled": secret_properties.enabled,
-                    "tags": secret_properties.tags or {}
-                }
-                secrets.append(secret_data)
-                
-            return secrets
+            now = datetime.now(timezone.utc)
+
+            return [
+                KeyVaultObjectRecord.from_properties(secret_properties, "Secret", vault_name, subscription_id, now)
+                for secret_properties in client.list_properties_of_secrets()
+            ]
         except Exception as e:
             logger.error(f"Failed to get secrets from {vault_url}: {e}")
             raise
 
-    async def get_certificates(self, vault_url: str) -> List[Dict[str, Any]]:
+    @instrumented("keyvault")
+    async def get_certificates(self, vault_url: str, vault_name: str, subscription_id: str) -> List[KeyVaultObjectRecord]:
         """Get all certificates from a Key Vault"""
         try:
+            from azure.keyvault.certificates import CertificateClient
             client = CertificateClient(vault_url=vault_url, credential=self.credential)
+            now = datetime.now(timezone.utc)
             certificates = []
             
             for cert_properties in client.list_properties_of_certificates():
                 # Get certificate details
-                certificate = client.get_certificate(cert_properties.name)
+                with track_call("keyvault", "get_certificate"):
+                    certificate = client.get_certificate(cert_properties.name)
                 
-                cert_data = {
-                    "object_name": cert_properties.name,
-                    "object_type": "Certificate",
-                    "expiration_date": cert_properties.expires_on,
-                    "created_date": cert_properties.created_on,
-                    "updated_date": cert_properties.updated_on,
-                    "enabled": cert_properties.enabled,
-                    "tags": cert_properties.tags or {},
-                    "issuer": certificate.policy.issuer_name if certificate.policy else None,
-                    "thumbprint": cert_properties.x509_thumbprint.hex() if cert_properties.x509_thumbprint else None
-                }
-                certificates.append(cert_data)
+                certificates.append(KeyVaultObjectRecord.from_properties(
+                    cert_properties, "Certificate", vault_name, subscription_id, now,
+                    issuer=certificate.policy.issuer_name if certificate.policy else None,
+                    thumbprint=cert_properties.x509_thumbprint.hex() if cert_properties.x509_thumbprint else None
+                ))
                 
             return certificates
         except Exception as e:
             logger.error(f"Failed to get certificates from {vault_url}: {e}")
             raise
-
@@ -0,0 +1,135 @@
+# src/clients/query_planner.py
+
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from src.models.records import KeyVaultObjectRecord, alert_log_day
+from src.models.schemas import ObjectType, QueryFilters
+
+# $select projections: each caller downloads only the properties it reads
+KPI_COLUMNS = ["object_type", "expiration_date", "last_alert_sent"]
+DIFF_COLUMNS = [
+    "PartitionKey", "object_name", "object_type", "subscription_id", "expiration_date",
+    "days_remaining", "owner", "distribution_email", "issuer", "thumbprint"
+]
+# What alert runs evaluate, email and log; timestamps are written back from full reads
+ALERT_COLUMNS = [
+    "PartitionKey", "object_name", "object_type", "expiration_date", "owner",
+    "distribution_email", "issuer", "thumbprint", "last_alert_sent"
+]
+
+
+def odata_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def odata_datetime(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return f"datetime'{value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')}'"
+
+
+def prefix_range(prefix: str) -> Tuple[str, Optional[str]]:
+    """
+    [low, high) bounds of the strings starting with prefix. Trailing
+    U+10FFFF can't be incremented: the character before them is. high is
+    None (no upper bound) when the prefix is only U+10FFFF characters.
+    """
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return prefix, None
+    return prefix, stem[:-1] + chr(ord(stem[-1]) + 1)
+
+
+def _prefix_condition(column: str, prefix: str) -> str:
+    low, high = prefix_range(prefix)
+    condition = f"{column} ge {odata_string(low)}"
+    return condition if high is None else f"{condition} and {column} lt {odata_string(high)}"
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    How a QueryFilters is executed against Table Storage:
+    point    - get_entity on known (PartitionKey, RowKey) pairs
+    range    - RowKey equality or prefix range within one partition
+    partition - every entity of one partition
+    scan     - the whole table; RowKey conditions without a PartitionKey
+               still read every partition, so they stay scans
+    `filter` holds the full OData filter (unused by point reads).
+    """
+    kind: str
+    filter: str
+    select: Optional[List[str]] = None
+    keys: Tuple[Tuple[str, str], ...] = ()
+
+
+def plan_query(filters: Optional[QueryFilters], select: Optional[List[str]] = None) -> QueryPlan:
+    """Choose the narrowest key access for the filters and push the projection down"""
+    if not filters:
+        return QueryPlan("scan", "", select)
+
+    conditions = []
+    kind = "scan"
+
+    if filters.vault_name:
+        conditions.append(f"PartitionKey eq {odata_string(filters.vault_name)}")
+        kind = "partition"
+
+    if filters.object_name:
+        # RowKey is "<object_name>_<object_type>"
+        types = [filters.object_type] if filters.object_type else list(ObjectType)
+        row_keys = [KeyVaultObjectRecord.make_row_key(filters.object_name, t.value) for t in types]
+        residual = filters.expiration_window or filters.owner or filters.search_text or filters.name_prefix
+        if filters.vault_name and not residual:
+            return QueryPlan("point", "", select, tuple((filters.vault_name, rk) for rk in row_keys))
+        conditions.append("(" + " or ".join(f"RowKey eq {odata_string(rk)}" for rk in row_keys) + ")")
+    elif filters.name_prefix:
+        conditions.append(_prefix_condition("RowKey", filters.name_prefix))
+
+    if filters.vault_name and (filters.object_name or filters.name_prefix):
+        kind = "range"
+
+    if filters.name_prefix:
+        # RowKey bounds can over-match names sharing the "_<type>" suffix
+        conditions.append(_prefix_condition("object_name", filters.name_prefix))
+
+    if filters.expiration_window:
+        cutoff_date = datetime.now(timezone.utc) + timedelta(days=int(filters.expiration_window.value))
+        conditions.append(f"expiration_date le {odata_datetime(cutoff_date)}")
+
+    if filters.owner:
+        conditions.append(f"owner eq {odata_string(filters.owner)}")
+
+    if filters.object_type:
+        conditions.append(f"object_type eq {odata_string(filters.object_type.value)}")
+
+    if filters.search_text:
+        # Substring search for object name
+        conditions.append(f"contains(object_name, {odata_string(filters.search_text)})")
+
+    return QueryPlan(kind, " and ".join(conditions), select)
+
+
+def plan_alert_log(since: datetime,
+                   until: Optional[datetime] = None,
+                   recipient: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    (partition, filter) per UTC day of the alert log from `since` to
+    `until`: reads touch only the days in the look-back window.
+    """
+    since = since.astimezone(timezone.utc)
+    until = (until or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    recipient_filter = f" and recipient eq {odata_string(recipient)}" if recipient else ""
+    plans = []
+    day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= until:
+        query_filter = f"PartitionKey eq {odata_string(alert_log_day(day))}"
+        if day < since:
+            # Row keys start with the time of day
+            query_filter += f" and RowKey ge {odata_string(since.strftime('%H%M%S%f'))}"
+        plans.append((alert_log_day(day), query_filter + recipient_filter))
+        day += timedelta(days=1)
+    return plans
@@ -0,0 +1,434 @@
+# src/clients/snapshot_store.py
+
+import os
+import sys
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.models.records import AlertLogEntry, KeyVaultObjectRecord, alert_log_day
+from src.models.schemas import QueryFilters
+from src.clients.query_planner import prefix_range
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+# Older versions the current SCHEMA upgrades in place (it only adds tables)
+UPGRADABLE_VERSIONS = (0, 1)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Column order shared by inserts and selects; datetimes are stored as
+# integer microseconds since the epoch so they round-trip exactly
+COLUMNS = (
+    "vault_name", "row_key", "object_name", "object_type", "subscription_id",
+    "expiration_date", "days_remaining", "owner", "distribution_email",
+    "issuer", "thumbprint", "created_at", "updated_at", "last_alert_sent"
+)
+
+ALERT_LOG_COLUMNS = (
+    "day", "row_key", "sent_at", "recipient", "vault_name", "object_name",
+    "object_type", "days_remaining", "expiration_date"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS objects (
+    vault_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    object_name TEXT NOT NULL,
+    object_type TEXT NOT NULL,
+    subscription_id TEXT,
+    expiration_date INTEGER,
+    days_remaining INTEGER,
+    owner TEXT,
+    distribution_email TEXT,
+    issuer TEXT,
+    thumbprint TEXT,
+    created_at INTEGER,
+    updated_at INTEGER,
+    last_alert_sent INTEGER,
+    PRIMARY KEY (vault_name, row_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_objects_expiration ON objects (expiration_date);
+CREATE INDEX IF NOT EXISTS ix_objects_owner ON objects (owner);
+CREATE INDEX IF NOT EXISTS ix_objects_type ON objects (object_type);
+CREATE INDEX IF NOT EXISTS ix_objects_alert ON objects (last_alert_sent);
+CREATE TABLE IF NOT EXISTS alert_log (
+    day TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    sent_at INTEGER NOT NULL,
+    recipient TEXT NOT NULL,
+    vault_name TEXT NOT NULL,
+    object_name TEXT NOT NULL,
+    object_type TEXT NOT NULL,
+    days_remaining INTEGER,
+    expiration_date INTEGER,
+    PRIMARY KEY (day, row_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    vault_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    changed_at INTEGER NOT NULL
+);
+"""
+
+# Merge semantics matching Table Storage upsert_merge: an unset
+# last_alert_sent never clears the stored one
+UPSERT_SQL = f"""
+INSERT INTO objects ({", ".join(COLUMNS)})
+VALUES ({", ".join("?" for _ in COLUMNS)})
+ON CONFLICT (vault_name, row_key) DO UPDATE SET
+{", ".join(f"{c} = excluded.{c}" for c in COLUMNS[2:] if c != "last_alert_sent")},
+last_alert_sent = COALESCE(excluded.last_alert_sent, objects.last_alert_sent)
+"""
+# Reconcile: rows written through since the scan started are newer than its pages
+RECONCILE_SQL = UPSERT_SQL + "WHERE objects.updated_at IS NULL OR objects.updated_at < ?\n"
+# Sync generation, bumped in the transaction holding a sync's last write-through
+NEXT_GENERATION_SQL = (
+    "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+    "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+)
+SET_META_SQL = (
+    "INSERT INTO meta (key, value) VALUES (?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+)
+
+
+def _to_us(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def _from_us(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else EPOCH + timedelta(microseconds=value)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _to_row(record: KeyVaultObjectRecord, updated_at: Optional[int] = None) -> Tuple:
+    return (
+        record.vault_name, record.row_key, record.object_name, record.object_type,
+        record.subscription_id, _to_us(record.expiration_date), record.days_remaining,
+        record.owner, record.distribution_email, record.issuer, record.thumbprint,
+        _to_us(record.created_at), updated_at or _to_us(record.updated_at), _to_us(record.last_alert_sent)
+    )
+
+
+def _from_row(row: Tuple) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name=_intern(row[0]),
+        object_name=row[2],
+        object_type=_intern(row[3]),
+        subscription_id=_intern(row[4]),
+        expiration_date=_from_us(row[5]),
+        days_remaining=row[6],
+        owner=_intern(row[7]),
+        distribution_email=_intern(row[8]),
+        issuer=_intern(row[9]),
+        thumbprint=row[10],
+        created_at=_from_us(row[11]),
+        updated_at=_from_us(row[12]),
+        last_alert_sent=_from_us(row[13])
+    )
+
+
+class InventorySnapshot:
+    """
+    Local SQLite copy of the inventory table.
+    Opened at startup so reads can be served before Table Storage is
+    reachable, kept current by write-through from AzureTableClient and
+    reconciled against the table in the background.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._open()
+        self._data_version = None
+        self.reload_meta()
+
+    def reload_meta(self) -> None:
+        """Re-read readiness, e.g. after another worker wrote"""
+        with self._lock:
+            # Only a snapshot that has been reconciled with the full table at
+            # least once can answer reads; write-through alone may be partial
+            self.is_ready = self._get_meta("reconciled_at") is not None
+
+    def has_external_changes(self) -> bool:
+        """Whether another connection (another worker) committed since the last check"""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        return changed
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Several uvicorn workers may share the file; wait on their write locks
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA mmap_size=268435456")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION and version not in UPGRADABLE_VERSIONS:
+            logger.warning(f"Discarding snapshot {self.path} with schema version {version}")
+            conn.executescript(
+                "DROP TABLE IF EXISTS objects; DROP TABLE IF EXISTS meta; "
+                "DROP TABLE IF EXISTS alert_log; DROP TABLE IF EXISTS changes;"
+            )
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        return conn
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Any) -> None:
+        self._conn.execute(SET_META_SQL, (key, str(value)))
+
+    def _transaction(self, *statements: Tuple[str, Any]) -> None:
+        """Run (sql, rows) pairs with executemany in one transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, rows in statements:
+                    self._conn.executemany(sql, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def upsert_records(self, records: Iterable[KeyVaultObjectRecord], updated_at: datetime) -> None:
+        """Write-through of records just written to the table"""
+        updated_us = _to_us(updated_at)
+        self._transaction((UPSERT_SQL, [_to_row(r, updated_us) for r in records]))
+
+    def merge_fields(self, records: Iterable[KeyVaultObjectRecord], fields: List[str]) -> None:
+        """Write-through of a merge of only `fields` into existing rows"""
+        if not set(fields) <= set(COLUMNS[2:]):
+            raise ValueError(f"Not a mergeable column: {fields}")
+        sql = f"UPDATE objects SET {', '.join(f'{f} = ?' for f in fields)} WHERE vault_name = ? AND row_key = ?"
+        self._transaction((sql, [
+            tuple(_to_us(v) if isinstance(v, datetime) else v for v in (getattr(r, f) for f in fields))
+            + (r.vault_name, r.row_key)
+            for r in records
+        ]))
+
+    def delete_records(self, keys: Iterable[Tuple[str, str]], complete_sync: bool = False) -> None:
+        """
+        Drop (vault_name, row_key) rows deleted from the table. complete_sync
+        marks this as the last write of an error-free sync: the sync
+        generation is bumped in the same transaction.
+        """
+        statements = [("DELETE FROM objects WHERE vault_name = ? AND row_key = ?", list(keys))]
+        if complete_sync:
+            statements.append((NEXT_GENERATION_SQL, [()]))
+            statements.append((SET_META_SQL, [("synced_at", datetime.now(timezone.utc).isoformat())]))
+        self._transaction(*statements)
+
+    def append_changes(self, changes: Iterable[Tuple[str, str, str]], changed_at: datetime, retain: int) -> None:
+        """Append (kind, vault_name, row_key) to the change log, keeping the last `retain` entries"""
+        changed_us = _to_us(changed_at)
+        self._transaction(
+            ("INSERT INTO changes (kind, vault_name, row_key, changed_at) VALUES (?, ?, ?, ?)",
+             [(kind, vault, row_key, changed_us) for kind, vault, row_key in changes]),
+            ("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", [(retain,)])
+        )
+
+    def changes_since(self, seq: int, limit: int) -> List[Tuple[int, str, str, str, datetime]]:
+        """Change log entries after `seq`, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, kind, vault_name, row_key, changed_at FROM changes "
+                "WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit)
+            ).fetchall()
+        return [(row[0], row[1], row[2], row[3], _from_us(row[4])) for row in rows]
+
+    def change_seq_range(self) -> Tuple[int, int]:
+        """Oldest and newest retained change sequence numbers (0, 0 if empty)"""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(seq), MAX(seq) FROM changes").fetchone()
+        return row[0] or 0, row[1] or 0
+
+    def sync_state(self) -> Dict[str, Any]:
+        """Generation and time of the last complete sync (generation 0: none yet)"""
+        with self._lock:
+            generation = self._get_meta("generation")
+            synced_at = self._get_meta("synced_at")
+        return {"generation": int(generation or 0), "synced_at": synced_at}
+
+    def reconcile(self, pages: Iterable[List[KeyVaultObjectRecord]]) -> int:
+        """
+        Bring the snapshot in line with a full scan of the table.
+        Rows written through since the scan started are newer than its
+        pages and are kept; rows the table no longer has are dropped.
+        """
+        started_us = _to_us(datetime.now(timezone.utc))
+        seen = 0
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (vault_name TEXT, row_key TEXT, PRIMARY KEY (vault_name, row_key)) WITHOUT ROWID")
+            self._conn.execute("DELETE FROM seen")
+        for records in pages:
+            rows = [_to_row(r) for r in records]
+            self._transaction(
+                (RECONCILE_SQL, [row + (started_us,) for row in rows]),
+                ("INSERT OR IGNORE INTO seen VALUES (?, ?)", [(r[0], r[1]) for r in rows])
+            )
+            seen += len(rows)
+        self._transaction((
+            "DELETE FROM objects WHERE (updated_at IS NULL OR updated_at < ?) "
+            "AND NOT EXISTS (SELECT 1 FROM seen WHERE seen.vault_name = objects.vault_name "
+            "AND seen.row_key = objects.row_key)",
+            [(started_us,)]
+        ), ("DELETE FROM seen", [()]))
+        with self._lock:
+            self._set_meta("reconciled_at", datetime.now(timezone.utc).isoformat())
+            self.is_ready = True
+        logger.info(f"Snapshot reconciled with {seen} table entities")
+        return seen
+
+    def _where(self, filters: Optional[QueryFilters]) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        if filters:
+            if filters.expiration_window:
+                cutoff = datetime.now(timezone.utc) + timedelta(days=int(filters.expiration_window.value))
+                conditions.append("expiration_date <= ?")
+                params.append(_to_us(cutoff))
+            if filters.owner:
+                conditions.append("owner = ?")
+                params.append(filters.owner)
+            if filters.vault_name:
+                conditions.append("vault_name = ?")
+                params.append(filters.vault_name)
+            if filters.object_type:
+                conditions.append("object_type = ?")
+                params.append(filters.object_type.value)
+            if filters.search_text:
+                conditions.append("instr(object_name, ?) > 0")
+                params.append(filters.search_text)
+            if filters.object_name:
+                conditions.append("object_name = ?")
+                params.append(filters.object_name)
+            if filters.name_prefix:
+                # Range on the primary key's row_key, then exact on the name
+                low, high = prefix_range(filters.name_prefix)
+                for column in ("row_key", "object_name"):
+                    conditions.append(f"{column} >= ?")
+                    params.append(low)
+                    if high is not None:
+                        conditions.append(f"{column} < ?")
+                        params.append(high)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query(self,
+              filters: Optional[QueryFilters] = None,
+              page: int = 1,
+              page_size: int = 50) -> Dict[str, Any]:
+        """Same result shape as AzureTableClient.query_entities"""
+        where, params = self._where(filters)
+        offset = (page - 1) * page_size
+        with self._lock:
+            total_count = self._conn.execute(f"SELECT COUNT(*) FROM objects{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM objects{where} "
+                f"ORDER BY vault_name, row_key LIMIT ? OFFSET ?",
+                params + [page_size, offset]
+            ).fetchall()
+        return {
+            "records": [_from_row(row) for row in rows],
+            "total_count": total_count,
+            "page": page,
+            "page_size": page_size,
+            "has_next": offset + page_size < total_count
+        }
+
+    def iter_record_pages(self,
+                          filters: Optional[QueryFilters] = None,
+                          page_size: int = 1000) -> Iterator[List[KeyVaultObjectRecord]]:
+        """Keyset-paginated scan; the lock is only held while a page is fetched"""
+        where, params = self._where(filters)
+        after = ("", "")
+        keyset = "(vault_name, row_key) > (?, ?)"
+        where = f"{where} AND {keyset}" if where else f" WHERE {keyset}"
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM objects{where} "
+                    f"ORDER BY vault_name, row_key LIMIT ?",
+                    params + list(after) + [page_size]
+                ).fetchall()
+            if not rows:
+                return
+            yield [_from_row(row) for row in rows]
+            after = (rows[-1][0], rows[-1][1])
+
+    def append_alert_log(self, entries: Iterable[AlertLogEntry]) -> None:
+        self._transaction((
+            f"INSERT INTO alert_log ({', '.join(ALERT_LOG_COLUMNS)}) VALUES ({', '.join('?' for _ in ALERT_LOG_COLUMNS)})",
+            [(e.partition_key, e.row_key, _to_us(e.sent_at), e.recipient, e.vault_name, e.object_name,
+              e.object_type, e.days_remaining, _to_us(e.expiration_date)) for e in entries]
+        ))
+
+    def read_alert_log(self, since: datetime, recipient: Optional[str] = None) -> List[AlertLogEntry]:
+        """Alert log entries sent at or after `since`, oldest first; the day range bounds the key scan"""
+        sql = (f"SELECT {', '.join(ALERT_LOG_COLUMNS)} FROM alert_log "
+               "WHERE day >= ? AND sent_at >= ?")
+        params: List[Any] = [alert_log_day(since), _to_us(since)]
+        if recipient:
+            sql += " AND recipient = ?"
+            params.append(recipient)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY day, row_key", params).fetchall()
+        return [
+            AlertLogEntry(
+                sent_at=_from_us(row[2]), recipient=row[3], vault_name=_intern(row[4]), object_name=row[5],
+                object_type=_intern(row[6]), days_remaining=row[7], expiration_date=_from_us(row[8]), row_key=row[1]
+            )
+            for row in rows
+        ]
+
+    def kpi_summary(self) -> Dict[str, int]:
+        """Same result shape as AzureTableClient.get_kpi_summary"""
+        now = datetime.now(timezone.utc)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Windows come from expiration_date, not the days_remaining stored at sync time
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT "
+                "COALESCE(SUM(object_type = 'Secret'), 0), "
+                "COALESCE(SUM(object_type = 'Certificate'), 0), "
+                "COALESCE(SUM(expiration_date <= ?), 0), "
+                "COALESCE(SUM(expiration_date <= ?), 0), "
+                "COALESCE(SUM(last_alert_sent >= ?), 0) "
+                "FROM objects",
+                (_to_us(now + timedelta(days=30)), _to_us(now + timedelta(days=60)), _to_us(today_start))
+            ).fetchone()
+        return {
+            "total_secrets": row[0],
+            "total_certificates": row[1],
+            "expiring_30_days": row[2],
+            "expiring_60_days": row[3],
+            "alerts_sent_today": row[4]
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,124 @@
+# src/clients/sqlite_client.py
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.models.records import AlertLogEntry, KeyVaultObjectRecord
+from src.models.schemas import QueryFilters
+from src.clients.snapshot_store import InventorySnapshot
+from src.clients.storage_backend import StorageBackend
+from src.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany transaction for bulk writes
+BATCH_SIZE = 5000
+
+
+class SqliteTableClient(StorageBackend):
+    """
+    Inventory stored in a local SQLite file (WAL mode, indexed on expiry,
+    owner, vault and type). Same layout as the snapshot kept in front of
+    Table Storage, but authoritative: no Azure account needed.
+    """
+
+    def __init__(self, path: str = "data/inventory.sqlite"):
+        self.path = path
+        self.snapshot = InventorySnapshot(path)
+
+    @property
+    def is_initialized(self) -> bool:
+        return True
+
+    def initialize(self) -> None:
+        pass  # The file is opened and migrated in the constructor
+
+    @instrumented("sqlite")
+    async def upsert_entity(self, record: KeyVaultObjectRecord) -> None:
+        """Insert or update an entity"""
+        try:
+            self.snapshot.upsert_records([record], updated_at=datetime.now(timezone.utc))
+        except Exception as e:
+            logger.error(f"Failed to upsert entity {record.row_key}: {e}")
+            raise
+
+    @instrumented("sqlite")
+    async def batch_upsert(self, records: List[KeyVaultObjectRecord]) -> None:
+        """Bulk upsert in large transactions, off the event loop"""
+        try:
+            now = datetime.now(timezone.utc)
+            for i in range(0, len(records), BATCH_SIZE):
+                await asyncio.to_thread(self.snapshot.upsert_records, records[i:i + BATCH_SIZE], now)
+        except Exception as e:
+            logger.error(f"Failed to batch upsert entities: {e}")
+            raise
+
+    @instrumented("sqlite")
+    async def batch_merge(self, records: List[KeyVaultObjectRecord], fields: List[str]) -> None:
+        """Update only the given columns, off the event loop"""
+        try:
+            for i in range(0, len(records), BATCH_SIZE):
+                await asyncio.to_thread(self.snapshot.merge_fields, records[i:i + BATCH_SIZE], fields)
+        except Exception as e:
+            logger.error(f"Failed to batch merge {fields}: {e}")
+            raise
+
+    @instrumented("sqlite")
+    async def batch_delete(self, records: List[KeyVaultObjectRecord], complete_sync: bool = False) -> None:
+        """Delete entities in one transaction, off the event loop"""
+        try:
+            keys = [(record.vault_name, record.row_key) for record in records]
+            await asyncio.to_thread(self.snapshot.delete_records, keys, complete_sync)
+            if complete_sync:
+                logger.info(f"SQLite inventory sync complete: {self.snapshot.sync_state()}")
+        except Exception as e:
+            logger.error(f"Failed to batch delete entities: {e}")
+            raise
+
+    @instrumented("sqlite")
+    async def query_entities(self,
+                             filters: Optional[QueryFilters] = None,
+                             page: int = 1,
+                             page_size: int = 50) -> Dict[str, Any]:
+        """Query entities with filters and pagination"""
+        try:
+            return await asyncio.to_thread(self.snapshot.query, filters, page, page_size)
+        except Exception as e:
+            logger.error(f"Failed to query entities: {e}")
+            raise
+
+    @instrumented("sqlite")
+    async def get_kpi_summary(self) -> Dict[str, int]:
+        """Get KPI summary data"""
+        try:
+            return await asyncio.to_thread(self.snapshot.kpi_summary)
+        except Exception as e:
+            logger.error(f"Failed to get KPI summary: {e}")
+            raise
+
+    def iter_record_pages(self,
+                          filters: Optional[QueryFilters] = None,
+                          results_per_page: int = 1000,
+                          select: Optional[List[str]] = None) -> Iterator[List[KeyVaultObjectRecord]]:
+        # Local reads: full rows cost nothing extra
+        return self.snapshot.iter_record_pages(filters, results_per_page)
+
+    @instrumented("sqlite")
+    async def append_alert_log(self, entries: List[AlertLogEntry]) -> None:
+        """Append sent alerts to the alert log in one transaction"""
+        try:
+            await asyncio.to_thread(self.snapshot.append_alert_log, entries)
+        except Exception as e:
+            logger.error(f"Failed to append alert log: {e}")
+            raise
+
+    @instrumented("sqlite")
+    async def get_alert_log(self, since: datetime, recipient: Optional[str] = None) -> List[AlertLogEntry]:
+        """Alerts sent at or after `since`, optionally for one recipient"""
+        try:
+            return await asyncio.to_thread(self.snapshot.read_alert_log, since, recipient)
+        except Exception as e:
+            logger.error(f"Failed to read alert log: {e}")
+            raise
@@ -0,0 +1,82 @@
+# src/clients/storage_backend.py
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.models.records import AlertLogEntry, KeyVaultObjectRecord
+from src.models.schemas import QueryFilters
+from src.clients.snapshot_store import InventorySnapshot
+
+
+class StorageBackend(ABC):
+    """
+    Inventory storage used by the services and endpoints.
+    Implementations: AzureTableClient (Table Storage, optionally fronted
+    by a local snapshot) and SqliteTableClient (local SQLite file).
+    """
+
+    # Local SQLite copy of the inventory, if the backend keeps one; shared
+    # by uvicorn workers and watched for cross-worker invalidation
+    snapshot: Optional[InventorySnapshot] = None
+
+    @property
+    @abstractmethod
+    def is_initialized(self) -> bool:
+        ...
+
+    @abstractmethod
+    def initialize(self) -> None:
+        """Open connections and create storage if missing (blocking)"""
+
+    @abstractmethod
+    async def upsert_entity(self, record: KeyVaultObjectRecord) -> None:
+        """Insert or update one object (merge: unset last_alert_sent is kept)"""
+
+    @abstractmethod
+    async def batch_upsert(self, records: List[KeyVaultObjectRecord]) -> None:
+        """Insert or update many objects"""
+
+    @abstractmethod
+    async def batch_merge(self, records: List[KeyVaultObjectRecord], fields: List[str]) -> None:
+        """Write only the named properties of existing objects, keeping the rest"""
+
+    @abstractmethod
+    async def batch_delete(self, records: List[KeyVaultObjectRecord], complete_sync: bool = False) -> None:
+        """
+        Delete objects that no longer exist in Key Vault. complete_sync
+        makes this the last write of an error-free sync (records may be
+        empty): the snapshot's sync generation is bumped with it.
+        """
+
+    @abstractmethod
+    async def query_entities(self,
+                             filters: Optional[QueryFilters] = None,
+                             page: int = 1,
+                             page_size: int = 50) -> Dict[str, Any]:
+        """Filtered page: records, total_count, page, page_size, has_next"""
+
+    @abstractmethod
+    async def get_kpi_summary(self) -> Dict[str, int]:
+        """Counts matching KPISummaryResponse"""
+
+    @abstractmethod
+    def iter_record_pages(self,
+                          filters: Optional[QueryFilters] = None,
+                          results_per_page: int = 1000,
+                          select: Optional[List[str]] = None) -> Iterator[List[KeyVaultObjectRecord]]:
+        """
+        Stream all matching records page by page (blocking; run in a thread).
+        select names the properties the caller reads; others may be left unset.
+        """
+
+    @abstractmethod
+    async def append_alert_log(self, entries: List[AlertLogEntry]) -> None:
+        """Record sent alerts in the append-only alert log"""
+
+    @abstractmethod
+    async def get_alert_log(self, since: datetime, recipient: Optional[str] = None) -> List[AlertLogEntry]:
+        """Alerts sent at or after `since`, oldest first, optionally for one recipient"""
+
+    async def reconcile_snapshot(self) -> None:
+        """Bring the local snapshot (if any) in line with storage"""
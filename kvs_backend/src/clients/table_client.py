@@ -1,99 +1,216 @@
 # src/clients/table_client.py
 import os
-from azure.data.tables import TableServiceClient, TableClient
+import asyncio
+import threading
 
-from azure.core.exceptions import ResourceNotFoundError
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime, timedelta, timezone
 
 import logging
-from src.models.entities import KeyVaultObjectEntity
+from src.models.records import AlertLogEntry, KeyVaultObjectRecord
+from src.clients.snapshot_store import InventorySnapshot
+from src.clients.storage_backend import StorageBackend
 from src.models.schemas import QueryFilters
+from src.clients.query_planner import QueryPlan, plan_query, plan_alert_log, KPI_COLUMNS
+from src.metrics import instrumented, track_call
 
 logger = logging.getLogger(__name__)
 
-class AzureTableClient:
-    def __init__(self, credential, table_name: str = "keyvaultobjects"):
+class AzureTableClient(StorageBackend):
+    def __init__(self, credential, table_name: str = "keyvaultobjects",
+                 snapshot: Optional[InventorySnapshot] = None,
+                 alert_log_table_name: str = "alertlog"):
         
         self.table_name = table_name
-        self.table_service = TableServiceClient(endpoint=os.getenv('AZURE_TABLE_ENDPOINT'), credential=credential)
-        self.table_client = self.table_service.get_table_client(table_name)
-        self._ensure_table_exists()
-        
-    def _ensure_table_exists(self):
-        """Create table if it doesn't exist"""
+        self.alert_log_table_name = alert_log_table_name
+        self._alert_log_table = None
+        self.snapshot = snapshot
+        self.credential = credential
+        self._table_service = None
+        self._table_client = None
+        self._init_lock = threading.Lock()
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._table_client is not None
+
+    @property
+    def table_client(self):
+        """Table client, created (and the table ensured) on first use"""
+        if self._table_client is None:
+            self.initialize()
+        return self._table_client
+
+    def initialize(self) -> None:
+        """Import the Tables SDK, build clients and ensure the table exists"""
+        with self._init_lock:
+            if self._table_client is not None:
+                return
+            from azure.data.tables import TableServiceClient
+            self._table_service = TableServiceClient(endpoint=os.getenv('AZURE_TABLE_ENDPOINT'), credential=self.credential)
+            self._ensure_table_exists()
+            self._table_client = self._table_service.get_table_client(self.table_name)
+
+    def _ensure_table_exists(self, table_name: Optional[str] = None):
+        """Create table if it doesn't exist; any other failure is raised"""
+        from azure.core.exceptions import ResourceExistsError
         try:
-            self.table_service.create_table(self.table_name)
-        except Exception:
+            self._table_service.create_table(table_name or self.table_name)
+        except ResourceExistsError:
             pass  # Table already exists
+
+    def get_table(self, table_name: str):
+        """TableClient for an auxiliary table in the same account, created if missing"""
+        if self._table_client is None:
+            self.initialize()
+        self._ensure_table_exists(table_name)
+        return self._table_service.get_table_client(table_name)
             
-    async def upsert_entity(self, entity: KeyVaultObjectEntity) -> None:
+    @instrumented("table")
+    async def upsert_entity(self, record: KeyVaultObjectRecord) -> None:
         """Insert or update an entity"""
         try:
-            entity['updated_at'] = datetime.now(timezone.utc)
-            self.table_client.upsert_entity(entity)
+            now = datetime.now(timezone.utc)
+            self.table_client.upsert_entity(record.to_entity(updated_at=now))
+            if self.snapshot is not None:
+                self.snapshot.upsert_records([record], updated_at=now)
         except Exception as e:
-            logger.error(f"Failed to upsert entity {entity.get('RowKey', 'unknown')}: {e}")
+            logger.error(f"Failed to upsert entity {record.row_key}: {e}")
             raise
             
-    async def batch_upsert(self, entities: List[KeyVaultObjectEntity]) -> None:
+    @instrumented("table")
+    async def batch_upsert(self, records: List[KeyVaultObjectRecord]) -> None:
         """
         Batch upsert entities to Azure Table Storage using submit_transaction().
         New SDK requires same PartitionKey and max 100 entities per batch.
         """
         try:
+            from azure.data.tables import UpdateMode
             batch_size = 100
             partitions = {}
 
-            # Group entities by PartitionKey
-            for entity in entities:
-                pk = entity["PartitionKey"]
-                partitions.setdefault(pk, []).append(entity)
+            # Group records by PartitionKey (vault)
+            for record in records:
+                partitions.setdefault(record.vault_name, []).append(record)
 
             # Process each partition
-            for partition_key, partition_entities in partitions.items():
-                for i in range(0, len(partition_entities), batch_size):
-                    batch = partition_entities[i:i + batch_size]
-
-                    # Update timestamps
-                    for entity in batch:
-                        entity["updated_at"] = datetime.now(timezone.utc)
+            for partition_key, partition_records in partitions.items():
+                for i in range(0, len(partition_records), batch_size):
+                    batch = partition_records[i:i + batch_size]
+                    now = datetime.now(timezone.utc)
 
-                    # Build transaction actions
+                    # Convert to entities only for the batch being sent
                     actions = [
-                        TableTransactionAction(
-                            operation="upsert_merge",  # or "upsert_replace"
-                            entity=entity
-                        )
-                        for entity in batch
+                        ("upsert", record.to_entity(updated_at=now), {"mode": UpdateMode.MERGE})  # or UpdateMode.REPLACE
+                        for record in batch
                     ]
 
                     # Submit to Azure Table
-                    self.table_client.submit_transaction(actions)
+                    with track_call("table", "submit_transaction"):
+                        self.table_client.submit_transaction(actions)
+                    if self.snapshot is not None:
+                        self.snapshot.upsert_records(batch, updated_at=now)
 
         except Exception as e:
             logger.error(f"Failed to batch upsert entities: {e}")
             raise
 
+    @instrumented("table")
+    async def batch_merge(self, records: List[KeyVaultObjectRecord], fields: List[str]) -> None:
+        """
+        Merge upsert entities holding only the keys and the given fields,
+        grouped by PartitionKey in transactions of at most 100 like
+        batch_upsert; the other stored properties are left untouched.
+        """
+        try:
+            from azure.data.tables import UpdateMode
+            batch_size = 100
+            partitions = {}
+            for record in records:
+                partitions.setdefault(record.vault_name, []).append(record)
+
+            for partition_key, partition_records in partitions.items():
+                for i in range(0, len(partition_records), batch_size):
+                    batch = partition_records[i:i + batch_size]
+                    actions = [
+                        ("upsert",
+                         {"PartitionKey": partition_key, "RowKey": record.row_key,
+                          **{f: getattr(record, f) for f in fields}},
+                         {"mode": UpdateMode.MERGE})
+                        for record in batch
+                    ]
+                    with track_call("table", "submit_transaction"):
+                        self.table_client.submit_transaction(actions)
+                    if self.snapshot is not None:
+                        self.snapshot.merge_fields(batch, fields)
+
+        except Exception as e:
+            logger.error(f"Failed to batch merge {fields}: {e}")
+            raise
+
+    @instrumented("table")
+    async def batch_delete(self, records: List[KeyVaultObjectRecord], complete_sync: bool = False) -> None:
+        """
+        Batch delete entities, grouped by PartitionKey in transactions of
+        at most 100 like batch_upsert. With complete_sync the snapshot
+        write-through of the last batch also bumps the sync generation.
+        """
+        try:
+            batch_size = 100
+            partitions = {}
+            for record in records:
+                partitions.setdefault(record.vault_name, []).append(record)
+            batches = [
+                (partition_key, partition_records[i:i + batch_size])
+                for partition_key, partition_records in partitions.items()
+                for i in range(0, len(partition_records), batch_size)
+            ]
+
+            for n, (partition_key, batch) in enumerate(batches, 1):
+                actions = [
+                    ("delete", {"PartitionKey": partition_key, "RowKey": record.row_key})
+                    for record in batch
+                ]
+                with track_call("table", "submit_transaction"):
+                    self.table_client.submit_transaction(actions)
+                if self.snapshot is not None:
+                    self.snapshot.delete_records(
+                        [(partition_key, record.row_key) for record in batch],
+                        complete_sync and n == len(batches)
+                    )
+            if complete_sync and self.snapshot is not None:
+                if not batches:
+                    self.snapshot.delete_records([], complete_sync=True)
+                logger.info(f"Inventory snapshot sync complete: {self.snapshot.sync_state()}")
+
+        except Exception as e:
+            logger.error(f"Failed to batch delete entities: {e}")
+            raise
+
+    @instrumented("table")
     async def query_entities(self, 
                            filters: Optional[QueryFilters] = None,
                            page: int = 1,
                            page_size: int = 50) -> Dict[str, Any]:
         """Query entities with filters and pagination"""
         try:
-            query_filter = self._build_query_filter(filters)
-            
+            if self._snapshot_ready():
+                return await asyncio.to_thread(self.snapshot.query, filters, page, page_size)
+
             # Get all matching entities first (for total count)
-            all_entities = list(self.table_client.query_entities(query_filter))
+            all_entities = list(self._query(plan_query(filters)))
             total_count = len(all_entities)
             
             # Apply pagination
             start_index = (page - 1) * page_size
             end_index = start_index + page_size
-            page_entities = all_entities[start_index:end_index]
+            page_records = [
+                KeyVaultObjectRecord.from_entity(entity)
+                for entity in all_entities[start_index:end_index]
+            ]
             
             return {
-                "entities": page_entities,
+                "records": page_records,
                 "total_count": total_count,
                 "page": page,
                 "page_size": page_size,
@@ -104,41 +221,110 @@ class AzureTableClient:
             logger.error(f"Failed to query entities: {e}")
             raise
 
-    def _build_query_filter(self, filters: Optional[QueryFilters]) -> str:
-        """Build OData query filter from QueryFilters"""
-        conditions = []
-        
-        if not filters:
-            return ""
-            
-        if filters.expiration_window:
-            days = int(filters.expiration_window.value)
-            cutoff_date = datetime.now(timezone.utc) + timedelta(days=days)
-            conditions.append(f"expiration_date le datetime'{cutoff_date.isoformat()}Z'")
-            
-        if filters.owner:
-            conditions.append(f"owner eq '{filters.owner}'")
-            
-        if filters.vault_name:
-            conditions.append(f"PartitionKey eq '{filters.vault_name}'")
-            
-        if filters.object_type:
-            conditions.append(f"object_type eq '{filters.object_type.value}'")
-            
-        if filters.search_text:
-            # Substring search for object name
-            conditions.append(f"contains(object_name, '{filters.search_text}')")
-            
-        return " and ".join(conditions)
+    @property
+    def alert_log_table(self):
+        """Append-only alert log, one partition per UTC day"""
+        if self._alert_log_table is None:
+            self._alert_log_table = self.get_table(self.alert_log_table_name)
+        return self._alert_log_table
+
+    @instrumented("table")
+    async def append_alert_log(self, entries: List[AlertLogEntry]) -> None:
+        """Insert alert log entries in transactions of at most 100 per day partition"""
+        try:
+            partitions = {}
+            for entry in entries:
+                partitions.setdefault(entry.partition_key, []).append(entry)
+
+            for partition_entries in partitions.values():
+                for i in range(0, len(partition_entries), 100):
+                    actions = [("create", entry.to_entity()) for entry in partition_entries[i:i + 100]]
+                    with track_call("table", "submit_transaction"):
+                        self.alert_log_table.submit_transaction(actions)
+        except Exception as e:
+            logger.error(f"Failed to append alert log: {e}")
+            raise
+
+    @instrumented("table")
+    async def get_alert_log(self, since: datetime, recipient: Optional[str] = None) -> List[AlertLogEntry]:
+        """Alerts sent at or after `since`, oldest first: one partition query per day in the window"""
+        try:
+            entries = []
+            for _, query_filter in plan_alert_log(since, recipient=recipient):
+                entries.extend(
+                    AlertLogEntry.from_entity(entity)
+                    for entity in self.alert_log_table.query_entities(query_filter)
+                )
+            return entries
+        except Exception as e:
+            logger.error(f"Failed to read alert log: {e}")
+            raise
+
+    def _snapshot_ready(self) -> bool:
+        return self.snapshot is not None and self.snapshot.is_ready
 
+    async def reconcile_snapshot(self) -> None:
+        """Rebuild the local snapshot from a full table scan, off the event loop"""
+        if self.snapshot is None:
+            return
+        try:
+            await asyncio.to_thread(self.snapshot.reconcile, self.iter_record_pages(None))
+        except Exception as e:
+            logger.error(f"Failed to reconcile inventory snapshot: {e}")
+
+    def iter_record_pages(self,
+                          filters: Optional[QueryFilters] = None,
+                          results_per_page: int = 1000,
+                          select: Optional[List[str]] = None) -> Iterator[List[KeyVaultObjectRecord]]:
+        """
+        Stream matching records one storage page at a time.
+        Synchronous on purpose: callers run it in a worker thread
+        (e.g. StreamingResponse) so the table is read exactly once.
+        """
+        for entity_page in self._query_pages(plan_query(filters, select), results_per_page):
+            yield [KeyVaultObjectRecord.from_entity(entity) for entity in entity_page]
+
+    def _query_pages(self, plan: QueryPlan, results_per_page: int = 1000) -> Iterator[List[Any]]:
+        """Execute a query plan, one list of entities per storage page"""
+        logger.debug(f"Table query plan: {plan}")
+        if plan.kind == "point":
+            from azure.core.exceptions import ResourceNotFoundError
+            entities = []
+            for partition_key, row_key in plan.keys:
+                try:
+                    with track_call("table", "get_entity"):
+                        entities.append(self.table_client.get_entity(partition_key, row_key, select=plan.select))
+                except ResourceNotFoundError:
+                    pass
+            yield entities
+            return
+        if plan.filter:
+            pages = self.table_client.query_entities(
+                plan.filter, results_per_page=results_per_page, select=plan.select
+            ).by_page()
+        else:
+            pages = self.table_client.list_entities(results_per_page=results_per_page, select=plan.select).by_page()
+        for entity_page in pages:
+            yield list(entity_page)
+
+    def _query(self, plan: QueryPlan) -> Iterator[Any]:
+        for entity_page in self._query_pages(plan):
+            yield from entity_page
+
+    @instrumented("table")
     async def get_kpi_summary(self) -> Dict[str, int]:
         """Get KPI summary data"""
         try:
+            if self._snapshot_ready():
+                return await asyncio.to_thread(self.snapshot.kpi_summary)
+
             now = datetime.now(timezone.utc)
             today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            expiring_30 = now + timedelta(days=30)
+            expiring_60 = now + timedelta(days=60)
             
-            # Get all entities
-            all_entities = list(self.table_client.query_entities(""))
+            # Only the properties counted below are downloaded
+            all_entities = self._query(QueryPlan("scan", "", KPI_COLUMNS))
             
             summary = {
                 "total_secrets": 0,
@@ -155,12 +341,12 @@ class AzureTableClient:
                 elif entity.get('object_type') == 'Certificate':
                     summary["total_certificates"] += 1
                 
-                # Count expiring items
-                days_remaining = entity.get('days_remaining')
-                if days_remaining is not None:
-                    if days_remaining <= 30:
+                # Count expiring items against the same "now"
+                expiration_date = entity.get('expiration_date')
+                if expiration_date is not None:
+                    if expiration_date <= expiring_30:
                         summary["expiring_30_days"] += 1
-                    if days_remaining <= 60:
+                    if expiration_date <= expiring_60:
                         summary["expiring_60_days"] += 1
                 
                 # Count alerts sent today
@@ -1,11 +1,27 @@
 # src/dependencies.py
 from src.services.keyvault_service import KeyVaultService
 from src.services.alert_service import AlertService
-from src.clients.table_client import AzureTableClient
+from src.clients.storage_backend import StorageBackend
 
 keyvault_service: KeyVaultService = None
 alert_service: AlertService = None
-table_client: AzureTableClient = None
+table_client: StorageBackend = None
+keyvault_client = None
+email_client = None
+scheduled_tasks = None
+warm_up_task = None
+elector = None
+invalidation_bus = None
+change_feed = None
+shard_worker_task = None
+live_updates = None
+
+# Set by the startup warm-up once each component is usable; startup drops
+# "credential" when nothing in this process needs Azure
+readiness = {"credential": False, "table": False}
+
+def is_ready() -> bool:
+    return all(readiness.values())
 
 async def get_keyvault_service() -> KeyVaultService:
     return keyvault_service
@@ -13,5 +29,8 @@ async def get_keyvault_service() -> KeyVaultService:
 async def get_alert_service() -> AlertService:
     return alert_service
 
-async def get_table_client() -> AzureTableClient:
+async def get_table_client() -> StorageBackend:
     return table_client
+
+async def get_live_updates():
+    return live_updates
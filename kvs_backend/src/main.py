@@ -1,27 +1,36 @@
 # src/main.py
 
 import os
+import asyncio
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from azure.identity import AzureCliCredential
-
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.resource import SubscriptionClient
+# Load .env before src modules read their settings at import time
+from dotenv import load_dotenv
+load_dotenv()
 
+# Azure SDKs are imported lazily by the clients on first use
+from src.clients.credential import LazyCredential
 from src.clients.keyvault_client import KeyVaultClient
-from src.clients.table_client import AzureTableClient
+from src.clients.storage_backend import StorageBackend
+from src.clients.sqlite_client import SqliteTableClient
+from src.clients.factory import create_storage_backend
 from src.clients.email_client import EmailClient
 from src.services.keyvault_service import KeyVaultService
 from src.services.alert_service import AlertService
-# from src.services.scheduler import ScheduledTasks
-
-from dotenv import load_dotenv
-load_dotenv()
+from src.services.leader_election import create_elector
+from src.services.invalidation import InvalidationBus
+from src.services.change_feed import ChangeFeed
+from src.services.sharded_sync import ShardedSync, create_shard_store
+from src.services.live_updates import LiveUpdates
+from src.services.scheduler import ScheduledTasks
+from src.metrics import metrics_middleware, metrics_endpoint, mark_startup_phase
+from src.profiling import profiling_middleware
 
 from src import dependencies  # 中央依赖注入容器
 
@@ -31,6 +40,46 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+# Fast start (default): serve immediately, authenticate and create the table
+# in the background. FAST_START=false blocks startup until both succeed.
+FAST_START = os.getenv("FAST_START", "true").lower() != "false"
+# Periodic sync/alerts; with several workers only the elected leader runs them
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
+# sharded: syncs are split into leased shards worked by any number of
+# processes (see sync_worker.py); SHARD_WORKER=true makes this process one
+SYNC_MODE = os.getenv("SYNC_MODE", "single").lower()
+SHARD_WORKER = os.getenv("SHARD_WORKER", "false").lower() == "true"
+# Failed warm-up components are retried, doubling the delay up to the max
+WARM_UP_RETRY_SECONDS = float(os.getenv("WARM_UP_RETRY_SECONDS", "2"))
+WARM_UP_RETRY_MAX_SECONDS = float(os.getenv("WARM_UP_RETRY_MAX_SECONDS", "60"))
+# With a lease shared across hosts, non-leader hosts re-scan the table this
+# often: syncs run elsewhere never write through to their snapshot (0 disables)
+SNAPSHOT_RECONCILE_SECONDS = float(os.getenv("SNAPSHOT_RECONCILE_SECONDS", "900"))
+
+def hook_server_exit() -> None:
+    """
+    Close live event streams as soon as uvicorn is asked to exit (SIGINT,
+    SIGTERM): its graceful shutdown waits for open responses before the
+    lifespan shutdown runs, so /api/events streams would hold it forever.
+    """
+    try:
+        from uvicorn.server import Server
+    except ImportError:
+        return
+    if getattr(Server.handle_exit, "closes_live_updates", False):
+        return  # Already hooked (reloaded module)
+    handle_exit = Server.handle_exit
+
+    def handle_exit_closing_streams(server, sig, frame):
+        handle_exit(server, sig, frame)
+        if dependencies.live_updates:
+            dependencies.live_updates.shutdown()
+
+    handle_exit_closing_streams.closes_live_updates = True
+    Server.handle_exit = handle_exit_closing_streams
+
+hook_server_exit()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management"""
@@ -41,29 +90,27 @@ async def lifespan(app: FastAPI):
 async def startup_event():
     """Initialize services and start scheduler"""
     try:
-        credential = AzureCliCredential()
-
-        #credential = DefaultAzureCredential()
-        token = credential.get_token("https://management.azure.com/.default")
-        print(f"[TOKEN ACQUIRED] Expires at {token.expires_on}")
-    except Exception as e:
-        logging.error(f"[AUTH ERROR] Unable to get token: {e}")
-        raise
-    try:
-        # Initialize clients
+        # Clients are cheap to construct; nothing here touches the network
+        credential = LazyCredential(os.getenv("AZURE_CREDENTIAL", "cli"))
         keyvault_client = KeyVaultClient(credential)
-        table_client = AzureTableClient(
-            credential=credential,
-            table_name=os.getenv("TABLE_NAME", "keyvaultobjects")
-        )
+        table_client = create_storage_backend(credential)
+        snapshot = table_client.snapshot
+        if not credential_required(table_client):
+            # Manual syncs still authenticate lazily on first use
+            dependencies.readiness.pop("credential", None)
         email_client = EmailClient(
             smtp_server=os.getenv("SMTP_SERVER"),
             smtp_port=int(os.getenv("SMTP_PORT", "587"))
         )
 
         # Initialize services
-        keyvault_service = KeyVaultService(keyvault_client, table_client)
-        alert_service = AlertService(table_client, email_client)
+        change_feed = ChangeFeed(snapshot)
+        keyvault_service = KeyVaultService(keyvault_client, table_client, change_feed)
+        alert_service = AlertService(table_client, email_client, change_feed=change_feed)
+        if SYNC_MODE == "sharded":
+            keyvault_service.sharded_sync = ShardedSync(keyvault_service, create_shard_store(table_client))
+            if SHARD_WORKER:
+                dependencies.shard_worker_task = asyncio.create_task(keyvault_service.sharded_sync.serve())
 
         # Register into global dependency module
         dependencies.keyvault_client = keyvault_client
@@ -71,22 +118,106 @@ async def startup_event():
         dependencies.email_client = email_client
         dependencies.keyvault_service = keyvault_service
         dependencies.alert_service = alert_service
+        dependencies.change_feed = change_feed
+
+        # Push feed changes and KPI deltas to dashboards (/api/events)
+        dependencies.live_updates = LiveUpdates(table_client, change_feed)
+        dependencies.live_updates.start()
+
+        # Only one worker (the lease holder) runs background jobs
+        dependencies.elector = create_elector(table_client)
+        if dependencies.elector:
+            dependencies.elector.start()
+        if snapshot is not None:
+            dependencies.invalidation_bus = InvalidationBus(snapshot)
+            # Deliver feed entries written by other workers (the sync leader)
+            dependencies.invalidation_bus.subscribe(change_feed.poll)
+            dependencies.invalidation_bus.start()
+
+        if FAST_START:
+            dependencies.warm_up_task = asyncio.create_task(warm_up(credential, table_client))
+        else:
+            await warm_up(credential, table_client, raise_errors=True)
 
         # Optionally start scheduled tasks
-        # dependencies.scheduled_tasks = ScheduledTasks(keyvault_service, alert_service)
-        # dependencies.scheduled_tasks.start_scheduler()
+        if SCHEDULER_ENABLED:
+            dependencies.scheduled_tasks = ScheduledTasks(keyvault_service, alert_service, dependencies.elector)
+            dependencies.scheduled_tasks.start_scheduler()
 
-        logging.info("Application startup completed")
+        logging.info(f"Application startup completed in {mark_startup_phase('startup'):.2f}s")
 
     except Exception as e:
         logging.error(f"Application startup failed: {e}")
         raise
 
+def credential_required(table_client: StorageBackend) -> bool:
+    """Whether readiness waits for an Azure token: table storage or scheduled Key Vault syncs"""
+    if not isinstance(table_client, SqliteTableClient):
+        return True
+    return SCHEDULER_ENABLED or (SYNC_MODE == "sharded" and SHARD_WORKER)
+
+async def warm_up(credential: LazyCredential, table_client: StorageBackend, raise_errors: bool = False):
+    """
+    Acquire a token and ensure the table exists concurrently, retrying
+    failed components with backoff, then reconcile the snapshot (and keep
+    reconciling it on hosts that do not lead a shared-table lease)
+    """
+    steps = {"credential": credential.warm_up, "table": table_client.initialize}
+    steps = {component: step for component, step in steps.items() if component in dependencies.readiness}
+    delay = WARM_UP_RETRY_SECONDS
+    while True:
+        pending = [component for component in steps if not dependencies.readiness[component]]
+        results = await asyncio.gather(
+            *(asyncio.to_thread(steps[component]) for component in pending),
+            return_exceptions=True
+        )
+        for component, result in zip(pending, results):
+            if isinstance(result, Exception):
+                logging.error(f"[WARM-UP ERROR] {component}: {result}")
+                if raise_errors:
+                    raise result
+            else:
+                dependencies.readiness[component] = True
+        if dependencies.is_ready():
+            break
+        logging.info(f"Retrying warm-up in {delay:g}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARM_UP_RETRY_MAX_SECONDS)
+
+    mark_startup_phase("ready")
+    # Reads were served from the local snapshot meanwhile (if it was
+    # reconciled before); now bring it up to date with the table.
+    # With a host-local lease all workers share one snapshot file, so only
+    # the leader scans; otherwise every host has its own copy to refresh.
+    elector = dependencies.elector
+    if elector is not None:
+        await elector.decided.wait()
+    if elector is None or elector.is_leader or not elector.lease.host_local:
+        await table_client.reconcile_snapshot()
+    if elector is not None and not elector.lease.host_local and SNAPSHOT_RECONCILE_SECONDS > 0:
+        while True:
+            await asyncio.sleep(SNAPSHOT_RECONCILE_SECONDS)
+            # The leader's syncs write through (sharded runs reconcile on completion)
+            if not elector.is_leader:
+                await table_client.reconcile_snapshot()
+
 async def shutdown_event():
     """Cleanup on application shutdown"""
     try:
+        if dependencies.warm_up_task and not dependencies.warm_up_task.done():
+            dependencies.warm_up_task.cancel()
         if dependencies.scheduled_tasks:
             dependencies.scheduled_tasks.stop_scheduler()
+        if dependencies.shard_worker_task:
+            dependencies.shard_worker_task.cancel()
+        if dependencies.live_updates:
+            dependencies.live_updates.stop()
+        if dependencies.invalidation_bus:
+            dependencies.invalidation_bus.stop()
+        if dependencies.elector:
+            await dependencies.elector.stop()
+        if dependencies.table_client and dependencies.table_client.snapshot:
+            dependencies.table_client.snapshot.close()
         logging.info("Application shutdown completed")
     except Exception as e:
         logging.error(f"Application shutdown failed: {e}")
@@ -106,10 +237,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(profiling_middleware)
 
-from src.api.endpoints import keyvault, alert
+from src.api.endpoints import keyvault, alert, admin, events
 app.include_router(keyvault.router)
 app.include_router(alert.router)
+app.include_router(admin.router)
+app.include_router(events.router)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 @app.get("/")
 async def root():
@@ -119,6 +255,7 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
+        "ready": dependencies.is_ready(),
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "services": {
             "keyvault_client": dependencies.keyvault_client is not None,
@@ -127,3 +264,24 @@ async def health_check():
             "scheduler": dependencies.scheduled_tasks is not None,
         }
     }
+
+@app.get("/health/live")
+async def liveness_check():
+    """Process is up and serving; never depends on Azure"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Credential and table are initialized; snapshot_ready tells whether reads
+    are already served locally, sync the generation of the last complete sync
+    """
+    table_client = dependencies.table_client
+    snapshot = table_client.snapshot if table_client else None
+    body = {
+        "ready": dependencies.is_ready(),
+        "components": dict(dependencies.readiness),
+        "snapshot_ready": bool(snapshot and snapshot.is_ready),
+        "sync": await asyncio.to_thread(snapshot.sync_state) if snapshot else None
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
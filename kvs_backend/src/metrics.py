@@ -0,0 +1,181 @@
+# src/metrics.py
+
+import os
+import time
+import logging
+import functools
+from contextlib import contextmanager
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age() -> float:
+    """Seconds since this process was started (Linux), else 0"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# Reference point for startup timings: process start, so interpreter and
+# import time count towards time-to-first-response
+PROCESS_STARTED = time.perf_counter() - _process_age()
+# Log a warning when the first response takes longer than this
+STARTUP_WARN_SECONDS = float(os.getenv("STARTUP_WARN_SECONDS", "2.0"))
+_first_response_seen = False
+
+# Buckets cover fast table point reads up to multi-minute full syncs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Client calls (KeyVaultClient, AzureTableClient, EmailClient)
+CLIENT_CALL_SECONDS = Histogram(
+    "kvs_client_call_seconds",
+    "Latency of outbound client calls",
+    ["client", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+CLIENT_CALL_ERRORS = Counter(
+    "kvs_client_call_errors_total",
+    "Outbound client calls that raised",
+    ["client", "operation"]
+)
+
+# HTTP requests, labeled by route template to keep cardinality bounded
+HTTP_REQUEST_SECONDS = Histogram(
+    "kvs_http_request_seconds",
+    "Latency of API requests",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+# Pipeline runs (sync_inventory / process_alerts)
+PIPELINE_RUN_SECONDS = Histogram(
+    "kvs_pipeline_run_seconds",
+    "Duration of a full pipeline run",
+    ["pipeline"],
+    buckets=LATENCY_BUCKETS
+)
+# No vault label: buckets x stages x vaults would be thousands of series.
+# Per-vault detail lives in the single-series object counters instead.
+PIPELINE_STAGE_SECONDS = Histogram(
+    "kvs_pipeline_stage_seconds",
+    "Duration of a single pipeline stage",
+    ["pipeline", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+PIPELINE_OBJECTS = Counter(
+    "kvs_pipeline_objects_total",
+    "Objects handled by a pipeline stage",
+    ["pipeline", "stage", "vault"]
+)
+
+STARTUP_SECONDS = Gauge(
+    "kvs_startup_seconds",
+    "Seconds from process start to a startup milestone",
+    ["phase"],
+    multiprocess_mode="max"
+)
+LIVE_CLIENTS = Gauge(
+    "kvs_live_clients",
+    "Dashboard clients connected to the live update stream",
+    multiprocess_mode="livesum"
+)
+
+
+def instrumented(client: str, operation: Optional[str] = None):
+    """Decorator timing an async client method and counting its failures"""
+    def decorator(func):
+        op = operation or func.__name__
+        histogram = CLIENT_CALL_SECONDS.labels(client, op)
+        errors = CLIENT_CALL_ERRORS.labels(client, op)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def track_call(client: str, operation: str):
+    """Time an inline client call that is not a method of its own"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        CLIENT_CALL_ERRORS.labels(client, operation).inc()
+        raise
+    finally:
+        CLIENT_CALL_SECONDS.labels(client, operation).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_stage(pipeline: str, stage: str):
+    """Time one stage of a pipeline run"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(pipeline, stage).observe(time.perf_counter() - start)
+
+
+def mark_startup_phase(phase: str) -> float:
+    """Record how long after process start a startup milestone was reached"""
+    elapsed = time.perf_counter() - PROCESS_STARTED
+    STARTUP_SECONDS.labels(phase).set(elapsed)
+    return elapsed
+
+
+def count_objects(pipeline: str, stage: str, count: int, vault: str = "") -> None:
+    """Add to the object counter of a pipeline stage"""
+    if count:
+        PIPELINE_OBJECTS.labels(pipeline, stage, vault).inc(count)
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Record per-endpoint request latency"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+        global _first_response_seen
+        if not _first_response_seen:
+            _first_response_seen = True
+            elapsed = mark_startup_phase("first_response")
+            if elapsed > STARTUP_WARN_SECONDS:
+                logger.warning(f"Time to first response {elapsed:.2f}s is over {STARTUP_WARN_SECONDS:.2f}s")
+            else:
+                logger.info(f"Time to first response {elapsed:.2f}s")
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Expose metrics in the Prometheus text format"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several uvicorn workers: aggregate the per-process metric files
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,223 @@
+# src/models/records.py
+
+import sys
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional
+
+if TYPE_CHECKING:
+    from src.models.entities import KeyVaultObjectEntity
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Vault, owner and type values repeat across thousands of objects
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _days_remaining(expiration: Optional[datetime], now: datetime) -> Optional[int]:
+    if isinstance(expiration, datetime):
+        return (expiration - now).days
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class KeyVaultObjectRecord:
+    """
+    Compact in-memory representation of a Key Vault object.
+    Used by clients and services; converted to KeyVaultObjectEntity
+    only when written to or read from table storage.
+    """
+    vault_name: str
+    object_name: str
+    object_type: str                          # "Secret" or "Certificate"
+    subscription_id: str
+    expiration_date: Optional[datetime] = None
+    days_remaining: Optional[int] = None
+    owner: Optional[str] = None
+    distribution_email: Optional[str] = None
+    issuer: Optional[str] = None              # Certificates only
+    thumbprint: Optional[str] = None          # Certificates only
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    last_alert_sent: Optional[datetime] = None
+
+    @property
+    def row_key(self) -> str:
+        return self.make_row_key(self.object_name, self.object_type)
+
+    @staticmethod
+    def make_row_key(object_name: str, object_type: str) -> str:
+        return f"{object_name}_{object_type}"
+
+    @classmethod
+    def from_properties(cls,
+                        properties: Any,
+                        object_type: str,
+                        vault_name: str,
+                        subscription_id: str,
+                        now: datetime,
+                        issuer: Optional[str] = None,
+                        thumbprint: Optional[str] = None) -> "KeyVaultObjectRecord":
+        """Build a record from SecretProperties / CertificateProperties"""
+        tags = properties.tags or {}
+        return cls(
+            vault_name=_intern(vault_name),
+            object_name=properties.name,
+            object_type=_intern(object_type),
+            subscription_id=_intern(subscription_id),
+            expiration_date=properties.expires_on,
+            days_remaining=_days_remaining(properties.expires_on, now),
+            owner=_intern(tags.get("owner") or tags.get("Owner")),
+            distribution_email=_intern(tags.get("distribution_email") or tags.get("DistributionEmail")),
+            issuer=_intern(issuer),
+            thumbprint=thumbprint,
+            created_at=properties.created_on or now,
+            updated_at=now
+        )
+
+    @classmethod
+    def from_entity(cls, entity: Mapping[str, Any]) -> "KeyVaultObjectRecord":
+        """Convert a table entity read from storage"""
+        get = entity.get
+        return cls(
+            vault_name=_intern(get("vault_name") or get("PartitionKey")),
+            object_name=get("object_name"),
+            object_type=_intern(get("object_type")),
+            subscription_id=_intern(get("subscription_id")),
+            expiration_date=get("expiration_date"),
+            days_remaining=get("days_remaining"),
+            owner=_intern(get("owner")),
+            distribution_email=_intern(get("distribution_email")),
+            issuer=_intern(get("issuer")),
+            thumbprint=get("thumbprint"),
+            created_at=get("created_at"),
+            updated_at=get("updated_at"),
+            last_alert_sent=get("last_alert_sent")
+        )
+
+    def to_entity(self, updated_at: Optional[datetime] = None) -> "KeyVaultObjectEntity":
+        """Convert to a table entity for writing to storage"""
+        # Imported here so the Tables SDK loads only once storage is used
+        from src.models.entities import KeyVaultObjectEntity
+        entity = KeyVaultObjectEntity(
+            PartitionKey=self.vault_name,  # Partition by vault for efficient queries
+            RowKey=self.row_key,           # Unique identifier
+            object_name=self.object_name,
+            object_type=self.object_type,
+            vault_name=self.vault_name,
+            subscription_id=self.subscription_id,
+            expiration_date=self.expiration_date,
+            days_remaining=self.days_remaining,
+            owner=self.owner,
+            distribution_email=self.distribution_email,
+            issuer=self.issuer,
+            thumbprint=self.thumbprint,
+            created_at=self.created_at,
+            updated_at=updated_at or self.updated_at or datetime.now(timezone.utc)
+        )
+        # Omitted when unset so a merge upsert keeps the stored value
+        if self.last_alert_sent is not None:
+            entity["last_alert_sent"] = self.last_alert_sent
+        return entity
+
+    def to_alert_payload(self, days_remaining: Optional[int] = None) -> Dict[str, Any]:
+        """Fields included in alert emails; days_remaining overrides the stored value"""
+        return {
+            "object_name": self.object_name,
+            "object_type": self.object_type,
+            "vault_name": self.vault_name,
+            "expiration_date": self.expiration_date,
+            "days_remaining": self.days_remaining if days_remaining is None else days_remaining,
+            "issuer": self.issuer,
+            "thumbprint": self.thumbprint
+        }
+
+    def with_alert_sent(self, sent_at: datetime) -> "KeyVaultObjectRecord":
+        return replace(self, last_alert_sent=sent_at)
+
+
+def alert_log_day(moment: datetime) -> str:
+    """Alert log partition (UTC day) containing a moment"""
+    return moment.astimezone(timezone.utc).strftime("%Y%m%d")
+
+
+@dataclass(frozen=True, slots=True)
+class AlertLogEntry:
+    """
+    One alert sent for one object, as recorded in the append-only alert
+    log. Partitioned by UTC day; the row key sorts by send time.
+    """
+    sent_at: datetime
+    recipient: str
+    vault_name: str
+    object_name: str
+    object_type: str
+    days_remaining: Optional[int] = None
+    expiration_date: Optional[datetime] = None
+    row_key: str = ""
+
+    @classmethod
+    def for_record(cls,
+                   record: KeyVaultObjectRecord,
+                   recipient: str,
+                   sent_at: datetime,
+                   days_remaining: Optional[int] = None) -> "AlertLogEntry":
+        # Time of day first so a day's rows sort chronologically; the
+        # random suffix keeps concurrent writers from colliding
+        sent_at = sent_at.astimezone(timezone.utc)
+        return cls(
+            sent_at=sent_at,
+            recipient=recipient,
+            vault_name=record.vault_name,
+            object_name=record.object_name,
+            object_type=record.object_type,
+            days_remaining=record.days_remaining if days_remaining is None else days_remaining,
+            expiration_date=record.expiration_date,
+            row_key=f"{sent_at:%H%M%S%f}_{uuid.uuid4().hex[:12]}"
+        )
+
+    @property
+    def partition_key(self) -> str:
+        return alert_log_day(self.sent_at)
+
+    @classmethod
+    def from_entity(cls, entity: Mapping[str, Any]) -> "AlertLogEntry":
+        get = entity.get
+        return cls(
+            sent_at=get("sent_at"),
+            recipient=get("recipient"),
+            vault_name=_intern(get("vault_name")),
+            object_name=get("object_name"),
+            object_type=_intern(get("object_type")),
+            days_remaining=get("days_remaining"),
+            expiration_date=get("expiration_date"),
+            row_key=get("RowKey", "")
+        )
+
+    def to_entity(self) -> Dict[str, Any]:
+        entity = {
+            "PartitionKey": self.partition_key,
+            "RowKey": self.row_key,
+            "sent_at": self.sent_at,
+            "recipient": self.recipient,
+            "vault_name": self.vault_name,
+            "object_name": self.object_name,
+            "object_type": self.object_type,
+            "days_remaining": self.days_remaining
+        }
+        if self.expiration_date is not None:
+            entity["expiration_date"] = self.expiration_date
+        return entity
+
+    def to_history_item(self) -> Dict[str, Any]:
+        """Shape returned by /api/alerts/history"""
+        return {
+            "object_name": self.object_name,
+            "object_type": self.object_type,
+            "vault_name": self.vault_name,
+            "recipient": self.recipient,
+            "alert_sent_at": self.sent_at,
+            "days_remaining_when_sent": self.days_remaining,
+            "expiration_date": self.expiration_date
+        }
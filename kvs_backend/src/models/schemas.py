@@ -9,6 +9,11 @@ class ObjectType(str, Enum):
     SECRET = "Secret"
     CERTIFICATE = "Certificate"
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    PARQUET = "parquet"
+
 class ExpirationWindow(str, Enum):
     DAYS_30 = "30"
     DAYS_60 = "60" 
@@ -42,6 +47,8 @@ class QueryFilters(BaseModel):
     vault_name: Optional[str] = None
     search_text: Optional[str] = None
     object_type: Optional[ObjectType] = None
+    object_name: Optional[str] = None       # Exact name: point read with vault_name
+    name_prefix: Optional[str] = None       # Name prefix: RowKey range
 
 class PaginatedResponse(BaseModel):
     items: List[KeyVaultObjectResponse]
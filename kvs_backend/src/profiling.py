@@ -0,0 +1,226 @@
+# src/profiling.py
+
+import os
+import sys
+import hmac
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+
+from fastapi import Header, HTTPException
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response
+
+logger = logging.getLogger(__name__)
+
+# Admin secret; profiling stays fully disabled while it is unset
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+# When set, per-request profiles are written here instead of returned inline
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR")
+# Continuous pipeline sampling rate in Hz, 0 disables it
+PROFILE_SAMPLING_HZ = float(os.getenv("PROFILE_SAMPLING_HZ", "0"))
+
+# Per-request trigger, distinct from the admin header so admin calls are not
+# profiled. Header only: query strings end up in access logs.
+PROFILE_HEADER = "X-Profile"
+
+
+def _is_admin(token: Optional[str]) -> bool:
+    if not PROFILING_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Dependency gating admin-only profiling endpoints"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not _is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+async def profiling_middleware(request: Request, call_next):
+    """Profile a single request when it carries a valid admin token"""
+    if not _is_admin(request.headers.get(PROFILE_HEADER)):
+        return await call_next(request)
+
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        logger.warning("Profiling requested but pyinstrument is not installed")
+        return await call_next(request)
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        response = await call_next(request)
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            # Never ends: draining it would hold the request and the profiler open
+            logger.warning(f"Not profiling event stream {request.url.path}")
+            return response
+        # Drain the body so serialization is part of the profile
+        body = b"".join([chunk async for chunk in response.body_iterator])
+    finally:
+        profiler.stop()
+
+    if not PROFILE_OUTPUT_DIR:
+        return HTMLResponse(profiler.output_html())
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    route = request.url.path.strip("/").replace("/", "_") or "root"
+    path = os.path.join(PROFILE_OUTPUT_DIR, f"{stamp}_{route}.html")
+    await asyncio.to_thread(_write_profile, path, profiler.output_html())
+    logger.info(f"Stored request profile at {path}")
+
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    headers["X-Profile-Path"] = path
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+def _write_profile(path: str, html: str) -> None:
+    os.makedirs(PROFILE_OUTPUT_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def _current_owner() -> Union[asyncio.Task, int]:
+    """The task running a pipeline, or the thread when called outside a loop"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task if task is not None else threading.get_ident()
+
+
+class PipelineSampler:
+    """
+    Low-rate stack sampler aggregating collapsed stacks per pipeline.
+    Pipelines are coroutines sharing the event loop thread with requests,
+    so samples follow the pipeline's task: its await chain is recorded
+    whether it is running or suspended (the leaf then names what it
+    awaits), and other tasks on the same thread are never attributed.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Dict[str, Counter] = {}
+        self._active: Dict[Union[asyncio.Task, int], List[str]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def enter(self, pipeline: str) -> None:
+        owner = _current_owner()
+        with self._lock:
+            self._active.setdefault(owner, []).append(pipeline)
+            self.stacks.setdefault(pipeline, Counter())
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pipeline-sampler", daemon=True)
+                self._thread.start()
+
+    def exit(self, pipeline: str) -> None:
+        owner = _current_owner()
+        with self._lock:
+            pipelines = self._active.get(owner, [])
+            if pipeline in pipelines:
+                pipelines.remove(pipeline)
+            if not pipelines:
+                self._active.pop(owner, None)
+
+    def collapsed(self, pipeline: str) -> str:
+        """Aggregated samples in the collapsed-stack format used by flamegraph tools"""
+        with self._lock:
+            counts = dict(self.stacks.get(pipeline, {}))
+        return "\n".join(f"{stack} {count}" for stack, count in counts.items())
+
+    def reset(self, pipeline: str) -> None:
+        with self._lock:
+            self.stacks.pop(pipeline, None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = {owner: list(names) for owner, names in self._active.items()}
+            frames = sys._current_frames()
+            for owner, pipelines in active.items():
+                if isinstance(owner, asyncio.Task):
+                    stack = None if owner.done() else self._task_stack(owner, frames)
+                else:
+                    frame = frames.get(owner)
+                    stack = None if frame is None else ";".join(reversed(self._frame_names(frame)))
+                if not stack:
+                    continue
+                with self._lock:
+                    for pipeline in pipelines:
+                        self.stacks[pipeline][stack] += 1
+
+    @staticmethod
+    def _name(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    @classmethod
+    def _frame_names(cls, frame) -> List[str]:
+        """Names from `frame` outwards, innermost first"""
+        names = []
+        while frame is not None:
+            names.append(cls._name(frame))
+            frame = frame.f_back
+        return names
+
+    @classmethod
+    def _task_stack(cls, task: asyncio.Task, frames: Dict[int, object]) -> str:
+        """Collapsed await chain of a task, plus the synchronous calls below it while it runs"""
+        names = []
+        awaitable = task.get_coro()
+        innermost = None
+        while awaitable is not None:
+            frame = (getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+                     or getattr(awaitable, "ag_frame", None))
+            if frame is None:
+                # A future: the pipeline is suspended waiting on it
+                names.append(f"<{type(awaitable).__name__}>")
+                break
+            names.append(cls._name(frame))
+            innermost = frame
+            awaitable = (getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+                         or getattr(awaitable, "ag_await", None))
+        else:
+            if innermost is not None:
+                # Running right now: add what the innermost coroutine is calling
+                for frame in frames.values():
+                    below = []
+                    while frame is not None and frame is not innermost:
+                        below.append(cls._name(frame))
+                        frame = frame.f_back
+                    if frame is innermost:
+                        names.extend(reversed(below))
+                        break
+        return ";".join(names)
+
+
+pipeline_sampler: Optional[PipelineSampler] = (
+    PipelineSampler(1.0 / PROFILE_SAMPLING_HZ) if PROFILE_SAMPLING_HZ > 0 else None
+)
+
+
+@contextmanager
+def sample_pipeline(pipeline: str):
+    """Attribute stack samples taken during a pipeline run to that pipeline"""
+    if pipeline_sampler is None:
+        yield
+        return
+    pipeline_sampler.enter(pipeline)
+    try:
+        yield
+    finally:
+        pipeline_sampler.exit(pipeline)
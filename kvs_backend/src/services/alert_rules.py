@@ -0,0 +1,252 @@
+# src/services/alert_rules.py
+
+import os
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.models.records import KeyVaultObjectRecord
+
+logger = logging.getLogger(__name__)
+
+US_PER_DAY = 86_400_000_000
+# Sentinel for "no value" in the int64 microsecond arrays
+MISSING = np.iinfo(np.int64).min
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_US = timedelta(microseconds=1)
+
+# Matches the behaviour before rules were configurable: one warning when an
+# object enters the 60-day window, then a daily reminder from 30 days out
+DEFAULT_RULES: Dict[str, Any] = {
+    "rules": [
+        {"name": "reminder", "max_days": 30, "repeat_days": 1},
+        {"name": "warning", "max_days": 60, "min_days": 30}
+    ],
+    "quiet_periods": []
+}
+
+
+def _to_us(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // ONE_US
+
+
+def _us_column(values: List[Optional[datetime]]) -> np.ndarray:
+    """int64 microseconds of a datetime column, MISSING for None"""
+    try:
+        # Stored timestamps are UTC-aware: plain arithmetic, no call per value
+        return np.fromiter(
+            ((value - EPOCH) // ONE_US if value is not None else MISSING for value in values),
+            dtype=np.int64, count=len(values)
+        )
+    except TypeError:
+        # Some naive datetime: take the slower path that assumes UTC
+        return np.fromiter(
+            (_to_us(value) if value is not None else MISSING for value in values),
+            dtype=np.int64, count=len(values)
+        )
+
+
+def _parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True, slots=True)
+class AlertRule:
+    """
+    Alert while min_days < days remaining <= max_days (expired objects
+    have negative days). repeat_days=None alerts once per window.
+    """
+    name: str
+    max_days: int
+    min_days: Optional[int] = None
+    repeat_days: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "AlertRule":
+        return cls(
+            name=data["name"],
+            max_days=int(data["max_days"]),
+            min_days=int(data["min_days"]) if data.get("min_days") is not None else None,
+            repeat_days=float(data["repeat_days"]) if data.get("repeat_days") is not None else None
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class QuietPeriod:
+    """
+    No alerts while every given constraint holds (UTC): an absolute
+    [start, end) range, days of the week (Monday=0) and/or a daily hour
+    range [start_hour, end_hour), which may wrap past midnight.
+    """
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    weekdays: Optional[frozenset] = None
+    hours: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "QuietPeriod":
+        return cls(
+            start=_parse_datetime(data["start"]) if data.get("start") else None,
+            end=_parse_datetime(data["end"]) if data.get("end") else None,
+            weekdays=frozenset(data["weekdays"]) if data.get("weekdays") is not None else None,
+            hours=tuple(data["hours"]) if data.get("hours") is not None else None
+        )
+
+    def is_active(self, now: datetime) -> bool:
+        if self.start and now < self.start:
+            return False
+        if self.end and now >= self.end:
+            return False
+        if self.weekdays is not None and now.weekday() not in self.weekdays:
+            return False
+        if self.hours is not None:
+            start_hour, end_hour = self.hours
+            if start_hour <= end_hour:
+                return start_hour <= now.hour < end_hour
+            return now.hour >= start_hour or now.hour < end_hour
+        return True
+
+
+@dataclass(frozen=True, slots=True)
+class RulePolicy:
+    """Rules and quiet periods applying to one scope (default, a vault or an owner)"""
+    rules: Tuple[AlertRule, ...]
+    quiet_periods: Tuple[QuietPeriod, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], base: Optional["RulePolicy"] = None) -> "RulePolicy":
+        # Overrides inherit whatever they do not redefine from the default policy
+        rules = (tuple(AlertRule.from_dict(r) for r in data["rules"])
+                 if "rules" in data else base.rules)
+        quiet = (tuple(QuietPeriod.from_dict(q) for q in data["quiet_periods"])
+                 if "quiet_periods" in data else base.quiet_periods)
+        return cls(rules=rules, quiet_periods=quiet)
+
+    def is_quiet(self, now: datetime) -> bool:
+        return any(period.is_active(now) for period in self.quiet_periods)
+
+
+@dataclass
+class AlertRuleSet:
+    """
+    Declarative alert configuration: a default policy plus overrides keyed
+    "vault:<name>" or "owner:<email>". A vault override wins over an owner
+    override; the first rule whose window contains an object applies.
+    """
+    default: RulePolicy
+    vault_overrides: Dict[str, RulePolicy] = field(default_factory=dict)
+    owner_overrides: Dict[str, RulePolicy] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "AlertRuleSet":
+        default = RulePolicy.from_dict(data, RulePolicy.from_dict(DEFAULT_RULES))
+        rule_set = cls(default=default)
+        for scope, override in (data.get("overrides") or {}).items():
+            kind, _, key = scope.partition(":")
+            policy = RulePolicy.from_dict(override, default)
+            if kind == "vault":
+                rule_set.vault_overrides[key] = policy
+            elif kind == "owner":
+                rule_set.owner_overrides[key.lower()] = policy
+            else:
+                raise ValueError(f"Unknown alert rule override scope: {scope}")
+        return rule_set
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "AlertRuleSet":
+        """Rules from ALERT_RULES_PATH (JSON), or the built-in defaults"""
+        path = path or os.getenv("ALERT_RULES_PATH")
+        if not path:
+            return cls.from_dict(DEFAULT_RULES)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except Exception as e:
+            logger.error(f"Failed to load alert rules from {path}: {e}")
+            raise
+
+    def compile(self, now: datetime) -> "CompiledRules":
+        return CompiledRules(self, now)
+
+
+class CompiledRules:
+    """
+    A rule set bound to a single "now", evaluated over whole columns of
+    expiry and last-alert timestamps at once rather than per object.
+    """
+
+    def __init__(self, rule_set: AlertRuleSet, now: datetime):
+        self.now = now
+        self.now_us = _to_us(now)
+        # Policy 0 is the default; overrides follow
+        self.policies: List[RulePolicy] = [rule_set.default]
+        self._vault_index = self._index(rule_set.vault_overrides)
+        self._owner_index = self._index(rule_set.owner_overrides)
+
+    def _index(self, overrides: Mapping[str, RulePolicy]) -> Dict[str, int]:
+        index = {}
+        for key, policy in overrides.items():
+            index[key] = len(self.policies)
+            self.policies.append(policy)
+        return index
+
+    def policy_indices(self, records: Sequence[KeyVaultObjectRecord]) -> np.ndarray:
+        vault_index, owner_index = self._vault_index, self._owner_index
+        if not vault_index and not owner_index:
+            return np.zeros(len(records), dtype=np.int32)
+        return np.fromiter(
+            (vault_index.get(r.vault_name) or owner_index.get((r.owner or "").lower(), 0) for r in records),
+            dtype=np.int32, count=len(records)
+        )
+
+    @staticmethod
+    def timestamp_arrays(records: Sequence[KeyVaultObjectRecord]) -> Tuple[np.ndarray, np.ndarray]:
+        """Expiry and last-alert times as int64 microseconds, MISSING when unset"""
+        return (_us_column([r.expiration_date for r in records]),
+                _us_column([r.last_alert_sent for r in records]))
+
+    def days_remaining(self, expiry: np.ndarray) -> np.ndarray:
+        # Floor division, same as timedelta.days
+        return np.floor_divide(expiry - self.now_us, US_PER_DAY)
+
+    def evaluate(self,
+                 expiry: np.ndarray,
+                 last_alert: np.ndarray,
+                 policy: np.ndarray,
+                 force_send: bool = False) -> np.ndarray:
+        """
+        Boolean mask of objects due an alert. force_send ignores cadence
+        and quiet periods but still requires an object to be in a window.
+        """
+        has_expiry = expiry != MISSING
+        never_alerted = last_alert == MISSING
+        days = self.days_remaining(expiry)
+        since_alert = self.now_us - last_alert
+        due = np.zeros(len(expiry), dtype=bool)
+
+        for index, rule_policy in enumerate(self.policies):
+            in_policy = has_expiry & (policy == index)
+            if not force_send and rule_policy.is_quiet(self.now):
+                continue
+            matched = np.zeros(len(expiry), dtype=bool)
+            for rule in rule_policy.rules:
+                in_window = in_policy & ~matched & (days <= rule.max_days)
+                if rule.min_days is not None:
+                    in_window &= days > rule.min_days
+                matched |= in_window
+                if force_send:
+                    due |= in_window
+                elif rule.repeat_days is None:
+                    # Once per window: nothing sent since the object entered it
+                    window_start = expiry - rule.max_days * US_PER_DAY
+                    due |= in_window & (never_alerted | (last_alert < window_start))
+                else:
+                    due |= in_window & (never_alerted | (since_alert >= int(rule.repeat_days * US_PER_DAY)))
+        return due
@@ -1,23 +1,44 @@
 # src/services/alert_service.py
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
 import logging
 
-from src.clients.table_client import AzureTableClient
+import numpy as np
+
+from src.clients.storage_backend import StorageBackend
+from src.clients.query_planner import ALERT_COLUMNS
 from src.clients.email_client import EmailClient
+from src.models.records import AlertLogEntry, KeyVaultObjectRecord
+from src.services.alert_rules import AlertRuleSet, CompiledRules
+from src.services.change_feed import ALERTED, ChangeFeed, ObjectChange
+from src.metrics import PIPELINE_RUN_SECONDS, track_stage, count_objects
+from src.profiling import sample_pipeline
 
 logger = logging.getLogger(__name__)
 
 class AlertService:
-    def __init__(self, table_client: AzureTableClient, email_client: EmailClient):
+    def __init__(self,
+                 table_client: StorageBackend,
+                 email_client: EmailClient,
+                 rules: Optional[AlertRuleSet] = None,
+                 change_feed: Optional[ChangeFeed] = None):
         self.table_client = table_client
         self.email_client = email_client
+        self.rules = rules or AlertRuleSet.load()
+        self.change_feed = change_feed
         
     async def process_alerts(self, 
                            object_names: Optional[List[str]] = None,
                            force_send: bool = False) -> Dict[str, Any]:
         """Execute Pipeline ② - Alert Notification"""
+        with PIPELINE_RUN_SECONDS.labels("alerts").time(), sample_pipeline("alerts"):
+            return await self._process_alerts(object_names, force_send)
+
+    async def _process_alerts(self,
+                            object_names: Optional[List[str]] = None,
+                            force_send: bool = False) -> Dict[str, Any]:
         try:
             alert_stats = {
                 "objects_checked": 0,
@@ -26,47 +47,53 @@ class AlertService:
                 "recipients_notified": set()
             }
             
-            # Get all entities that might need alerts
-            query_result = await self.table_client.query_entities(
-                filters=None,  # Get all to check expiration rules
-                page_size=1000  # Large page size to get most entities
-            )
-            
-            entities = query_result["entities"]
-            
-            # Filter entities that need alerts
-            entities_needing_alerts = []
-            for entity in entities:
-                if object_names and entity.get("object_name") not in object_names:
-                    continue
-                    
-                if self._should_send_alert(entity, force_send):
-                    entities_needing_alerts.append(entity)
-                    
-                alert_stats["objects_checked"] += 1
+            # Load every object: rules need all expiries, not just one page.
+            # Timestamp columns are extracted in the same worker thread.
+            compiled = self.rules.compile(datetime.now(timezone.utc))
+            with track_stage("alerts", "load_entities"):
+                records, expiry, last_alert, policy = await asyncio.to_thread(
+                    self._load_columns, compiled, object_names
+                )
+
+            with track_stage("alerts", "evaluate_rules"):
+                due = np.flatnonzero(compiled.evaluate(expiry, last_alert, policy, force_send))
+                # Stored days_remaining dates from the last sync; emails use current values
+                current_days = compiled.days_remaining(expiry[due]).tolist()
+                records_needing_alerts = [(records[i], days) for i, days in zip(due.tolist(), current_days)]
+            alert_stats["objects_checked"] = len(records)
+
+            count_objects("alerts", "checked", alert_stats["objects_checked"])
+            count_objects("alerts", "eligible", len(records_needing_alerts))
             
             # Group by recipient for batch emails
-            alerts_by_recipient = {}
-            for entity in entities_needing_alerts:
-                recipient = entity.get("distribution_email")
-                if not recipient:
-                    recipient = entity.get("owner")
+            alerts_by_recipient: Dict[str, List[Tuple[KeyVaultObjectRecord, int]]] = {}
+            for record, days in records_needing_alerts:
+                recipient = record.distribution_email or record.owner
                     
                 if recipient:
-                    if recipient not in alerts_by_recipient:
-                        alerts_by_recipient[recipient] = []
-                    alerts_by_recipient[recipient].append(entity)
+                    alerts_by_recipient.setdefault(recipient, []).append((record, days))
+            
+            # Every send is recorded in the alert log, written once per run
+            log_entries: List[AlertLogEntry] = []
             
             # Send alerts
-            for recipient, recipient_entities in alerts_by_recipient.items():
+            for recipient, recipient_records in alerts_by_recipient.items():
                 try:
-                    success = await self._send_alert_email(recipient, recipient_entities)
+                    with track_stage("alerts", "send_email"):
+                        success = await self._send_alert_email(recipient, recipient_records)
                     if success:
-                        alert_stats["alerts_sent"] += len(recipient_entities)
+                        count_objects("alerts", "sent", len(recipient_records))
+                        alert_stats["alerts_sent"] += len(recipient_records)
                         alert_stats["recipients_notified"].add(recipient)
+                        sent_at = datetime.now(timezone.utc)
+                        log_entries.extend(
+                            AlertLogEntry.for_record(record, recipient, sent_at, days)
+                            for record, days in recipient_records
+                        )
                         
                         # Update last_alert_sent timestamp
-                        await self._update_alert_timestamps(recipient_entities)
+                        with track_stage("alerts", "update_timestamps"):
+                            await self._update_alert_timestamps(recipient_records)
                     else:
                         alert_stats["errors"].append(f"Failed to send email to {recipient}")
                         
@@ -75,6 +102,21 @@ class AlertService:
                     logger.error(error_msg)
                     alert_stats["errors"].append(error_msg)
             
+            if log_entries:
+                try:
+                    with track_stage("alerts", "append_alert_log"):
+                        await self.table_client.append_alert_log(log_entries)
+                except Exception as e:
+                    # The emails went out; don't fail the run over the audit trail
+                    error_msg = f"Failed to record {len(log_entries)} alerts in the alert log: {e}"
+                    logger.error(error_msg)
+                    alert_stats["errors"].append(error_msg)
+            
+            if log_entries and self.change_feed is not None:
+                alerted = [ObjectChange(ALERTED, entry.vault_name, KeyVaultObjectRecord.make_row_key(
+                    entry.object_name, entry.object_type)) for entry in log_entries]
+                await asyncio.to_thread(self.change_feed.publish, alerted)
+            
             alert_stats["recipients_notified"] = list(alert_stats["recipients_notified"])
             alert_stats["alert_processed_at"] = datetime.now(timezone.utc).isoformat()
             
@@ -84,57 +126,26 @@ class AlertService:
             logger.error(f"Alert processing failed: {e}")
             raise
 
-    def _should_send_alert(self, entity: Dict[str, Any], force_send: bool) -> bool:
-        """Determine if an alert should be sent for this entity"""
-        days_remaining = entity.get("days_remaining")
-        
-        if days_remaining is None:
-            return False
-            
-        # Check expiration rules
-        should_alert = False
-        
-        # 60 days warning
-        if days_remaining <= 60 and days_remaining > 30:
-            should_alert = True
-            
-        # 30 days daily reminder
-        elif days_remaining <= 30:
-            should_alert = True
-        
-        if not should_alert:
-            return False
-            
-        # Check if we've sent an alert recently (unless forced)
-        if not force_send:
-            last_alert = entity.get("last_alert_sent")
-            if last_alert:
-                # For 30-day reminders, send daily
-                if days_remaining <= 30:
-                    one_day_ago = datetime.now(timezone.utc) - timedelta(days=1)
-                    if last_alert > one_day_ago:
-                        return False
-                # For 60-day warning, send once
-                else:
-                    return False
-                    
-        return True
+    def _load_columns(self,
+                      compiled: CompiledRules,
+                      object_names: Optional[List[str]] = None
+                      ) -> Tuple[List[KeyVaultObjectRecord], np.ndarray, np.ndarray, np.ndarray]:
+        """All stored objects (optionally some names) and their rule columns (blocking)"""
+        wanted = set(object_names) if object_names else None
+        records: List[KeyVaultObjectRecord] = []
+        for page in self.table_client.iter_record_pages(select=ALERT_COLUMNS):
+            if wanted is not None:
+                page = [r for r in page if r.object_name in wanted]
+            records.extend(page)
+        # Columns are converted once over the whole load, not page by page
+        expiry, last_alert = compiled.timestamp_arrays(records)
+        return records, expiry, last_alert, compiled.policy_indices(records)
 
-    async def _send_alert_email(self, recipient: str, entities: List[Dict[str, Any]]) -> bool:
+    async def _send_alert_email(self, recipient: str, records: List[Tuple[KeyVaultObjectRecord, int]]) -> bool:
         """Send alert email to recipient"""
         try:
             # Prepare email data
-            objects_data = []
-            for entity in entities:
-                objects_data.append({
-                    "object_name": entity.get("object_name"),
-                    "object_type": entity.get("object_type"),
-                    "vault_name": entity.get("vault_name"),
-                    "expiration_date": entity.get("expiration_date"),
-                    "days_remaining": entity.get("days_remaining"),
-                    "issuer": entity.get("issuer"),
-                    "thumbprint": entity.get("thumbprint")
-                })
+            objects_data = [record.to_alert_payload(days) for record, days in records]
             
             return await self.email_client.send_alert_email(recipient, objects_data)
             
@@ -142,13 +153,13 @@ class AlertService:
             logger.error(f"Failed to send alert email to {recipient}: {e}")
             return False
 
-    async def _update_alert_timestamps(self, entities: List[Dict[str, Any]]) -> None:
-        """Update last_alert_sent timestamp for entities"""
+    async def _update_alert_timestamps(self, records: List[Tuple[KeyVaultObjectRecord, int]]) -> None:
+        """Update last_alert_sent timestamp for objects"""
         try:
             now = datetime.now(timezone.utc)
-            for entity in entities:
-                entity["last_alert_sent"] = now
-                await self.table_client.upsert_entity(entity)
+            # The run read a projection: merge only last_alert_sent, keeping the rest stored
+            await self.table_client.batch_merge(
+                [record.with_alert_sent(now) for record, _ in records], ["last_alert_sent"]
+            )
         except Exception as e:
             logger.error(f"Failed to update alert timestamps: {e}")
-
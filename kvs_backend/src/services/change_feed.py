@@ -0,0 +1,193 @@
+# src/services/change_feed.py
+
+import os
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.clients.snapshot_store import InventorySnapshot
+from src.models.records import KeyVaultObjectRecord
+
+logger = logging.getLogger(__name__)
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+# last_alert_sent was updated by an alert run
+ALERTED = "alerted"
+# Entries were trimmed before this worker read them: reload from storage
+RESET = "reset"
+
+
+def _content(record: KeyVaultObjectRecord) -> tuple:
+    # Fields that come from Key Vault; days_remaining and timestamps are ours
+    return (record.subscription_id, record.expiration_date, record.owner,
+            record.distribution_email, record.issuer, record.thumbprint)
+
+
+@dataclass(frozen=True, slots=True)
+class ObjectChange:
+    """One entry of the change feed; seq increases monotonically"""
+    kind: str                                 # added, changed, removed, alerted or reset
+    vault_name: str
+    row_key: str
+    seq: int = 0
+    changed_at: Optional[datetime] = None
+
+
+@dataclass
+class VaultDiff:
+    """What a sync found for one vault compared with storage"""
+    vault_name: str
+    added: List[KeyVaultObjectRecord] = field(default_factory=list)
+    changed: List[KeyVaultObjectRecord] = field(default_factory=list)
+    removed: List[KeyVaultObjectRecord] = field(default_factory=list)
+    # Unchanged objects whose stored days_remaining is out of date: refreshed, not published
+    refreshed: List[KeyVaultObjectRecord] = field(default_factory=list)
+
+    @classmethod
+    def compute(cls,
+                vault_name: str,
+                fetched: Iterable[KeyVaultObjectRecord],
+                stored: Dict[str, KeyVaultObjectRecord]) -> "VaultDiff":
+        diff = cls(vault_name)
+        remaining = dict(stored)
+        for record in fetched:
+            previous = remaining.pop(record.row_key, None)
+            if previous is None:
+                diff.added.append(record)
+            elif _content(previous) != _content(record):
+                diff.changed.append(record)
+            elif previous.days_remaining != record.days_remaining:
+                diff.refreshed.append(record)
+        diff.removed = list(remaining.values())
+        return diff
+
+    def changes(self) -> List[ObjectChange]:
+        return (
+            [ObjectChange(ADDED, self.vault_name, r.row_key) for r in self.added]
+            + [ObjectChange(CHANGED, self.vault_name, r.row_key) for r in self.changed]
+            + [ObjectChange(REMOVED, self.vault_name, r.row_key) for r in self.removed]
+        )
+
+
+class ChangeFeed:
+    """
+    Ordered log of inventory changes made by syncs and alert runs, for
+    caches, indexes and live clients to apply incrementally instead of
+    rescanning.
+
+    With a snapshot the log lives in the shared SQLite file, so every
+    worker sees changes made by the leader: poll() (wired to the
+    InvalidationBus) delivers new entries to local subscribers. Without
+    one it is kept in memory for this process only.
+
+    Publishers and pollers run in several threads: batches are queued in
+    seq order under the lock and delivered by one thread at a time, so
+    subscribers always see them in order (a batch queued while another
+    thread is delivering is delivered by that thread).
+    """
+
+    def __init__(self, snapshot: Optional[InventorySnapshot] = None, retain: Optional[int] = None):
+        self.snapshot = snapshot
+        self.retain = retain or int(os.getenv("CHANGE_FEED_RETENTION", "100000"))
+        self._subscribers: List[Callable[[List[ObjectChange]], None]] = []
+        self._buffer: deque = deque(maxlen=self.retain)
+        self._pending: deque = deque()
+        self._dispatching = False
+        self._lock = threading.Lock()
+        self.last_seq = snapshot.change_seq_range()[1] if snapshot is not None else 0
+
+    def subscribe(self, callback: Callable[[List[ObjectChange]], None]) -> None:
+        """Register a callback receiving each new batch of changes"""
+        self._subscribers.append(callback)
+
+    def publish(self, changes: List[ObjectChange]) -> None:
+        """Append changes to the log and notify subscribers"""
+        if not changes:
+            return
+        now = datetime.now(timezone.utc)
+        if self.snapshot is not None:
+            self.snapshot.append_changes(
+                ((c.kind, c.vault_name, c.row_key) for c in changes), now, self.retain
+            )
+            self.poll()
+            return
+        with self._lock:
+            numbered = []
+            for change in changes:
+                self.last_seq += 1
+                numbered.append(ObjectChange(change.kind, change.vault_name, change.row_key, self.last_seq, now))
+            self._buffer.extend(numbered)
+            self._pending.append(numbered)
+        self._drain()
+
+    def poll(self) -> None:
+        """Deliver entries appended to the shared log since the last poll"""
+        if self.snapshot is None:
+            return
+        while True:
+            with self._lock:
+                changes = self.since(self.last_seq)
+                if changes is None:
+                    oldest, newest = self.snapshot.change_seq_range()
+                    if self.last_seq > newest:
+                        logger.warning(f"Change feed restarted at {newest} behind seq {self.last_seq}")
+                        reset_seq = newest
+                    else:
+                        logger.warning(f"Change feed entries {self.last_seq + 1}..{oldest - 1} were trimmed before delivery")
+                        reset_seq = oldest - 1
+                    changes = [ObjectChange(RESET, "", "", reset_seq, datetime.now(timezone.utc))]
+                elif not changes:
+                    break
+                self.last_seq = changes[-1].seq
+                self._pending.append(changes)
+        self._drain()
+
+    def since(self, seq: int, limit: int = 10000) -> Optional[List[ObjectChange]]:
+        """
+        Entries after `seq`, oldest first. None if some of them have
+        already been trimmed, or `seq` is ahead of the log (it was
+        recreated): the caller must reload from storage.
+        """
+        if self.snapshot is not None:
+            oldest, newest = self.snapshot.change_seq_range()
+            if seq > newest or (seq < newest and seq + 1 < oldest):
+                return None
+            return [
+                ObjectChange(kind, vault_name, row_key, change_seq, changed_at)
+                for change_seq, kind, vault_name, row_key, changed_at in self.snapshot.changes_since(seq, limit)
+            ]
+        with self._lock:
+            if seq > self.last_seq or (self._buffer and seq + 1 < self._buffer[0].seq):
+                return None
+            return [c for c in self._buffer if c.seq > seq][:limit]
+
+    def _drain(self) -> None:
+        """Deliver queued batches in order, unless another thread already is"""
+        with self._lock:
+            if self._dispatching:
+                return
+            self._dispatching = True
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._dispatching = False
+                        return
+                    changes = self._pending.popleft()
+                self._dispatch(changes)
+        except BaseException:
+            with self._lock:
+                self._dispatching = False
+            raise
+
+    def _dispatch(self, changes: List[ObjectChange]) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"Change feed subscriber failed: {e}")
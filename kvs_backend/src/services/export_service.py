@@ -0,0 +1,139 @@
+# src/services/export_service.py
+
+import io
+import csv
+import json
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List
+
+from src.models.records import KeyVaultObjectRecord
+from src.models.schemas import ExportFormat
+
+EXPORT_COLUMNS = [f.name for f in fields(KeyVaultObjectRecord)]
+DATETIME_COLUMNS = {"expiration_date", "created_at", "updated_at", "last_alert_sent"}
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+# Parquet row group size; also bounds how many rows are buffered at once
+PARQUET_ROW_GROUP_SIZE = 10_000
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported type {type(value).__name__}")
+
+
+def iter_ndjson(pages: Iterable[List[KeyVaultObjectRecord]]) -> Iterator[bytes]:
+    """One JSON object per line, one chunk per storage page"""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default).encode
+    for records in pages:
+        lines = [
+            dumps({column: getattr(record, column) for column in EXPORT_COLUMNS})
+            for record in records
+        ]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def iter_csv(pages: Iterable[List[KeyVaultObjectRecord]]) -> Iterator[bytes]:
+    """CSV with a header row, one chunk per storage page"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for records in pages:
+        for record in records:
+            writer.writerow([
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in (getattr(record, column) for column in EXPORT_COLUMNS)
+            ])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream handing out what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        # Absolute offset: the Parquet footer records row group positions
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_parquet(pages: Iterable[List[KeyVaultObjectRecord]],
+                 row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """Parquet file streamed one row group at a time (requires pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (column, pa.timestamp("us", tz="UTC") if column in DATETIME_COLUMNS
+         else pa.int64() if column == "days_remaining"
+         else pa.string())
+        for column in EXPORT_COLUMNS
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    columns = {column: [] for column in EXPORT_COLUMNS}
+    buffered = 0
+
+    def flush() -> bytes:
+        writer.write_table(pa.table(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+        return sink.drain()
+
+    try:
+        for records in pages:
+            for record in records:
+                for column, values in columns.items():
+                    values.append(getattr(record, column))
+                buffered += 1
+                if buffered >= row_group_size:
+                    yield flush()
+                    buffered = 0
+        if buffered:
+            yield flush()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+WRITERS = {
+    ExportFormat.NDJSON: iter_ndjson,
+    ExportFormat.CSV: iter_csv,
+    ExportFormat.PARQUET: iter_parquet,
+}
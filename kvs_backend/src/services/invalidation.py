@@ -0,0 +1,60 @@
+# src/services/invalidation.py
+
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from src.clients.snapshot_store import InventorySnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    """
+    Broadcasts inventory changes to every worker. Workers share the
+    snapshot file, so a commit by any of them (sync, alert timestamps,
+    reconcile) is visible to the others through SQLite's data_version;
+    each worker polls it and notifies its local subscribers.
+    """
+
+    def __init__(self, snapshot: InventorySnapshot, poll_interval: float = 1.0):
+        self.snapshot = snapshot
+        self.poll_interval = poll_interval
+        self._subscribers: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """Register a callback run (in a worker thread) after another worker committed"""
+        self._subscribers.append(callback)
+
+    def publish(self) -> None:
+        for callback in self._subscribers:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Invalidation subscriber failed: {e}")
+
+    def check(self) -> bool:
+        """Pick up changes committed by other workers; True if any"""
+        changed = self.snapshot.has_external_changes()
+        if changed:
+            self.snapshot.reload_meta()
+            self.publish()
+        return changed
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                # PRAGMA data_version and the subscribers' reads are blocking SQLite calls
+                await asyncio.to_thread(self.check)
+            except Exception as e:
+                logger.error(f"Invalidation check failed: {e}")
+
+    def start(self) -> None:
+        self.snapshot.has_external_changes()  # Take the baseline data_version
+        self._task = asyncio.create_task(self._watch())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
@@ -1,42 +1,73 @@
 # src/services/keyvault_service.py
 
 from typing import List, Optional
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+import os
+import asyncio
 import logging
 
 from typing import List, Optional, Dict, Any
-from src.models.entities import KeyVaultObjectEntity
+from src.models.records import KeyVaultObjectRecord
+from src.models.schemas import QueryFilters
 from src.clients.keyvault_client import KeyVaultClient
-from src.clients.table_client import AzureTableClient
+from src.clients.storage_backend import StorageBackend
+from src.clients.query_planner import DIFF_COLUMNS
+from src.services.change_feed import ChangeFeed, VaultDiff
+from src.metrics import PIPELINE_RUN_SECONDS, track_stage, count_objects
+from src.profiling import sample_pipeline
 
 
 logger = logging.getLogger(__name__)
 
+# Delete objects (and whole vaults) that a sync no longer finds in Key Vault
+REMOVE_STALE = os.getenv("SYNC_REMOVE_STALE", "true").lower() != "false"
+
+def new_sync_stats() -> Dict[str, Any]:
+    return {
+        "subscriptions_processed": 0,
+        "vaults_processed": 0,
+        "secrets_synced": 0,
+        "certificates_synced": 0,
+        "objects_added": 0,
+        "objects_changed": 0,
+        "objects_removed": 0,
+        "vaults_removed": 0,
+        "errors": []
+    }
+
 class KeyVaultService:
-    def __init__(self, kv_client: KeyVaultClient, table_client: AzureTableClient):
+    def __init__(self,
+                 kv_client: KeyVaultClient,
+                 table_client: StorageBackend,
+                 change_feed: Optional[ChangeFeed] = None):
         self.kv_client = kv_client
         self.table_client = table_client
+        self.change_feed = change_feed
+        # Set to a ShardedSync when SYNC_MODE=sharded
+        self.sharded_sync = None
         
     async def sync_inventory(self, subscription_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         """Execute Pipeline ① - Inventory Sync"""
+        with PIPELINE_RUN_SECONDS.labels("sync").time(), sample_pipeline("sync"):
+            return await self._sync_inventory(subscription_ids)
+
+    async def _sync_inventory(self, subscription_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         try:
-            sync_stats = {
-                "subscriptions_processed": 0,
-                "vaults_processed": 0,
-                "secrets_synced": 0,
-                "certificates_synced": 0,
-                "errors": []
-            }
+            if self.sharded_sync is not None:
+                return await self.sharded_sync.run(subscription_ids)
+
+            sync_stats = new_sync_stats()
             
             # Get subscriptions to process
-            all_subscriptions = await self.kv_client.list_subscriptions()
-            print("DEBUG subscriptions:", all_subscriptions)
-            target_subscriptions = [
-                sub for sub in all_subscriptions 
-                if not subscription_ids or sub["subscription_id"] in subscription_ids
-            ]
+            target_subscriptions = await self.list_target_subscriptions(subscription_ids)
+            
+            # What storage holds for these subscriptions, to diff each vault against
+            with track_stage("sync", "load_stored"):
+                stored = await asyncio.to_thread(
+                    self._load_stored, {sub["subscription_id"] for sub in target_subscriptions}
+                )
             
-            entities_to_upsert = []
+            diffs: List[VaultDiff] = []
             
             for subscription in target_subscriptions:
                 try:
@@ -44,38 +75,13 @@ class KeyVaultService:
                     logger.info(f"Processing subscription: {sub_id}")
                     
                     # Get all Key Vaults in subscription
-                    vaults = await self.kv_client.list_key_vaults(sub_id)
+                    with track_stage("sync", "list_key_vaults"):
+                        vaults = await self.kv_client.list_key_vaults(sub_id)
                     
                     for vault in vaults:
-                        try:
-                            vault_name = vault["name"]
-                            vault_url = vault["vault_uri"]
-                            
-                            logger.info(f"Processing vault: {vault_name}")
-                            
-                            # Get secrets and certificates
-                            secrets = await self.kv_client.get_secrets(vault_url)
-                            certificates = await self.kv_client.get_certificates(vault_url)
-                            
-                            # Process secrets
-                            for secret in secrets:
-                                entity = self._create_entity(secret, vault_name, sub_id)
-                                entities_to_upsert.append(entity)
-                                sync_stats["secrets_synced"] += 1
-                            
-                            # Process certificates
-                            for cert in certificates:
-                                entity = self._create_entity(cert, vault_name, sub_id)
-                                entities_to_upsert.append(entity)
-                                sync_stats["certificates_synced"] += 1
-                                
-                            sync_stats["vaults_processed"] += 1
-                            
-                        except Exception as e:
-                            error_msg = f"Failed to process vault {vault['name']}: {e}"
-                            logger.error(error_msg)
-                            sync_stats["errors"].append(error_msg)
+                        await self._scan_vault(vault, sub_id, stored, diffs, sync_stats)
                     
+                    diffs.extend(self._deleted_vault_diffs(stored, sub_id, sync_stats))
                     sync_stats["subscriptions_processed"] += 1
                     
                 except Exception as e:
@@ -83,9 +89,7 @@ class KeyVaultService:
                     logger.error(error_msg)
                     sync_stats["errors"].append(error_msg)
             
-            # Batch upsert all entities
-            if entities_to_upsert:
-                await self.table_client.batch_upsert(entities_to_upsert)
+            await self._apply(diffs, sync_stats, complete_sync=not sync_stats["errors"])
             
             sync_stats["sync_completed_at"] = datetime.now(timezone.utc).isoformat()
             return sync_stats
@@ -94,39 +98,153 @@ class KeyVaultService:
             logger.error(f"Inventory sync failed: {e}")
             raise
 
-    def _create_entity(self, obj_data: Dict[str, Any], vault_name: str, subscription_id: str) -> KeyVaultObjectEntity:
-        """Create table entity from Key Vault object data"""
-        now = datetime.now(timezone.utc)
-        
-        # Calculate days remaining
-        days_remaining = None
-        if obj_data.get("expiration_date"):
-            expiration = obj_data["expiration_date"]
-            if isinstance(expiration, datetime):
-                delta = expiration - now
-                days_remaining = delta.days
-        
-        # Extract owner and distribution email from tags
-        tags = obj_data.get("tags", {})
-        owner = tags.get("owner") or tags.get("Owner")
-        distribution_email = tags.get("distribution_email") or tags.get("DistributionEmail")
+    async def list_target_subscriptions(self, subscription_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        with track_stage("sync", "list_subscriptions"):
+            all_subscriptions = await self.kv_client.list_subscriptions()
+        logger.debug(f"Subscriptions available: {all_subscriptions}")
+        return [
+            sub for sub in all_subscriptions 
+            if not subscription_ids or sub["subscription_id"] in subscription_ids
+        ]
+
+    async def sync_vaults(self, vaults: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sync a given list of vaults (one shard of a sharded sync): upsert,
+        remove stale objects and publish their changes. Deleted vaults and
+        completing the sync are left to the coordinator.
+        """
+        with PIPELINE_RUN_SECONDS.labels("sync_shard").time():
+            sync_stats = new_sync_stats()
+            with track_stage("sync", "load_stored"):
+                stored = await asyncio.to_thread(self._load_stored_vaults, [vault["name"] for vault in vaults])
+            diffs: List[VaultDiff] = []
+            for vault in vaults:
+                await self._scan_vault(vault, vault["subscription_id"], stored, diffs, sync_stats)
+            await self._apply(diffs, sync_stats)
+            return sync_stats
+
+    async def remove_deleted_vaults(self, listed: Dict[str, List[str]], complete_sync: bool = False) -> Dict[str, Any]:
+        """
+        Remove stored vaults that their (successfully listed) subscription
+        no longer has; complete_sync makes this the sync's last write
+        """
+        sync_stats = new_sync_stats()
+        with track_stage("sync", "load_stored"):
+            stored = await asyncio.to_thread(self._load_stored, set(listed))
+        diffs: List[VaultDiff] = []
+        for sub_id, vault_names in listed.items():
+            for vault_name in vault_names:
+                stored.pop(vault_name, None)
+            diffs.extend(self._deleted_vault_diffs(stored, sub_id, sync_stats))
+        await self._apply(diffs, sync_stats, complete_sync)
+        return sync_stats
+
+    async def _scan_vault(self,
+                          vault: Dict[str, Any],
+                          sub_id: str,
+                          stored: Dict[str, Dict[str, KeyVaultObjectRecord]],
+                          diffs: List[VaultDiff],
+                          sync_stats: Dict[str, Any]) -> None:
+        """Fetch one vault's objects and diff them against its stored records"""
+        try:
+            vault_name = vault["name"]
+            vault_url = vault["vault_uri"]
+            
+            logger.info(f"Processing vault: {vault_name}")
+            
+            # Get secrets and certificates
+            with track_stage("sync", "get_secrets"):
+                secrets = await self.kv_client.get_secrets(vault_url, vault_name, sub_id)
+            with track_stage("sync", "get_certificates"):
+                certificates = await self.kv_client.get_certificates(vault_url, vault_name, sub_id)
+            count_objects("sync", "secrets", len(secrets), vault_name)
+            count_objects("sync", "certificates", len(certificates), vault_name)
+            
+            diffs.append(VaultDiff.compute(
+                vault_name, secrets + certificates, stored.pop(vault_name, {})
+            ))
+            sync_stats["secrets_synced"] += len(secrets)
+            sync_stats["certificates_synced"] += len(certificates)
+                
+            sync_stats["vaults_processed"] += 1
+            
+        except Exception as e:
+            # Not scanned: keep what storage has for it
+            stored.pop(vault["name"], None)
+            error_msg = f"Failed to process vault {vault['name']}: {e}"
+            logger.error(error_msg)
+            sync_stats["errors"].append(error_msg)
+
+    @staticmethod
+    def _deleted_vault_diffs(stored: Dict[str, Dict[str, KeyVaultObjectRecord]],
+                             sub_id: str,
+                             sync_stats: Dict[str, Any]) -> List[VaultDiff]:
+        """Stored vaults of a listed subscription left unscanned were deleted"""
+        diffs = []
+        for vault_name in [name for name, records in stored.items()
+                           if next(iter(records.values())).subscription_id == sub_id]:
+            diffs.append(VaultDiff(vault_name, removed=list(stored.pop(vault_name).values())))
+            sync_stats["vaults_removed"] += 1
+        return diffs
+
+    async def _apply(self,
+                     diffs: List[VaultDiff],
+                     sync_stats: Dict[str, Any],
+                     complete_sync: bool = False) -> None:
+        """
+        Write added and changed records, delete stale ones and publish the
+        changes. complete_sync bumps the sync generation with the final delete.
+        """
+        # Unchanged objects are not rewritten
+        records_to_upsert = [record for diff in diffs for record in diff.added + diff.changed]
+        if records_to_upsert:
+            with track_stage("sync", "batch_upsert"):
+                await self.table_client.batch_upsert(records_to_upsert)
+            count_objects("sync", "upserted", len(records_to_upsert))
+
+        # Only their stored days_remaining goes out of date as expiry approaches
+        records_to_refresh = [record for diff in diffs for record in diff.refreshed]
+        if records_to_refresh:
+            with track_stage("sync", "batch_merge"):
+                await self.table_client.batch_merge(records_to_refresh, ["days_remaining"])
+            count_objects("sync", "refreshed", len(records_to_refresh))
         
-        # Create entity
-        entity = KeyVaultObjectEntity(
-            PartitionKey=vault_name,  # Partition by vault for efficient queries
-            RowKey=f"{obj_data['object_name']}_{obj_data['object_type']}",  # Unique identifier
-            object_name=obj_data["object_name"],
-            object_type=obj_data["object_type"],
-            vault_name=vault_name,
-            subscription_id=subscription_id,
-            expiration_date=obj_data.get("expiration_date"),
-            days_remaining=days_remaining,
-            owner=owner,
-            distribution_email=distribution_email,
-            issuer=obj_data.get("issuer"),
-            thumbprint=obj_data.get("thumbprint"),
-            created_at=obj_data.get("created_date", now),
-            updated_at=now
-        )
+        records_to_remove = [record for diff in diffs for record in diff.removed]
+        if records_to_remove and not REMOVE_STALE:
+            # SYNC_REMOVE_STALE=false: leave them stored and out of the feed
+            logger.info(f"Keeping {len(records_to_remove)} objects no longer found in Key Vault")
+            for diff in diffs:
+                diff.removed = []
+            records_to_remove = []
+        if records_to_remove or complete_sync:
+            with track_stage("sync", "batch_delete"):
+                await self.table_client.batch_delete(records_to_remove, complete_sync)
+            count_objects("sync", "removed", len(records_to_remove))
         
-        return entity
+        for diff in diffs:
+            sync_stats["objects_added"] += len(diff.added)
+            sync_stats["objects_changed"] += len(diff.changed)
+            sync_stats["objects_removed"] += len(diff.removed)
+        if self.change_feed is not None:
+            with track_stage("sync", "publish_changes"):
+                await asyncio.to_thread(
+                    self.change_feed.publish, [change for diff in diffs for change in diff.changes()]
+                )
+
+    def _load_stored(self, subscription_ids: set) -> Dict[str, Dict[str, KeyVaultObjectRecord]]:
+        """Stored records of the given subscriptions, by vault then row key (blocking)"""
+        stored: Dict[str, Dict[str, KeyVaultObjectRecord]] = {}
+        for page in self.table_client.iter_record_pages(select=DIFF_COLUMNS):
+            for record in page:
+                if record.subscription_id in subscription_ids:
+                    stored.setdefault(record.vault_name, {})[record.row_key] = record
+        return stored
+
+    def _load_stored_vaults(self, vault_names: List[str]) -> Dict[str, Dict[str, KeyVaultObjectRecord]]:
+        """Stored records of the given vaults, one partition query each (blocking)"""
+        stored: Dict[str, Dict[str, KeyVaultObjectRecord]] = {}
+        for vault_name in vault_names:
+            for page in self.table_client.iter_record_pages(QueryFilters(vault_name=vault_name), select=DIFF_COLUMNS):
+                for record in page:
+                    stored.setdefault(vault_name, {})[record.row_key] = record
+        return stored
@@ -0,0 +1,199 @@
+# src/services/leader_election.py
+
+import os
+import socket
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from src.clients.table_client import AzureTableClient
+
+logger = logging.getLogger(__name__)
+
+
+def worker_identity() -> str:
+    """Unique name of this worker process across hosts"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderLease(ABC):
+    """A lease that at most one worker holds at a time"""
+
+    # Whether every contender runs on this host (and so shares its snapshot file)
+    host_local = False
+
+    @abstractmethod
+    def try_acquire(self) -> bool:
+        """Acquire or renew the lease; returns whether this worker holds it"""
+
+    @abstractmethod
+    def release(self) -> None:
+        """Give the lease up if this worker holds it"""
+
+
+class FileLeaderLease(LeaderLease):
+    """
+    Lease on an exclusive flock() of a local file. Covers several uvicorn
+    workers on one host; the OS releases it when the holder dies.
+    """
+
+    host_local = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        import fcntl
+        if self._fd is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, worker_identity().encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            import fcntl
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class TableLeaderLease(LeaderLease):
+    """
+    Lease stored as an entity in Table Storage, claimed and renewed with
+    ETag-conditional writes. Covers workers spread over several hosts.
+    """
+
+    PARTITION_KEY = "leader"
+
+    def __init__(self, table_factory: Callable[[], Any], name: str = "scheduler", ttl_seconds: int = 60):
+        # The lease table is opened on first use, inside the election thread
+        self._table_factory = table_factory
+        self._table = None
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.holder = worker_identity()
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self._table_factory()
+        return self._table
+
+    def try_acquire(self) -> bool:
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+        from azure.data.tables import UpdateMode
+
+        now = datetime.now(timezone.utc)
+        lease = {
+            "PartitionKey": self.PARTITION_KEY,
+            "RowKey": self.name,
+            "holder": self.holder,
+            "expires_at": now + self.ttl
+        }
+        try:
+            current = self.table.get_entity(self.PARTITION_KEY, self.name)
+        except ResourceNotFoundError:
+            try:
+                self.table.create_entity(lease)
+                return True
+            except ResourceExistsError:
+                return False
+
+        if current.get("holder") != self.holder and current.get("expires_at") and current["expires_at"] > now:
+            return False
+        try:
+            self.table.update_entity(
+                lease,
+                mode=UpdateMode.REPLACE,
+                etag=current.metadata["etag"],
+                match_condition=MatchConditions.IfNotModified
+            )
+            return True
+        except (ResourceModifiedError, ResourceNotFoundError):
+            return False  # Another worker got there first
+
+    def release(self) -> None:
+        from azure.core import MatchConditions
+        try:
+            current = self.table.get_entity(self.PARTITION_KEY, self.name)
+            if current.get("holder") == self.holder:
+                self.table.delete_entity(
+                    self.PARTITION_KEY, self.name,
+                    etag=current.metadata["etag"],
+                    match_condition=MatchConditions.IfNotModified
+                )
+        except Exception as e:
+            logger.warning(f"Failed to release leader lease: {e}")
+
+
+class LeaderElector:
+    """Keeps trying to acquire (and then renew) a lease in the background"""
+
+    def __init__(self, lease: LeaderLease, renew_interval: float = 15.0):
+        self.lease = lease
+        self.renew_interval = renew_interval
+        self.is_leader = False
+        # Set once the first acquisition attempt has finished
+        self.decided = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                is_leader = await asyncio.to_thread(self.lease.try_acquire)
+            except Exception as e:
+                logger.error(f"Leader election failed: {e}")
+                is_leader = False
+            if is_leader != self.is_leader:
+                logger.info(f"Worker {worker_identity()} {'became' if is_leader else 'is no longer'} leader")
+            self.is_leader = is_leader
+            self.decided.set()
+            await asyncio.sleep(self.renew_interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+        if self.is_leader:
+            await asyncio.to_thread(self.lease.release)
+            self.is_leader = False
+
+
+def create_elector(table_client) -> Optional[LeaderElector]:
+    """
+    Build the elector selected by LEADER_LEASE (file, table or none).
+    Defaults to table with Table Storage, which may be shared by several
+    hosts, and to file with the host-local SQLite backend.
+    """
+    shared_storage = isinstance(table_client, AzureTableClient)
+    kind = os.getenv("LEADER_LEASE", "table" if shared_storage else "file").lower()
+    if kind == "none":
+        return None
+    if kind == "table":
+        if not isinstance(table_client, AzureTableClient):
+            raise ValueError("LEADER_LEASE=table needs STORAGE_BACKEND=azure; use LEADER_LEASE=file or none")
+        ttl = int(os.getenv("LEADER_LEASE_TTL_SECONDS", "60"))
+        table_name = os.getenv("LEASE_TABLE_NAME", "leases")
+        lease = TableLeaderLease(lambda: table_client.get_table(table_name), ttl_seconds=ttl)
+        # Renew well within the TTL so a live leader never lapses
+        return LeaderElector(lease, renew_interval=ttl / 3)
+    if shared_storage:
+        logger.warning("LEADER_LEASE=file elects one leader per host: only use it for single-host deployments")
+    return LeaderElector(FileLeaderLease(os.getenv("LEADER_LOCK_PATH", "data/leader.lock")))
@@ -0,0 +1,224 @@
+# src/services/live_updates.py
+
+import os
+import json
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from src.clients.storage_backend import StorageBackend
+from src.services.change_feed import RESET, ChangeFeed, ObjectChange
+from src.metrics import LIVE_CLIENTS
+
+logger = logging.getLogger(__name__)
+
+LIVE_MAX_CLIENTS = int(os.getenv("LIVE_MAX_CLIENTS", "1000"))
+# Frames buffered per client; a client further behind gets a resync instead
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "64"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Changed objects listed in one event; larger batches only carry counts
+LIVE_MAX_CHANGES = int(os.getenv("LIVE_MAX_CHANGES", "200"))
+# Coalesce the KPI recount over bursts of changes
+LIVE_KPI_DEBOUNCE_SECONDS = float(os.getenv("LIVE_KPI_DEBOUNCE_SECONDS", "1.0"))
+# Longest wait between retries of a failed KPI recount
+LIVE_KPI_MAX_BACKOFF_SECONDS = float(os.getenv("LIVE_KPI_MAX_BACKOFF_SECONDS", "60"))
+
+HEARTBEAT = b": keepalive\n\n"
+# Queued by EventBroker.close(): the stream ends
+CLOSED = object()
+
+
+def sse_frame(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """One Server-Sent Events message"""
+    frame = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+    if event_id is not None:
+        frame = f"id: {event_id}\n" + frame
+    return frame.encode()
+
+
+class EventBroker:
+    """
+    Fans events out to connected SSE clients. Each event is encoded once
+    and the same bytes are queued for every client; a client whose queue
+    is full (slow reader) has its backlog dropped and is told to resync,
+    so one stalled connection never holds back the others.
+    Must only be used from the event loop thread.
+    """
+
+    def __init__(self, max_clients: int = LIVE_MAX_CLIENTS, queue_size: int = LIVE_QUEUE_SIZE):
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self._clients: set = set()
+        self.closed = False
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def connect(self) -> Optional[asyncio.Queue]:
+        """Queue receiving the frames for a new client; None at capacity or once closed"""
+        if self.closed or len(self._clients) >= self.max_clients:
+            return None
+        queue = asyncio.Queue(self.queue_size)
+        self._clients.add(queue)
+        LIVE_CLIENTS.inc()
+        return queue
+
+    def disconnect(self, queue: asyncio.Queue) -> None:
+        if queue in self._clients:
+            self._clients.remove(queue)
+            LIVE_CLIENTS.dec()
+
+    def broadcast(self, frame: bytes) -> None:
+        if self.closed:
+            return
+        resync = None
+        for queue in self._clients:
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                resync = resync or sse_frame("resync", {"reason": "lagging"})
+                queue.put_nowait(resync)
+
+    def close(self) -> None:
+        """
+        End every stream (server shutting down). The server waits for open
+        responses before its lifespan shutdown, so this must run as soon
+        as it is asked to exit, not from the lifespan.
+        """
+        self.closed = True
+        for queue in self._clients:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(CLOSED)
+
+    async def stream(self, queue: asyncio.Queue, initial: List[bytes] = ()) -> AsyncIterator[bytes]:
+        """Frames for one client, with heartbeats to keep proxies from closing it"""
+        try:
+            for frame in initial:
+                yield frame
+            while not self.closed:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    frame = HEARTBEAT
+                if frame is CLOSED:
+                    return
+                yield frame
+        finally:
+            self.disconnect(queue)
+
+
+class LiveUpdates:
+    """
+    Turns change feed batches (syncs and alert runs, from this worker or
+    the leader) into dashboard events:
+    objects - counts by kind and the changed objects, id = last feed seq
+    kpi     - the KPI summary and its delta, recounted once per burst
+    resync  - the client missed changes and should refetch everything
+    """
+
+    def __init__(self, table_client: StorageBackend, change_feed: ChangeFeed, broker: Optional[EventBroker] = None):
+        self.table_client = table_client
+        self.change_feed = change_feed
+        self.broker = broker or EventBroker()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._kpi: Optional[Dict[str, int]] = None
+        self._kpi_sent: Optional[Dict[str, int]] = None
+        self._kpi_task: Optional[asyncio.Task] = None
+        self._kpi_stale = False
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.change_feed.subscribe(self._on_changes)
+
+    def stop(self) -> None:
+        self.broker.close()
+        if self._kpi_task and not self._kpi_task.done():
+            self._kpi_task.cancel()
+
+    def shutdown(self) -> None:
+        """Close the event streams; safe from signal handlers and other threads"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.broker.close)
+
+    def _on_changes(self, changes: List[ObjectChange]) -> None:
+        # Feed callbacks run in whichever thread published (often to_thread)
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._publish, changes)
+
+    def _publish(self, changes: List[ObjectChange]) -> None:
+        self._kpi_stale = True
+        if self.broker.client_count == 0:
+            return
+        if any(change.kind == RESET for change in changes):
+            self.broker.broadcast(sse_frame("resync", {"reason": "reset"}, changes[-1].seq))
+        else:
+            self.broker.broadcast(self.objects_frame(changes))
+        self._schedule_kpi_refresh()
+
+    @staticmethod
+    def objects_frame(changes: List[ObjectChange]) -> bytes:
+        data = {
+            "counts": dict(Counter(change.kind for change in changes)),
+            "truncated": len(changes) > LIVE_MAX_CHANGES,
+            "changes": [
+                {"kind": change.kind, "vault_name": change.vault_name, "row_key": change.row_key}
+                for change in changes[:LIVE_MAX_CHANGES]
+            ]
+        }
+        return sse_frame("objects", data, changes[-1].seq)
+
+    def _schedule_kpi_refresh(self) -> None:
+        if self._kpi_task is None or self._kpi_task.done():
+            self._kpi_task = asyncio.create_task(self._refresh_kpi())
+
+    async def _refresh_kpi(self) -> None:
+        delay = LIVE_KPI_DEBOUNCE_SECONDS
+        while True:
+            await asyncio.sleep(delay)
+            if self.broker.closed or self.broker.client_count == 0:
+                return
+            try:
+                previous = self._kpi_sent or self._kpi or {}
+                summary = await self.kpi_summary()
+                delta = {key: value - previous.get(key, 0) for key, value in summary.items()
+                         if value != previous.get(key, 0)}
+                if delta:
+                    self._kpi_sent = summary
+                    self.broker.broadcast(sse_frame("kpi", {"summary": summary, "delta": delta}))
+                delay = LIVE_KPI_DEBOUNCE_SECONDS
+            except Exception as e:
+                # Still stale: retry, backing off while storage keeps failing
+                delay = min(delay * 2, LIVE_KPI_MAX_BACKOFF_SECONDS)
+                logger.error(f"Live KPI refresh failed, retrying in {delay:g}s: {e}")
+            # Changes that arrived during the recount need another one
+            if not self._kpi_stale:
+                return
+
+    async def kpi_summary(self) -> Dict[str, int]:
+        """Current KPI summary, recounted only after the feed reported changes"""
+        if self._kpi is None or self._kpi_stale:
+            self._kpi_stale = False
+            try:
+                self._kpi = await self.table_client.get_kpi_summary()
+            except Exception:
+                # Recount next time rather than serving the old summary as current
+                self._kpi_stale = True
+                raise
+        return self._kpi
+
+    def replay(self, last_event_id: Optional[str]) -> List[bytes]:
+        """Frames a reconnecting client (Last-Event-ID) missed, or a resync"""
+        if not last_event_id:
+            return []
+        try:
+            changes = self.change_feed.since(int(last_event_id))
+        except ValueError:
+            changes = None
+        if changes is None:
+            return [sse_frame("resync", {"reason": "reset"}, self.change_feed.last_seq)]
+        return [self.objects_frame(changes)] if changes else []
@@ -0,0 +1,59 @@
+# src/services/scheduler.py
+
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from src.services.keyvault_service import KeyVaultService
+from src.services.alert_service import AlertService
+from src.services.leader_election import LeaderElector
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTasks:
+    """
+    Periodic inventory sync and alert runs. Every worker runs the loop,
+    but a tick only does work on the worker holding the leader lease.
+    """
+
+    def __init__(self,
+                 keyvault_service: KeyVaultService,
+                 alert_service: AlertService,
+                 elector: Optional[LeaderElector] = None):
+        self.keyvault_service = keyvault_service
+        self.alert_service = alert_service
+        self.elector = elector
+        self.sync_interval = float(os.getenv("SYNC_INTERVAL_MINUTES", "360")) * 60
+        self.alert_interval = float(os.getenv("ALERT_INTERVAL_MINUTES", "1440")) * 60
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_leader(self) -> bool:
+        return self.elector is None or self.elector.is_leader
+
+    def start_scheduler(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._every(self.sync_interval, "sync", self.keyvault_service.sync_inventory)),
+            asyncio.create_task(self._every(self.alert_interval, "alerts", self.alert_service.process_alerts)),
+        ]
+        logger.info("Scheduler started")
+
+    def stop_scheduler(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        logger.info("Scheduler stopped")
+
+    async def _every(self, interval: float, name: str, job: Callable[[], Awaitable]) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if not self.is_leader:
+                logger.debug(f"Skipping scheduled {name}: not the leader")
+                continue
+            try:
+                logger.info(f"Running scheduled {name}")
+                await job()
+            except Exception as e:
+                logger.error(f"Scheduled {name} failed: {e}")
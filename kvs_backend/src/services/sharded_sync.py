@@ -0,0 +1,463 @@
+# src/services/sharded_sync.py
+
+import os
+import json
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from src.clients.query_planner import odata_string
+from src.clients.table_client import AzureTableClient
+from src.services.leader_election import worker_identity
+from src.metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Shard:
+    """A slice of one sync run's vaults, leased to one worker at a time"""
+    run_id: str
+    shard_id: str
+    vaults: List[Dict[str, Any]]
+    status: str = PENDING
+    holder: Optional[str] = None
+    expires_at: Optional[datetime] = None
+    attempts: int = 0
+    stats: Dict[str, Any] = field(default_factory=dict)
+    etag: Optional[str] = None                # Table Storage only
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class ShardStore(ABC):
+    """
+    Shard lease entities of sync runs. claim/renew/complete must be
+    atomic across processes and hosts; all methods are blocking.
+    """
+
+    @abstractmethod
+    def create_run(self, run_id: str, shards: List[Shard]) -> None:
+        """Record the shards of a new run and make it the current one"""
+
+    @abstractmethod
+    def current_run(self) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def list_shards(self, run_id: str) -> List[Shard]:
+        pass
+
+    @abstractmethod
+    def claim(self, run_id: str, holder: str, ttl: timedelta, max_attempts: int) -> Optional[Shard]:
+        """Lease a pending shard, or one whose holder's lease expired"""
+
+    @abstractmethod
+    def renew(self, shard: Shard, ttl: timedelta) -> bool:
+        """Extend the lease; False if another worker has taken the shard over"""
+
+    @abstractmethod
+    def complete(self, shard: Shard, stats: Dict[str, Any]) -> bool:
+        pass
+
+
+class TableShardStore(ShardStore):
+    """
+    Shards as entities of a Table Storage table (PartitionKey = run id),
+    claimed and renewed with ETag-conditional writes like TableLeaderLease.
+    A "runs"/"current" entity points at the latest run.
+    """
+
+    RUNS_PARTITION = "runs"
+
+    def __init__(self, table_factory: Callable[[], Any]):
+        self._table_factory = table_factory
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self._table_factory()
+        return self._table
+
+    @staticmethod
+    def _to_entity(shard: Shard) -> Dict[str, Any]:
+        entity = {
+            "PartitionKey": shard.run_id,
+            "RowKey": shard.shard_id,
+            "vaults": json.dumps(shard.vaults),
+            "status": shard.status,
+            "holder": shard.holder or "",
+            "attempts": shard.attempts,
+            "stats": json.dumps(shard.stats)
+        }
+        if shard.expires_at is not None:
+            entity["expires_at"] = shard.expires_at
+        return entity
+
+    @staticmethod
+    def _from_entity(entity: Any) -> Shard:
+        return Shard(
+            run_id=entity["PartitionKey"],
+            shard_id=entity["RowKey"],
+            vaults=json.loads(entity["vaults"]),
+            status=entity["status"],
+            holder=entity.get("holder") or None,
+            expires_at=entity.get("expires_at"),
+            attempts=entity.get("attempts", 0),
+            stats=json.loads(entity.get("stats") or "{}"),
+            etag=entity.metadata["etag"]
+        )
+
+    def _conditional_replace(self, shard: Shard) -> bool:
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+        from azure.data.tables import UpdateMode
+        try:
+            metadata = self.table.update_entity(
+                self._to_entity(shard),
+                mode=UpdateMode.REPLACE,
+                etag=shard.etag,
+                match_condition=MatchConditions.IfNotModified
+            )
+            shard.etag = metadata.get("etag", shard.etag)
+            return True
+        except (ResourceModifiedError, ResourceNotFoundError):
+            return False  # Another worker got there first
+
+    def create_run(self, run_id: str, shards: List[Shard]) -> None:
+        for i in range(0, len(shards), 100):
+            self.table.submit_transaction([("create", self._to_entity(shard)) for shard in shards[i:i + 100]])
+        self.table.upsert_entity({
+            "PartitionKey": self.RUNS_PARTITION,
+            "RowKey": "current",
+            "run_id": run_id,
+            "shard_count": len(shards)
+        })
+
+    def current_run(self) -> Optional[str]:
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            return self.table.get_entity(self.RUNS_PARTITION, "current")["run_id"]
+        except ResourceNotFoundError:
+            return None
+
+    def list_shards(self, run_id: str) -> List[Shard]:
+        return [self._from_entity(e) for e in self.table.query_entities(f"PartitionKey eq {odata_string(run_id)}")]
+
+    def claim(self, run_id: str, holder: str, ttl: timedelta, max_attempts: int) -> Optional[Shard]:
+        now = datetime.now(timezone.utc)
+        candidates = [
+            shard for shard in self.list_shards(run_id)
+            if shard.status == PENDING or (shard.status == RUNNING and shard.expires_at and shard.expires_at <= now)
+        ]
+        # Spread concurrent claimers over different shards
+        random.shuffle(candidates)
+        for shard in candidates:
+            if shard.attempts >= max_attempts:
+                shard.status, shard.holder = FAILED, None
+                self._conditional_replace(shard)
+                continue
+            shard.status, shard.holder = RUNNING, holder
+            shard.expires_at = now + ttl
+            shard.attempts += 1
+            if self._conditional_replace(shard):
+                return shard
+        return None
+
+    def renew(self, shard: Shard, ttl: timedelta) -> bool:
+        shard.expires_at = datetime.now(timezone.utc) + ttl
+        return self._conditional_replace(shard)
+
+    def complete(self, shard: Shard, stats: Dict[str, Any]) -> bool:
+        shard.status, shard.stats = DONE, stats
+        return self._conditional_replace(shard)
+
+
+class SqliteShardStore(ShardStore):
+    """
+    Shards in a local SQLite file, for several sync processes on one host
+    (development and tests). Claims run in BEGIN IMMEDIATE transactions.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS shards (
+        run_id TEXT NOT NULL,
+        shard_id TEXT NOT NULL,
+        vaults TEXT NOT NULL,
+        status TEXT NOT NULL,
+        holder TEXT,
+        expires_at REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        stats TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (run_id, shard_id)
+    );
+    CREATE TABLE IF NOT EXISTS runs (
+        key TEXT PRIMARY KEY,
+        run_id TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _from_row(row) -> Shard:
+        return Shard(
+            run_id=row[0], shard_id=row[1], vaults=json.loads(row[2]), status=row[3], holder=row[4],
+            expires_at=datetime.fromtimestamp(row[5], timezone.utc) if row[5] is not None else None,
+            attempts=row[6], stats=json.loads(row[7])
+        )
+
+    def _write(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def create_run(self, run_id: str, shards: List[Shard]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO shards (run_id, shard_id, vaults, status) VALUES (?, ?, ?, ?)",
+                    [(s.run_id, s.shard_id, json.dumps(s.vaults), s.status) for s in shards]
+                )
+                self._conn.execute(
+                    "INSERT INTO runs (key, run_id) VALUES ('current', ?) "
+                    "ON CONFLICT (key) DO UPDATE SET run_id = excluded.run_id",
+                    (run_id,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def current_run(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT run_id FROM runs WHERE key = 'current'").fetchone()
+        return row[0] if row else None
+
+    def list_shards(self, run_id: str) -> List[Shard]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, shard_id, vaults, status, holder, expires_at, attempts, stats "
+                "FROM shards WHERE run_id = ? ORDER BY shard_id",
+                (run_id,)
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def claim(self, run_id: str, holder: str, ttl: timedelta, max_attempts: int) -> Optional[Shard]:
+        now = datetime.now(timezone.utc).timestamp()
+        claimable = "run_id = ? AND (status = 'pending' OR (status = 'running' AND expires_at <= ?))"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"UPDATE shards SET status = 'failed', holder = NULL WHERE {claimable} AND attempts >= ?",
+                    (run_id, now, max_attempts)
+                )
+                row = self._conn.execute(
+                    f"SELECT shard_id FROM shards WHERE {claimable} ORDER BY shard_id LIMIT 1",
+                    (run_id, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE shards SET status = 'running', holder = ?, expires_at = ?, attempts = attempts + 1 "
+                        "WHERE run_id = ? AND shard_id = ?",
+                        (holder, now + ttl.total_seconds(), run_id, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return next(s for s in self.list_shards(run_id) if s.shard_id == row[0])
+
+    def renew(self, shard: Shard, ttl: timedelta) -> bool:
+        expires_at = datetime.now(timezone.utc) + ttl
+        renewed = self._write(
+            "UPDATE shards SET expires_at = ? WHERE run_id = ? AND shard_id = ? AND holder = ? AND status = 'running'",
+            (expires_at.timestamp(), shard.run_id, shard.shard_id, shard.holder)
+        )
+        if renewed:
+            shard.expires_at = expires_at
+        return bool(renewed)
+
+    def complete(self, shard: Shard, stats: Dict[str, Any]) -> bool:
+        return bool(self._write(
+            "UPDATE shards SET status = 'done', stats = ? WHERE run_id = ? AND shard_id = ? AND holder = ? AND status = 'running'",
+            (json.dumps(stats), shard.run_id, shard.shard_id, shard.holder)
+        ))
+
+
+class ShardedSync:
+    """
+    Distributed inventory sync. The coordinator lists vaults, splits them
+    into shards and records them in a ShardStore; any number of worker
+    processes, on any number of hosts, claim shards under a renewable
+    lease and sync their vaults. Shards whose worker died are reclaimed
+    once the lease expires. The coordinator works shards too, then
+    removes deleted vaults and completes the sync.
+    """
+
+    def __init__(self, keyvault_service, store: ShardStore):
+        self.keyvault_service = keyvault_service
+        self.store = store
+        self.holder = worker_identity()
+        self.shard_size = int(os.getenv("SYNC_SHARD_SIZE", "25"))
+        self.lease_ttl = timedelta(seconds=float(os.getenv("SYNC_SHARD_LEASE_SECONDS", "120")))
+        self.max_attempts = int(os.getenv("SYNC_SHARD_MAX_ATTEMPTS", "3"))
+        self.poll_interval = float(os.getenv("SYNC_SHARD_POLL_SECONDS", "5"))
+
+    async def run(self,
+                  subscription_ids: Optional[List[str]] = None,
+                  on_planned: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Coordinate a full sync: plan shards, work until all finish, finalize.
+        on_planned receives the run id once its shards are recorded, e.g.
+        to start workers on exactly this run.
+        """
+        from src.services.keyvault_service import new_sync_stats
+        sync_stats = new_sync_stats()
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+
+        # Subscription -> vault names, only for subscriptions listed completely
+        listed: Dict[str, List[str]] = {}
+        vaults: List[Dict[str, Any]] = []
+        for subscription in await self.keyvault_service.list_target_subscriptions(subscription_ids):
+            sub_id = subscription["subscription_id"]
+            try:
+                with track_stage("sync", "list_key_vaults"):
+                    sub_vaults = await self.keyvault_service.kv_client.list_key_vaults(sub_id)
+                listed[sub_id] = [vault["name"] for vault in sub_vaults]
+                vaults.extend(
+                    {"name": v["name"], "vault_uri": v["vault_uri"], "subscription_id": sub_id}
+                    for v in sub_vaults
+                )
+                sync_stats["subscriptions_processed"] += 1
+            except Exception as e:
+                error_msg = f"Failed to process subscription {sub_id}: {e}"
+                logger.error(error_msg)
+                sync_stats["errors"].append(error_msg)
+
+        shards = [
+            Shard(run_id, f"shard-{i // self.shard_size:05d}", vaults[i:i + self.shard_size])
+            for i in range(0, len(vaults), self.shard_size)
+        ]
+        await asyncio.to_thread(self.store.create_run, run_id, shards)
+        logger.info(f"Sync run {run_id}: {len(vaults)} vaults in {len(shards)} shards")
+        if on_planned is not None:
+            on_planned(run_id)
+
+        await self.work(run_id)
+
+        final = await asyncio.to_thread(self.store.list_shards, run_id)
+        for shard in final:
+            _merge_stats(sync_stats, shard.stats)
+            if shard.status == FAILED:
+                sync_stats["errors"].append(f"Shard {shard.shard_id} failed after {shard.attempts} attempts")
+
+        # Other hosts wrote to the table directly; refresh the local copy
+        await self.keyvault_service.table_client.reconcile_snapshot()
+        _merge_stats(sync_stats, await self.keyvault_service.remove_deleted_vaults(
+            listed, complete_sync=not sync_stats["errors"]
+        ))
+
+        sync_stats["run_id"] = run_id
+        sync_stats["shards"] = len(shards)
+        sync_stats["sync_completed_at"] = datetime.now(timezone.utc).isoformat()
+        return sync_stats
+
+    async def work(self, run_id: Optional[str] = None) -> int:
+        """Claim and sync shards of a run until every shard is finished; returns shards done here"""
+        run_id = run_id or await asyncio.to_thread(self.store.current_run)
+        if run_id is None:
+            return 0
+        done = 0
+        while True:
+            shard = await asyncio.to_thread(self.store.claim, run_id, self.holder, self.lease_ttl, self.max_attempts)
+            if shard is None:
+                shards = await asyncio.to_thread(self.store.list_shards, run_id)
+                if all(s.finished for s in shards):
+                    return done
+                # Others are still working; wait in case a lease lapses
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if await self._process(shard):
+                done += 1
+
+    async def serve(self) -> None:
+        """Keep working on whatever run is current (SHARD_WORKER processes)"""
+        finished_run = None
+        while True:
+            try:
+                run_id = await asyncio.to_thread(self.store.current_run)
+                if run_id and run_id != finished_run:
+                    done = await self.work(run_id)
+                    logger.info(f"Sync run {run_id} finished; {done} shards synced by {self.holder}")
+                    finished_run = run_id
+            except Exception as e:
+                logger.error(f"Shard worker failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _process(self, shard: Shard) -> bool:
+        """Sync one shard, renewing its lease meanwhile"""
+        logger.info(f"Syncing {shard.run_id}/{shard.shard_id} ({len(shard.vaults)} vaults, attempt {shard.attempts})")
+        task = asyncio.create_task(self.keyvault_service.sync_vaults(shard.vaults))
+        renew_every = self.lease_ttl.total_seconds() / 3
+        while True:
+            finished, _ = await asyncio.wait({task}, timeout=renew_every)
+            if finished:
+                break
+            if not await asyncio.to_thread(self.store.renew, shard, self.lease_ttl):
+                logger.warning(f"Lost lease on {shard.shard_id}; abandoning it")
+                task.cancel()
+                return False
+        try:
+            stats = task.result()
+        except Exception as e:
+            # Leave the lease to expire so another attempt picks the shard up
+            logger.error(f"Shard {shard.shard_id} failed: {e}")
+            return False
+        if not await asyncio.to_thread(self.store.complete, shard, stats):
+            logger.warning(f"Shard {shard.shard_id} was taken over before it completed")
+            return False
+        return True
+
+
+def _merge_stats(total: Dict[str, Any], part: Dict[str, Any]) -> None:
+    for key, value in part.items():
+        if key == "errors":
+            total["errors"].extend(value)
+        elif isinstance(value, int) and key in total:
+            total[key] += value
+
+
+def create_shard_store(table_client) -> ShardStore:
+    """Shard store selected by SHARD_STORE (table or sqlite)"""
+    if os.getenv("SHARD_STORE", "table").lower() == "sqlite":
+        return SqliteShardStore(os.getenv("SHARD_DB_PATH", "data/sync_shards.sqlite"))
+    if not isinstance(table_client, AzureTableClient):
+        raise ValueError("SHARD_STORE=table needs STORAGE_BACKEND=azure; use SHARD_STORE=sqlite")
+    table_name = os.getenv("SHARD_TABLE_NAME", "syncshards")
+    return TableShardStore(lambda: table_client.get_table(table_name))
@@ -0,0 +1,66 @@
+# sync_worker.py
+import os
+import asyncio
+import argparse
+import logging
+import multiprocessing
+
+# Shard worker for SYNC_MODE=sharded. Run one or more per host, next to
+# (or instead of) API workers; all of them must share the storage backend
+# and SHARD_STORE. To try it on one machine:
+#   SHARD_STORE=sqlite STORAGE_BACKEND=sqlite python sync_worker.py --processes 4 --coordinate
+
+
+def build_sharded_sync():
+    from dotenv import load_dotenv
+    load_dotenv()
+    from src.clients.credential import LazyCredential
+    from src.clients.factory import create_storage_backend
+    from src.clients.keyvault_client import KeyVaultClient
+    from src.services.change_feed import ChangeFeed
+    from src.services.keyvault_service import KeyVaultService
+    from src.services.sharded_sync import ShardedSync, create_shard_store
+
+    credential = LazyCredential(os.getenv("AZURE_CREDENTIAL", "cli"))
+    table_client = create_storage_backend(credential)
+    keyvault_service = KeyVaultService(KeyVaultClient(credential), table_client, ChangeFeed(table_client.snapshot))
+    return ShardedSync(keyvault_service, create_shard_store(table_client))
+
+
+def serve(args: argparse.Namespace, run_id: str = None) -> None:
+    sharded_sync = build_sharded_sync()
+    if run_id is not None:
+        # Started by the coordinator for the run it just planned
+        asyncio.run(sharded_sync.work(run_id))
+    elif args.once:
+        asyncio.run(sharded_sync.work())
+    else:
+        asyncio.run(sharded_sync.serve())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Work shards of sharded inventory syncs")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to run")
+    parser.add_argument("--coordinate", action="store_true", help="plan a new sync run and work it to completion")
+    parser.add_argument("--once", action="store_true", help="exit once the current run is finished")
+    args = parser.parse_args()
+
+    # Fresh interpreters: the coordinator starts workers from inside its event loop
+    context = multiprocessing.get_context("spawn")
+    workers = []
+
+    def start_workers(run_id: str = None) -> None:
+        for _ in range(args.processes - (1 if args.coordinate else 0)):
+            worker = context.Process(target=serve, args=(args, run_id))
+            worker.start()
+            workers.append(worker)
+
+    if args.coordinate:
+        # This process is the coordinator and one of the workers; the others
+        # start once the run exists and work exactly that run
+        result = asyncio.run(build_sharded_sync().run(on_planned=start_workers))
+        logging.info(f"Sync run {result['run_id']} completed: {result}")
+    else:
+        start_workers()
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,157 @@
+# tests/test_alert_log.py
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.endpoints.alert import router
+from src.clients.query_planner import plan_alert_log
+from src.clients.sqlite_client import SqliteTableClient
+from src.clients.table_client import AzureTableClient
+from src.dependencies import get_table_client
+from src.models.records import AlertLogEntry, KeyVaultObjectRecord
+from src.services.alert_service import AlertService
+
+NOW = datetime.now(timezone.utc)
+
+
+def test_plan_alert_log_bounds_only_the_first_day():
+    since = datetime(2026, 3, 4, 13, 45, 10, 123456, tzinfo=timezone.utc)
+    plans = plan_alert_log(since, until=datetime(2026, 3, 6, 8, 0, tzinfo=timezone.utc))
+    assert plans == [
+        ("20260304", "PartitionKey eq '20260304' and RowKey ge '134510123456'"),
+        ("20260305", "PartitionKey eq '20260305'"),
+        ("20260306", "PartitionKey eq '20260306'"),
+    ]
+
+
+def test_plan_alert_log_across_utc_midnight():
+    # 23:30 in UTC+2 is 21:30 UTC; the window ends after midnight UTC
+    since = datetime(2026, 3, 4, 23, 30, tzinfo=timezone(timedelta(hours=2)))
+    plans = plan_alert_log(since, until=datetime(2026, 3, 5, 0, 30, tzinfo=timezone.utc), recipient="o'neil@contoso.com")
+    assert plans == [
+        ("20260304", "PartitionKey eq '20260304' and RowKey ge '213000000000' and recipient eq 'o''neil@contoso.com'"),
+        ("20260305", "PartitionKey eq '20260305' and recipient eq 'o''neil@contoso.com'"),
+    ]
+
+
+@pytest.mark.parametrize("since, expected", [
+    # days=0: only today, from `since` on
+    (datetime(2026, 3, 4, 9, 15, tzinfo=timezone.utc), [("20260304", "PartitionKey eq '20260304' and RowKey ge '091500000000'")]),
+    # From midnight the whole day qualifies
+    (datetime(2026, 3, 4, tzinfo=timezone.utc), [("20260304", "PartitionKey eq '20260304'")]),
+])
+def test_plan_alert_log_for_zero_days(since, expected):
+    assert plan_alert_log(since, until=since) == expected
+
+
+class AlertLogTable:
+    """Table Storage reads of the filters plan_alert_log builds: one partition, RowKey order"""
+
+    FILTER = re.compile(
+        r"PartitionKey eq '(?P<day>\d{8})'(?: and RowKey ge '(?P<low>\d+)')?(?: and recipient eq '(?P<recipient>.*)')?$"
+    )
+
+    def __init__(self):
+        self.entities = []
+
+    def submit_transaction(self, actions):
+        self.entities.extend(dict(entity) for _, entity in actions)
+
+    def query_entities(self, query_filter):
+        match = self.FILTER.match(query_filter)
+        recipient = match["recipient"].replace("''", "'") if match["recipient"] else None
+        return sorted(
+            (e for e in self.entities
+             if e["PartitionKey"] == match["day"]
+             and (match["low"] is None or e["RowKey"] >= match["low"])
+             and (recipient is None or e["recipient"] == recipient)),
+            key=lambda e: e["RowKey"]
+        )
+
+
+def sqlite_backend(tmp_path):
+    return SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+
+
+def table_backend(tmp_path):
+    client = AzureTableClient(credential=None)
+    client._alert_log_table = AlertLogTable()
+    return client
+
+
+@pytest.fixture(params=[sqlite_backend, table_backend], ids=["sqlite", "table"])
+def backend(request, tmp_path):
+    client = request.param(tmp_path)
+    yield client
+    if client.snapshot is not None:
+        client.snapshot.close()
+
+
+def make_record(name: str, **fields) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name="vault", object_name=name, object_type="Secret", subscription_id="sub-1",
+        expiration_date=NOW + timedelta(days=3), days_remaining=3, **fields
+    )
+
+
+def history(client, **params) -> list:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_table_client] = lambda: client
+    with TestClient(app) as test_client:
+        response = test_client.get("/api/alerts/history", params=params)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_count"] == len(body["history"])
+    return [(item["object_name"], item["recipient"]) for item in body["history"]]
+
+
+def test_history_round_trip_is_newest_first(backend):
+    # Appended out of order, across several UTC days
+    sends = [
+        ("two-days-ago", "team@contoso.com", NOW - timedelta(days=2)),
+        ("just-now", "owner@contoso.com", NOW - timedelta(seconds=1)),
+        ("out-of-window", "owner@contoso.com", NOW - timedelta(days=9)),
+        ("yesterday", "owner@contoso.com", NOW - timedelta(days=1)),
+        ("hour-ago", "team@contoso.com", NOW - timedelta(hours=1)),
+    ]
+    asyncio.run(backend.append_alert_log([
+        AlertLogEntry.for_record(make_record(name), recipient, sent_at) for name, recipient, sent_at in sends
+    ]))
+    assert history(backend) == [
+        ("just-now", "owner@contoso.com"), ("hour-ago", "team@contoso.com"),
+        ("yesterday", "owner@contoso.com"), ("two-days-ago", "team@contoso.com"),
+    ]
+    assert history(backend, recipient="team@contoso.com") == [
+        ("hour-ago", "team@contoso.com"), ("two-days-ago", "team@contoso.com")
+    ]
+    assert history(backend, days=1, recipient="owner@contoso.com") == [("just-now", "owner@contoso.com")]
+
+
+class FakeEmailClient:
+    def __init__(self):
+        self.sent = []
+
+    async def send_alert_email(self, recipient, objects):
+        self.sent.append(recipient)
+        return True
+
+
+def test_alert_run_records_the_recipient_it_emailed(tmp_path):
+    client = SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+    asyncio.run(client.batch_upsert([
+        make_record("owned", owner="owner@contoso.com"),
+        make_record("distributed", owner="owner@contoso.com", distribution_email="team@contoso.com"),
+    ]))
+    email_client = FakeEmailClient()
+    stats = asyncio.run(AlertService(client, email_client).process_alerts(force_send=True))
+    assert stats["alerts_sent"] == 2 and sorted(email_client.sent) == ["owner@contoso.com", "team@contoso.com"]
+
+    # Filtering by the address an email went to finds exactly what it contained
+    assert history(client, recipient="team@contoso.com") == [("distributed", "team@contoso.com")]
+    assert history(client, recipient="owner@contoso.com") == [("owned", "owner@contoso.com")]
+    client.snapshot.close()
@@ -0,0 +1,149 @@
+# tests/test_alert_rules.py
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from src.models.records import KeyVaultObjectRecord
+from src.services.alert_rules import AlertRuleSet, QuietPeriod
+
+# A Wednesday
+NOW = datetime(2026, 3, 4, 12, 30, tzinfo=timezone.utc)
+
+RULES = {
+    "rules": [
+        {"name": "reminder", "max_days": 30, "repeat_days": 1},
+        {"name": "warning", "max_days": 60, "min_days": 30}
+    ],
+    "overrides": {
+        "vault:quiet-vault": {"quiet_periods": [{"hours": [22, 6]}]},
+        "vault:weekly-vault": {"rules": [{"name": "weekly", "max_days": 90, "repeat_days": 7}]},
+        "owner:Team@Contoso.com": {
+            "rules": [{"name": "final", "max_days": 7, "repeat_days": 0.5}, {"name": "early", "max_days": 45}],
+            "quiet_periods": [{"start": "2026-03-04T12:00:00", "end": "2026-03-04T13:00:00"}]
+        },
+        "owner:weekend@contoso.com": {"quiet_periods": [{"weekdays": [5, 6]}]}
+    }
+}
+
+
+def reference_due(rule_set: AlertRuleSet, now: datetime, record: KeyVaultObjectRecord, force_send: bool) -> bool:
+    """Per-record statement of the rule semantics that evaluate() vectorizes"""
+    policy = (rule_set.vault_overrides.get(record.vault_name)
+              or rule_set.owner_overrides.get((record.owner or "").lower())
+              or rule_set.default)
+    if record.expiration_date is None:
+        return False
+    if not force_send and policy.is_quiet(now):
+        return False
+    days = (record.expiration_date - now).days
+    for rule in policy.rules:
+        if days <= rule.max_days and (rule.min_days is None or days > rule.min_days):
+            if force_send or record.last_alert_sent is None:
+                return True
+            if rule.repeat_days is None:
+                return record.last_alert_sent < record.expiration_date - timedelta(days=rule.max_days)
+            return now - record.last_alert_sent >= timedelta(days=rule.repeat_days)
+    return False
+
+
+def make_record(days: Optional[float], alerted_ago: Optional[float], vault: str = "vault", owner: str = None):
+    return KeyVaultObjectRecord(
+        vault_name=vault,
+        object_name="object",
+        object_type="Secret",
+        subscription_id="sub",
+        expiration_date=NOW + timedelta(days=days) if days is not None else None,
+        owner=owner,
+        last_alert_sent=NOW - timedelta(days=alerted_ago) if alerted_ago is not None else None
+    )
+
+
+def evaluate(rule_set: AlertRuleSet, now: datetime, records, force_send: bool = False) -> np.ndarray:
+    compiled = rule_set.compile(now)
+    expiry, last_alert = compiled.timestamp_arrays(records)
+    return compiled.evaluate(expiry, last_alert, compiled.policy_indices(records), force_send)
+
+
+def random_records(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    vaults = ["vault", "quiet-vault", "weekly-vault"]
+    owners = [None, "someone@contoso.com", "team@contoso.com", "TEAM@contoso.com", "weekend@contoso.com"]
+    records = []
+    for _ in range(count):
+        days = rng.choice([None, rng.uniform(-10, 120), rng.randint(-2, 95), 30, 60, 7, 45, 90])
+        alerted_ago = rng.choice([None, rng.uniform(0, 40), 1, 0.5, 7, rng.randint(0, 60)])
+        records.append(make_record(days, alerted_ago, rng.choice(vaults), rng.choice(owners)))
+    return records
+
+
+@pytest.mark.parametrize("now", [
+    NOW,                                              # inside the owner's absolute quiet period
+    NOW.replace(hour=13, minute=0),                   # its end (exclusive)
+    NOW.replace(hour=12, minute=0),                   # its start (inclusive)
+    NOW.replace(hour=22, minute=0),                   # wrapped hours start (inclusive)
+    NOW.replace(hour=5, minute=59),                   # wrapped hours, after midnight
+    NOW.replace(hour=6, minute=0),                    # wrapped hours end (exclusive)
+    NOW + timedelta(days=3),                          # Saturday
+    NOW + timedelta(days=5),                          # Monday
+])
+@pytest.mark.parametrize("force_send", [False, True])
+def test_evaluate_matches_reference(now, force_send):
+    rule_set = AlertRuleSet.from_dict(RULES)
+    records = random_records(3000)
+    expected = [reference_due(rule_set, now, record, force_send) for record in records]
+    assert evaluate(rule_set, now, records, force_send).tolist() == expected
+
+
+def test_default_rules():
+    rule_set = AlertRuleSet.load("")
+    records = [
+        make_record(20, None),          # reminder, never alerted
+        make_record(20, 0.5),           # reminder, alerted within the day
+        make_record(20, 1),             # reminder, a day ago
+        make_record(45, None),          # warning, once
+        make_record(45, 5),             # warning already sent in this window
+        make_record(45, 20),            # last alert before entering the window
+        make_record(90, None),          # outside every window
+        make_record(None, None),        # no expiry: never alerted
+        make_record(-3, 2),             # expired: daily reminders continue
+    ]
+    assert evaluate(rule_set, NOW, records).tolist() == [True, False, True, True, False, True, False, False, True]
+    assert evaluate(rule_set, NOW, records, force_send=True).tolist() == [
+        True, True, True, True, True, True, False, False, True
+    ]
+
+
+def test_quiet_period_boundaries():
+    hours = QuietPeriod(hours=(22, 6))
+    assert hours.is_active(NOW.replace(hour=22, minute=0))
+    assert hours.is_active(NOW.replace(hour=5, minute=59))
+    assert not hours.is_active(NOW.replace(hour=6, minute=0))
+    assert not hours.is_active(NOW.replace(hour=21, minute=59))
+    window = QuietPeriod(start=NOW, end=NOW + timedelta(hours=1), weekdays=frozenset({2}))
+    assert window.is_active(NOW)
+    assert not window.is_active(NOW + timedelta(hours=1))
+    assert not window.is_active(NOW - timedelta(microseconds=1))
+
+
+def test_quiet_override_only_silences_its_scope():
+    rule_set = AlertRuleSet.from_dict(RULES)
+    night = NOW.replace(hour=23)
+    records = [make_record(10, None, vault="quiet-vault"), make_record(10, None, vault="vault")]
+    assert evaluate(rule_set, night, records).tolist() == [False, True]
+    assert evaluate(rule_set, night, records, force_send=True).tolist() == [True, True]
+
+
+def test_naive_timestamps_are_read_as_utc():
+    rule_set = AlertRuleSet.load("")
+    record = make_record(10, 0.5)
+    naive = KeyVaultObjectRecord(
+        vault_name="vault", object_name="object", object_type="Secret", subscription_id="sub",
+        expiration_date=record.expiration_date.replace(tzinfo=None),
+        last_alert_sent=record.last_alert_sent.replace(tzinfo=None)
+    )
+    compiled = rule_set.compile(NOW)
+    assert [a.tolist() for a in compiled.timestamp_arrays([naive])] == \
+        [a.tolist() for a in compiled.timestamp_arrays([record])]
@@ -0,0 +1,64 @@
+# tests/test_alert_service.py
+import asyncio
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+from azure.data.tables import UpdateMode
+
+from src.clients.sqlite_client import SqliteTableClient
+from src.clients.table_client import AzureTableClient
+from src.models.records import KeyVaultObjectRecord
+from src.services.alert_service import AlertService
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def make_record(vault: str, name: str, days: int = 5) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name=vault, object_name=name, object_type="Secret", subscription_id="sub-1",
+        expiration_date=NOW + timedelta(days=days), days_remaining=days, owner="owner@contoso.com",
+        created_at=NOW - timedelta(days=30)
+    )
+
+
+def projected(record: KeyVaultObjectRecord) -> KeyVaultObjectRecord:
+    # What an alert run reads with ALERT_COLUMNS
+    return replace(record, subscription_id=None, days_remaining=None, created_at=None)
+
+
+def test_alert_timestamps_keep_the_rest_of_the_record(tmp_path):
+    client = SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+    stored = make_record("vault", "key")
+    asyncio.run(client.batch_upsert([stored]))
+    service = AlertService(client, email_client=None)
+    asyncio.run(service._update_alert_timestamps([(projected(stored), 5)]))
+
+    record = client.snapshot.query(None, 1, 10)["records"][0]
+    assert record.last_alert_sent is not None
+    assert (record.subscription_id, record.days_remaining, record.created_at) == ("sub-1", 5, stored.created_at)
+    client.snapshot.close()
+
+
+class RecordingTable:
+    def __init__(self):
+        self.transactions = []
+
+    def submit_transaction(self, actions):
+        self.transactions.append(list(actions))
+
+
+def test_alert_timestamps_merge_only_last_alert_sent():
+    client = AzureTableClient(credential=None)
+    table = RecordingTable()
+    client._table_client = table
+    records = [(projected(make_record("vault-a", f"s{i}")), 5) for i in range(120)]
+    records.append((projected(make_record("vault-b", "x")), 5))
+    asyncio.run(AlertService(client, email_client=None)._update_alert_timestamps(records))
+
+    assert [len(actions) for actions in table.transactions] == [100, 20, 1]
+    for actions in table.transactions:
+        assert len({entity["PartitionKey"] for _, entity, _ in actions}) == 1
+        for operation, entity, options in actions:
+            assert operation == "upsert" and options == {"mode": UpdateMode.MERGE}
+            assert set(entity) == {"PartitionKey", "RowKey", "last_alert_sent"}
+            assert entity["last_alert_sent"] >= NOW
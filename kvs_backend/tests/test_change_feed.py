@@ -0,0 +1,210 @@
+# tests/test_change_feed.py
+import asyncio
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.clients.snapshot_store import InventorySnapshot
+from src.clients.sqlite_client import SqliteTableClient
+from src.models.records import KeyVaultObjectRecord
+from src.services.change_feed import ADDED, CHANGED, REMOVED, RESET, ChangeFeed, ObjectChange, VaultDiff
+from src.services.keyvault_service import KeyVaultService
+from src.services.live_updates import LiveUpdates
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def make_record(vault: str, name: str, days: int = 100, sub: str = "sub-1", **fields) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name=vault,
+        object_name=name,
+        object_type="Secret",
+        subscription_id=sub,
+        expiration_date=NOW + timedelta(days=days),
+        days_remaining=days,
+        **fields
+    )
+
+
+def test_vault_diff_kinds():
+    stored = {r.row_key: r for r in [make_record("v", "same"), make_record("v", "renewed"), make_record("v", "gone")]}
+    fetched = [
+        # Only our own bookkeeping differs: unchanged
+        make_record("v", "same", last_alert_sent=NOW, updated_at=NOW),
+        make_record("v", "renewed", days=400),
+        make_record("v", "new"),
+    ]
+    diff = VaultDiff.compute("v", fetched, stored)
+    assert [r.object_name for r in diff.added] == ["new"]
+    assert [r.object_name for r in diff.changed] == ["renewed"]
+    assert [r.object_name for r in diff.removed] == ["gone"]
+    assert [(c.kind, c.row_key) for c in diff.changes()] == [
+        (ADDED, "new_Secret"), (CHANGED, "renewed_Secret"), (REMOVED, "gone_Secret")
+    ]
+    assert diff.refreshed == []
+    assert VaultDiff.compute("v", fetched[:2], {r.row_key: r for r in fetched[:2]}).changes() == []
+
+
+def test_vault_diff_refreshes_days_remaining_only():
+    # A day later: same expiry, one day fewer remaining
+    fetched = make_record("v", "same", days=30)
+    stored = replace(fetched, days_remaining=31)
+    diff = VaultDiff.compute("v", [fetched], {stored.row_key: stored})
+    assert diff.changes() == [] and diff.refreshed == [fetched]
+
+
+class FakeKeyVaultClient:
+    def __init__(self, vaults, failing=()):
+        self.vaults = vaults
+        self.failing = set(failing)
+
+    async def list_subscriptions(self):
+        return [{"subscription_id": "sub-1"}]
+
+    async def list_key_vaults(self, sub_id):
+        return [{"name": name, "vault_uri": f"https://{name}.vault.azure.net/"} for name in self.vaults]
+
+    async def get_secrets(self, vault_url, vault_name, sub_id):
+        if vault_name in self.failing:
+            raise RuntimeError("forbidden")
+        return [make_record(vault_name, name) for name in self.vaults[vault_name]]
+
+    async def get_certificates(self, vault_url, vault_name, sub_id):
+        return []
+
+
+def test_sync_keeps_objects_of_a_vault_that_failed_to_scan(tmp_path):
+    client = SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+    feed = ChangeFeed(client.snapshot)
+    asyncio.run(client.batch_upsert([
+        make_record("healthy", "kept"), make_record("healthy", "stale"),
+        make_record("broken", "a"), make_record("broken", "b"),
+        make_record("deleted", "c"),
+    ]))
+    published = []
+    feed.subscribe(published.extend)
+    kv_client = FakeKeyVaultClient({"healthy": ["kept", "fresh"], "broken": ["a"]}, failing={"broken"})
+    stats = asyncio.run(KeyVaultService(kv_client, client, feed).sync_inventory())
+
+    stored = {(r.vault_name, r.object_name) for r in client.snapshot.query(None, 1, 100)["records"]}
+    assert stored == {("healthy", "kept"), ("healthy", "fresh"), ("broken", "a"), ("broken", "b")}
+    assert sorted((c.kind, c.vault_name, c.row_key) for c in published) == [
+        (ADDED, "healthy", "fresh_Secret"), (REMOVED, "deleted", "c_Secret"), (REMOVED, "healthy", "stale_Secret")
+    ]
+    assert len(stats["errors"]) == 1 and stats["vaults_removed"] == 1
+    # A sync with errors is not recorded as complete
+    assert client.snapshot.sync_state() == {"generation": 0, "synced_at": None}
+    kv_client.failing.clear()
+    asyncio.run(KeyVaultService(kv_client, client, feed).sync_inventory())
+    assert client.snapshot.sync_state()["generation"] == 1
+    client.snapshot.close()
+
+
+class RecordingClient(SqliteTableClient):
+    def __init__(self, path):
+        super().__init__(path)
+        self.upserted, self.merged = [], []
+
+    async def batch_upsert(self, records):
+        self.upserted.extend(r.object_name for r in records)
+        await super().batch_upsert(records)
+
+    async def batch_merge(self, records, fields):
+        self.merged.extend((r.object_name, tuple(fields)) for r in records)
+        await super().batch_merge(records, fields)
+
+
+def test_sync_writes_only_what_changed(tmp_path):
+    client = RecordingClient(str(tmp_path / "inventory.sqlite"))
+    asyncio.run(SqliteTableClient.batch_upsert(client, [
+        make_record("v", "same", owner="owner@contoso.com"),
+        make_record("v", "renewed", days=5),
+        replace(make_record("v", "aged"), days_remaining=101),
+    ]))
+    kv_client = FakeKeyVaultClient({"v": ["same", "renewed", "aged", "new"]})
+    kv_client.get_secrets = lambda vault_url, vault_name, sub_id: asyncio.sleep(0, [
+        make_record("v", "same", owner="owner@contoso.com"),
+        make_record("v", "renewed", days=400),
+        make_record("v", "aged"),
+        make_record("v", "new"),
+    ])
+    stats = asyncio.run(KeyVaultService(kv_client, client).sync_inventory())
+
+    assert sorted(client.upserted) == ["new", "renewed"]
+    assert client.merged == [("aged", ("days_remaining",))]
+    assert stats["objects_added"] == 1 and stats["objects_changed"] == 1 and stats["secrets_synced"] == 4
+    assert {r.object_name: r.days_remaining for r in client.snapshot.query(None, 1, 100)["records"]} == {
+        "same": 100, "renewed": 400, "aged": 100, "new": 100
+    }
+    client.snapshot.close()
+
+
+def publish(feed: ChangeFeed, count: int) -> None:
+    feed.publish([ObjectChange(ADDED, "v", f"s{i}_Secret") for i in range(count)])
+
+
+def test_memory_feed_trimming():
+    feed = ChangeFeed(retain=3)
+    publish(feed, 5)
+    assert feed.last_seq == 5
+    assert [c.seq for c in feed.since(2)] == [3, 4, 5]
+    assert feed.since(5) == []
+    assert feed.since(1) is None
+    # Ahead of the log (another process, or a restart): reload
+    assert feed.since(6) is None
+
+
+def test_snapshot_feed_trimming_and_restart(tmp_path):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.sqlite"))
+    feed = ChangeFeed(snapshot, retain=3)
+    assert feed.since(0) == []
+    publish(feed, 5)
+    assert [c.seq for c in feed.since(2)] == [3, 4, 5]
+    assert feed.since(5) == []
+    assert feed.since(1) is None
+    assert feed.since(7) is None
+    snapshot.close()
+
+    # A new log behind what a worker already delivered
+    snapshot = InventorySnapshot(str(tmp_path / "recreated.sqlite"))
+    feed = ChangeFeed(snapshot, retain=3)
+    delivered = []
+    feed.subscribe(delivered.extend)
+    assert feed.since(4) is None
+    feed.last_seq = 4
+    publish(feed, 2)
+    assert [(c.kind, c.seq) for c in delivered] == [(RESET, 2)]
+    publish(feed, 1)
+    assert [c.seq for c in delivered[1:]] == [3]
+    snapshot.close()
+
+
+def test_snapshot_feed_poll_resets_after_trimming(tmp_path):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.sqlite"))
+    writer = ChangeFeed(snapshot, retain=3)
+    reader = ChangeFeed(snapshot, retain=3)
+    delivered = []
+    reader.subscribe(delivered.extend)
+    publish(writer, 5)
+    reader.poll()
+    assert delivered[0].kind == RESET and delivered[0].seq == 2
+    assert [c.seq for c in delivered[1:]] == [3, 4, 5]
+    snapshot.close()
+
+
+@pytest.mark.parametrize("last_event_id, expected", [
+    ("", []),
+    ("5", []),
+    ("3", ["objects"]),
+    ("1", ["resync"]),
+    ("42", ["resync"]),
+    ("not-a-number", ["resync"]),
+])
+def test_replay(last_event_id, expected):
+    feed = ChangeFeed(retain=3)
+    publish(feed, 5)
+    frames = LiveUpdates(None, feed).replay(last_event_id)
+    assert [frame.split(b"event: ")[1].split(b"\n")[0].decode() for frame in frames] == expected
+    if expected == ["resync"]:
+        assert frames[0].startswith(b"id: 5\n")
@@ -0,0 +1,108 @@
+# tests/test_export.py
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.endpoints.keyvault import router
+from src.dependencies import get_table_client
+from src.models.records import KeyVaultObjectRecord
+from src.services.export_service import EXPORT_COLUMNS, iter_csv, iter_ndjson, iter_parquet
+
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def make_record(i: int) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name=f"vault-{i % 3}",
+        object_name=f"object-{i:03d}, \"quoted\"\nline",
+        object_type="Secret" if i % 2 else "Certificate",
+        subscription_id="sub-1",
+        expiration_date=NOW + timedelta(days=i) if i % 4 else None,
+        days_remaining=i if i % 4 else None,
+        owner="owner@contoso.com" if i % 5 else None,
+        issuer="CN=Zertifizierungsstelle Ä",
+        created_at=NOW - timedelta(days=30),
+        updated_at=NOW,
+        last_alert_sent=NOW - timedelta(hours=i) if i % 2 else None
+    )
+
+
+RECORDS = [make_record(i) for i in range(10)]
+# Uneven storage pages
+PAGES = [RECORDS[:4], [], RECORDS[4:5], RECORDS[5:]]
+
+
+def as_text(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def test_ndjson():
+    chunks = list(iter_ndjson(PAGES))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for line in b"".join(chunks).decode("utf-8").splitlines()]
+    assert rows == [{column: as_text(getattr(r, column)) for column in EXPORT_COLUMNS} for r in RECORDS]
+
+
+def test_csv():
+    data = b"".join(iter_csv(PAGES)).decode("utf-8")
+    rows = list(csv.reader(io.StringIO(data)))
+    assert rows[0] == EXPORT_COLUMNS
+    expected = [
+        ["" if getattr(r, c) is None else str(as_text(getattr(r, c))) for c in EXPORT_COLUMNS] for r in RECORDS
+    ]
+    assert rows[1:] == expected
+
+
+def test_csv_header_only():
+    assert b"".join(iter_csv([])).decode("utf-8").strip() == ",".join(EXPORT_COLUMNS)
+
+
+@pytest.mark.parametrize("row_group_size, row_groups", [(3, 4), (5, 2), (100, 1)])
+def test_parquet_round_trip(row_group_size, row_groups):
+    pq = pytest.importorskip("pyarrow.parquet")
+    chunks = list(iter_parquet(PAGES, row_group_size=row_group_size))
+    # Streamed: every row group arrives in its own chunk before the footer
+    assert len(chunks) == row_groups + 1
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet_file.metadata.num_row_groups == row_groups
+    assert parquet_file.read().to_pylist() == [
+        {column: getattr(r, column) for column in EXPORT_COLUMNS} for r in RECORDS
+    ]
+    table = pq.read_table(io.BytesIO(b"".join(chunks)))
+    assert table.num_rows == len(RECORDS)
+
+
+def test_parquet_empty():
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(b"".join(iter_parquet([]))))
+    assert table.num_rows == 0 and table.column_names == EXPORT_COLUMNS
+
+
+class FakeTableClient:
+    def __init__(self):
+        self.filters = None
+
+    def iter_record_pages(self, filters=None, results_per_page=1000, select=None):
+        self.filters = filters
+        return iter(PAGES)
+
+
+def test_export_endpoint_format_parameter():
+    table_client = FakeTableClient()
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_table_client] = lambda: table_client
+    with TestClient(app) as client:
+        response = client.get("/api/keyvault/export", params={"format": "csv", "vault_name": "vault-1"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.headers["content-disposition"] == 'attachment; filename="keyvault-objects.csv"'
+        assert response.content == b"".join(iter_csv(PAGES))
+        assert table_client.filters.vault_name == "vault-1"
+        assert client.get("/api/keyvault/export").headers["content-type"] == "application/x-ndjson"
+        assert client.get("/api/keyvault/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,78 @@
+# tests/test_kpi_summary.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from typing import Optional
+
+from src.clients.query_planner import KPI_COLUMNS
+from src.clients.sqlite_client import SqliteTableClient
+from src.clients.table_client import AzureTableClient
+from src.models.records import KeyVaultObjectRecord
+
+NOW = datetime.now(timezone.utc)
+
+
+def make_record(name: str, expires_in: Optional[timedelta], stored_days: int, **fields) -> KeyVaultObjectRecord:
+    # stored_days is what an earlier sync wrote; the KPI must not trust it
+    return KeyVaultObjectRecord(
+        vault_name="vault-a",
+        object_name=name,
+        object_type=fields.pop("object_type", "Secret"),
+        subscription_id="sub-1",
+        expiration_date=NOW + expires_in if expires_in is not None else None,
+        days_remaining=stored_days,
+        created_at=NOW - timedelta(days=90),
+        updated_at=NOW - timedelta(days=5),
+        **fields
+    )
+
+
+RECORDS = [
+    make_record("expired", timedelta(days=-3), 2),
+    make_record("now-in-30", timedelta(days=29, hours=23), 35),
+    make_record("now-past-30", timedelta(days=30, hours=1), 25, object_type="Certificate"),
+    make_record("now-in-60", timedelta(days=59), 64, last_alert_sent=NOW),
+    make_record("now-past-60", timedelta(days=61), 10),
+    make_record("no-expiry", None, 1),
+]
+
+EXPECTED = {
+    "total_secrets": 5,
+    "total_certificates": 1,
+    "expiring_30_days": 2,
+    "expiring_60_days": 4,
+    "alerts_sent_today": 1
+}
+
+
+class ProjectingTable:
+    """list_entities over stored entities, honouring select"""
+
+    def __init__(self, entities):
+        self.entities = entities
+        self.selects = []
+
+    def list_entities(self, results_per_page, select):
+        self.selects.append(select)
+        return Pages([{k: v for k, v in e.items() if k in select} for e in self.entities])
+
+
+class Pages(list):
+    def by_page(self):
+        return [self]
+
+
+def test_sqlite_kpi_uses_expiration_date(tmp_path):
+    client = SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+    asyncio.run(client.batch_upsert(RECORDS))
+    assert asyncio.run(client.get_kpi_summary()) == EXPECTED
+    client.snapshot.close()
+
+
+def test_table_kpi_projects_expiration_date():
+    client = AzureTableClient(credential=None)
+    table = ProjectingTable([record.to_entity() for record in RECORDS])
+    client._table_client = table
+    assert asyncio.run(client.get_kpi_summary()) == EXPECTED
+    assert table.selects == [KPI_COLUMNS]
+    assert "expiration_date" in KPI_COLUMNS and "days_remaining" not in KPI_COLUMNS
@@ -0,0 +1,198 @@
+# tests/test_leader_election.py
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+from src.clients.snapshot_store import InventorySnapshot
+from src.clients.sqlite_client import SqliteTableClient
+from src.clients.table_client import AzureTableClient
+from src.models.records import KeyVaultObjectRecord
+from src.services.invalidation import InvalidationBus
+from src.services.leader_election import (
+    FileLeaderLease, LeaderElector, LeaderLease, TableLeaderLease, create_elector
+)
+
+
+def test_leader_lease_is_abstract():
+    with pytest.raises(TypeError):
+        LeaderLease()
+
+
+def test_file_lease_is_exclusive(tmp_path):
+    path = str(tmp_path / "leader.lock")
+    first, second = FileLeaderLease(path), FileLeaderLease(path)
+    assert first.try_acquire()
+    assert first.try_acquire()  # renewing is a no-op
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    second.release()
+
+
+class Entity(dict):
+    def __init__(self, data, etag):
+        super().__init__(data)
+        self.metadata = {"etag": etag}
+
+
+class FakeLeaseTable:
+    """Table Storage's conditional-write semantics for one partition"""
+
+    def __init__(self):
+        self.entities = {}
+        self.version = 0
+        self.after_get = None
+
+    def _store(self, entity):
+        self.version += 1
+        self.entities[(entity["PartitionKey"], entity["RowKey"])] = (dict(entity), f"etag-{self.version}")
+
+    def get_entity(self, partition_key, row_key):
+        if (partition_key, row_key) not in self.entities:
+            raise ResourceNotFoundError("not found")
+        data, etag = self.entities[(partition_key, row_key)]
+        hook, self.after_get = self.after_get, None
+        if hook:
+            hook()
+        return Entity(data, etag)
+
+    def create_entity(self, entity):
+        if (entity["PartitionKey"], entity["RowKey"]) in self.entities:
+            raise ResourceExistsError("exists")
+        self._store(entity)
+
+    def update_entity(self, entity, mode, etag, match_condition):
+        key = (entity["PartitionKey"], entity["RowKey"])
+        if key not in self.entities:
+            raise ResourceNotFoundError("not found")
+        if self.entities[key][1] != etag:
+            raise ResourceModifiedError("precondition failed")
+        self._store(entity)
+
+    def delete_entity(self, partition_key, row_key, etag, match_condition):
+        if self.entities.get((partition_key, row_key), (None, None))[1] != etag:
+            raise ResourceModifiedError("precondition failed")
+        del self.entities[(partition_key, row_key)]
+
+    def holder(self):
+        return self.entities[("leader", "scheduler")][0]["holder"]
+
+
+def table_lease(table: FakeLeaseTable, holder: str, ttl_seconds: int = 60) -> TableLeaderLease:
+    lease = TableLeaderLease(lambda: table, ttl_seconds=ttl_seconds)
+    lease.holder = holder
+    return lease
+
+
+def test_table_lease_acquire_renew_expire_release():
+    table = FakeLeaseTable()
+    a, b = table_lease(table, "host-a"), table_lease(table, "host-b")
+    assert a.try_acquire() and table.holder() == "host-a"
+    assert not b.try_acquire()
+    assert a.try_acquire()  # renew
+    # The holder died: its lease lapses
+    data, etag = table.entities[("leader", "scheduler")]
+    data["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    assert b.try_acquire() and table.holder() == "host-b"
+    assert not a.try_acquire()
+    a.release()  # not the holder: no effect
+    assert table.holder() == "host-b"
+    b.release()
+    assert table.entities == {}
+    assert a.try_acquire()
+
+
+def test_table_lease_etag_conflict():
+    table = FakeLeaseTable()
+    table_lease(table, "dead", ttl_seconds=-1).try_acquire()
+    a, b = table_lease(table, "host-a"), table_lease(table, "host-b")
+    # b reads the expired lease, then a takes it over before b writes
+    table.after_get = lambda: a.try_acquire()
+    assert not b.try_acquire()
+    assert table.holder() == "host-a"
+
+
+def test_table_lease_create_race():
+    table = FakeLeaseTable()
+    lease = table_lease(table, "host-b")
+    original = table.get_entity
+
+    def get_then_lose_race(partition_key, row_key):
+        table.get_entity = original
+        try:
+            return original(partition_key, row_key)
+        finally:
+            table_lease(table, "host-a").try_acquire()
+
+    table.get_entity = get_then_lose_race
+    assert not lease.try_acquire()
+    assert table.holder() == "host-a"
+
+
+def test_elector_handover(tmp_path):
+    path = str(tmp_path / "leader.lock")
+
+    async def scenario():
+        electors = [LeaderElector(FileLeaderLease(path), renew_interval=0.01) for _ in range(2)]
+        for elector in electors:
+            elector.start()
+        await asyncio.gather(*(elector.decided.wait() for elector in electors))
+        await asyncio.sleep(0.05)
+        leaders = [elector for elector in electors if elector.is_leader]
+        assert len(leaders) == 1
+        follower = next(elector for elector in electors if not elector.is_leader)
+        await leaders[0].stop()
+        for _ in range(100):
+            if follower.is_leader:
+                break
+            await asyncio.sleep(0.01)
+        assert follower.is_leader and not leaders[0].is_leader
+        await follower.stop()
+
+    asyncio.run(scenario())
+
+
+def test_default_lease_follows_the_backend(tmp_path, monkeypatch, caplog):
+    monkeypatch.delenv("LEADER_LEASE", raising=False)
+    monkeypatch.setenv("LEADER_LOCK_PATH", str(tmp_path / "leader.lock"))
+    azure = AzureTableClient(credential=None)
+    assert isinstance(create_elector(azure).lease, TableLeaderLease)
+    sqlite = SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+    assert isinstance(create_elector(sqlite).lease, FileLeaderLease)
+    sqlite.snapshot.close()
+
+    monkeypatch.setenv("LEADER_LEASE", "file")
+    with caplog.at_level(logging.WARNING):
+        assert isinstance(create_elector(azure).lease, FileLeaderLease)
+    assert "single-host" in caplog.text
+
+
+def test_invalidation_bus_sees_other_workers_commits(tmp_path):
+    path = str(tmp_path / "snapshot.sqlite")
+    writer, reader = InventorySnapshot(path), InventorySnapshot(path)
+    calls = []
+
+    async def scenario():
+        bus = InvalidationBus(reader, poll_interval=0.01)
+        bus.subscribe(lambda: calls.append(threading.current_thread() is threading.main_thread()))
+        bus.start()
+        await asyncio.sleep(0.05)
+        assert calls == []
+        record = KeyVaultObjectRecord(vault_name="v", object_name="a", object_type="Secret", subscription_id="s")
+        await asyncio.to_thread(writer.reconcile, [[record]])
+        for _ in range(100):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        bus.stop()
+
+    asyncio.run(scenario())
+    # Checked off the event loop thread, and readiness was re-read
+    assert calls and not any(calls)
+    assert reader.is_ready
+    writer.close()
+    reader.close()
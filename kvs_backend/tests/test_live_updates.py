@@ -0,0 +1,251 @@
+# tests/test_live_updates.py
+import asyncio
+import threading
+import time
+
+import src.services.live_updates as live_updates_module
+from src.clients.snapshot_store import InventorySnapshot
+from src.services.change_feed import ADDED, ALERTED, ChangeFeed, ObjectChange
+from src.services.live_updates import HEARTBEAT, EventBroker, LiveUpdates, sse_frame
+
+
+def frames_of(queue: asyncio.Queue) -> list:
+    frames = []
+    while not queue.empty():
+        frames.append(queue.get_nowait())
+    return frames
+
+
+def test_overflowing_client_gets_a_resync():
+    async def scenario():
+        broker = EventBroker(max_clients=2, queue_size=2)
+        slow, fast = broker.connect(), broker.connect()
+        assert broker.connect() is None
+        frames = [sse_frame("objects", {"n": i}, i) for i in range(3)]
+        broker.broadcast(frames[0])
+        broker.broadcast(frames[1])
+        frames_of(fast)
+        broker.broadcast(frames[2])
+        return frames, frames_of(slow), frames_of(fast)
+
+    frames, slow, fast = asyncio.run(scenario())
+    assert slow == [sse_frame("resync", {"reason": "lagging"})]
+    assert fast == [frames[2]]
+
+
+def test_close_ends_streams():
+    async def scenario():
+        broker = EventBroker(queue_size=2)
+        queue = broker.connect()
+        received = []
+
+        async def read():
+            async for frame in broker.stream(queue, [b"initial"]):
+                received.append(frame)
+
+        reader = asyncio.create_task(read())
+        broker.broadcast(b"one")
+        broker.broadcast(b"two")
+        broker.broadcast(b"three")
+        await asyncio.sleep(0)
+        broker.close()
+        await asyncio.wait_for(reader, 1)
+        return broker, received
+
+    broker, received = asyncio.run(scenario())
+    assert received[0] == b"initial" and HEARTBEAT not in received
+    assert broker.client_count == 0
+    assert broker.connect() is None
+
+
+def test_shutdown_from_another_thread():
+    async def scenario():
+        live_updates = LiveUpdates(None, ChangeFeed())
+        live_updates.start()
+        queue = live_updates.broker.connect()
+        reader = asyncio.create_task(anext(live_updates.broker.stream(queue), None))
+        await asyncio.sleep(0)
+        await asyncio.to_thread(live_updates.shutdown)
+        return await asyncio.wait_for(reader, 1)
+
+    assert asyncio.run(scenario()) is None
+
+
+class FlakyTableClient:
+    def __init__(self, failing_calls=()):
+        self.failing_calls = set(failing_calls)
+        self.calls = 0
+
+    async def get_kpi_summary(self):
+        self.calls += 1
+        if self.calls in self.failing_calls:
+            raise RuntimeError("table unavailable")
+        return {"total": self.calls}
+
+
+def test_failed_kpi_recount_is_retried():
+    async def scenario():
+        live_updates = LiveUpdates(FlakyTableClient(failing_calls={2}), ChangeFeed())
+        first = await live_updates.kpi_summary()
+        live_updates._kpi_stale = True  # a sync changed the inventory
+        try:
+            await live_updates.kpi_summary()
+        except RuntimeError:
+            pass
+        return first, await live_updates.kpi_summary()
+
+    # The failed recount is not replaced by the summary from before the change
+    assert asyncio.run(scenario()) == ({"total": 1}, {"total": 3})
+
+
+def test_publish_sends_changes_to_clients():
+    async def scenario():
+        feed = ChangeFeed()
+        live_updates = LiveUpdates(FlakyTableClient(), feed)
+        live_updates.start()
+        queue = live_updates.broker.connect()
+        feed.publish([ObjectChange(ADDED, "vault", "key_Secret")])
+        await asyncio.sleep(0)
+        frames = frames_of(queue)
+        live_updates.stop()
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert frames[0].startswith(b"id: 1\nevent: objects\n")
+
+
+def test_failed_kpi_refresh_retries_with_backoff(monkeypatch, caplog):
+    monkeypatch.setattr(live_updates_module, "LIVE_KPI_DEBOUNCE_SECONDS", 0.01)
+    monkeypatch.setattr(live_updates_module, "LIVE_KPI_MAX_BACKOFF_SECONDS", 0.03)
+    table_client = FlakyTableClient(failing_calls={1, 2, 3})
+
+    async def scenario():
+        feed = ChangeFeed()
+        live_updates = LiveUpdates(table_client, feed)
+        live_updates.start()
+        queue = live_updates.broker.connect()
+        feed.publish([ObjectChange(ADDED, "vault", "key_Secret")])
+        frames = []
+        while not any(b"event: kpi" in frame for frame in frames):
+            frames.append(await asyncio.wait_for(queue.get(), 5))
+        live_updates.stop()
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert table_client.calls == 4
+    assert b'"summary":{"total":4}' in frames[-1]
+    # Doubled from the debounce interval, capped
+    retries = [r.getMessage() for r in caplog.records if "retrying in" in r.getMessage()]
+    assert [message.split("retrying in ")[1].split("s:")[0] for message in retries] == ["0.02", "0.03", "0.03"]
+
+
+def test_kpi_refresh_stops_without_clients(monkeypatch):
+    monkeypatch.setattr(live_updates_module, "LIVE_KPI_DEBOUNCE_SECONDS", 0.01)
+    table_client = FlakyTableClient(failing_calls=set(range(1, 1000)))
+
+    async def scenario():
+        feed = ChangeFeed()
+        live_updates = LiveUpdates(table_client, feed)
+        live_updates.start()
+        queue = live_updates.broker.connect()
+        feed.publish([ObjectChange(ADDED, "vault", "key_Secret")])
+        await asyncio.sleep(0.05)
+        live_updates.broker.disconnect(queue)
+        await asyncio.wait_for(live_updates._kpi_task, 1)
+        return live_updates
+
+    live_updates = asyncio.run(scenario())
+    # Recounted on the next request instead
+    assert live_updates._kpi_stale
+
+
+def test_concurrent_publishers_are_delivered_in_seq_order():
+    feed = ChangeFeed()
+    delivered = []
+
+    def slow_subscriber(changes):
+        time.sleep(0.001)
+        delivered.append([change.seq for change in changes])
+
+    feed.subscribe(slow_subscriber)
+
+    def publisher(worker):
+        for i in range(20):
+            feed.publish([ObjectChange(ADDED, "vault", f"w{worker}-{i}-{j}_Secret") for j in range(3)])
+
+    threads = [threading.Thread(target=publisher, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    seqs = [seq for batch in delivered for seq in batch]
+    assert seqs == list(range(1, 8 * 20 * 3 + 1))
+
+
+def test_shared_feed_pollers_deliver_in_seq_order(tmp_path):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.sqlite"))
+    feed = ChangeFeed(snapshot)
+    delivered = []
+
+    def slow_subscriber(changes):
+        time.sleep(0.001)
+        delivered.extend(change.seq for change in changes)
+
+    feed.subscribe(slow_subscriber)
+    stop = threading.Event()
+
+    def poller():
+        while not stop.is_set():
+            feed.poll()
+
+    pollers = [threading.Thread(target=poller) for _ in range(3)]
+    for thread in pollers:
+        thread.start()
+    writer = ChangeFeed(snapshot)
+    for i in range(50):
+        writer.publish([ObjectChange(ADDED, "vault", f"s{i}_Secret")])
+        feed.publish([ObjectChange(ADDED, "vault", f"t{i}_Secret")])
+    stop.set()
+    for thread in pollers:
+        thread.join()
+    feed.poll()
+    snapshot.close()
+    assert delivered == list(range(1, 101))
+
+
+def test_subscriber_may_publish():
+    feed = ChangeFeed()
+    delivered = []
+
+    def echo(changes):
+        delivered.append(changes[0].seq)
+        if changes[0].kind == ADDED:
+            feed.publish([ObjectChange(ALERTED, "vault", changes[0].row_key)])
+
+    feed.subscribe(echo)
+    feed.publish([ObjectChange(ADDED, "vault", "key_Secret")])
+    assert delivered == [1, 2]
+
+
+def test_live_frames_follow_the_feed_order():
+    async def scenario():
+        feed = ChangeFeed()
+        # Widens the window between numbering a batch and handing it to the loop
+        feed.subscribe(lambda changes: time.sleep(0.001))
+        live_updates = LiveUpdates(FlakyTableClient(), feed)
+        live_updates.start()
+        queue = live_updates.broker.connect()
+
+        def publisher(worker):
+            for i in range(10):
+                feed.publish([ObjectChange(ADDED, "vault", f"w{worker}-{i}_Secret")])
+
+        await asyncio.gather(*(asyncio.to_thread(publisher, worker) for worker in range(4)))
+        await asyncio.sleep(0.01)
+        frames = frames_of(queue)
+        live_updates.stop()
+        return [frame for frame in frames if frame.startswith(b"id: ")]
+
+    frames = asyncio.run(scenario())
+    assert [int(frame.split(b"\n")[0][4:]) for frame in frames] == list(range(1, 41))
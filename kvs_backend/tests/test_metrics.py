@@ -0,0 +1,82 @@
+# tests/test_metrics.py
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src.metrics import count_objects, instrumented, metrics_middleware, track_call, track_stage
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_instrumented_times_calls_and_counts_failures():
+    labels = {"client": "test", "operation": "fetch"}
+    calls = sample("kvs_client_call_seconds_count", **labels)
+    errors = sample("kvs_client_call_errors_total", **labels)
+
+    @instrumented("test", "fetch")
+    async def fetch(fail: bool):
+        if fail:
+            raise RuntimeError("boom")
+        return "ok"
+
+    assert asyncio.run(fetch(False)) == "ok"
+    with pytest.raises(RuntimeError):
+        asyncio.run(fetch(True))
+    assert sample("kvs_client_call_seconds_count", **labels) == calls + 2
+    assert sample("kvs_client_call_errors_total", **labels) == errors + 1
+
+
+def test_track_call_and_stage():
+    labels = {"client": "test", "operation": "inline"}
+    calls = sample("kvs_client_call_seconds_count", **labels)
+    with track_call("test", "inline"):
+        pass
+    with pytest.raises(ValueError):
+        with track_call("test", "inline"):
+            raise ValueError
+    assert sample("kvs_client_call_seconds_count", **labels) == calls + 2
+    assert sample("kvs_client_call_errors_total", **labels) >= 1
+
+    stage = {"pipeline": "test", "stage": "load"}
+    before = sample("kvs_pipeline_stage_seconds_count", **stage)
+    with track_stage("test", "load"):
+        pass
+    assert sample("kvs_pipeline_stage_seconds_count", **stage) == before + 1
+    assert sample("kvs_pipeline_stage_seconds_bucket", le="300.0", **stage) == before + 1
+
+
+def test_count_objects_keeps_vault_detail():
+    labels = {"pipeline": "test", "stage": "secrets", "vault": "vault-a"}
+    before = sample("kvs_pipeline_objects_total", **labels)
+    count_objects("test", "secrets", 3, "vault-a")
+    count_objects("test", "secrets", 0, "vault-a")
+    assert sample("kvs_pipeline_objects_total", **labels) == before + 3
+
+
+def test_http_middleware_labels_route_templates():
+    app = FastAPI()
+    app.middleware("http")(metrics_middleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        if item_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    ok = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    missing = dict(ok, status="404")
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = [sample("kvs_http_request_seconds_count", **labels) for labels in (ok, missing, unmatched)]
+    with TestClient(app) as client:
+        client.get("/items/a")
+        client.get("/items/b")
+        client.get("/items/missing")
+        client.get("/nowhere")
+    after = [sample("kvs_http_request_seconds_count", **labels) for labels in (ok, missing, unmatched)]
+    assert [a - b for a, b in zip(after, before)] == [2, 1, 1]
+    assert sample("kvs_startup_seconds", phase="first_response") > 0
@@ -0,0 +1,125 @@
+# tests/test_objects_response.py
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.endpoints.keyvault import router, to_object_response
+from src.dependencies import get_table_client
+from src.models.records import KeyVaultObjectRecord
+from src.models.schemas import KeyVaultObjectResponse, PaginatedResponse
+
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def make_record(**overrides) -> KeyVaultObjectRecord:
+    fields = dict(
+        vault_name="vault-1",
+        object_name="db-password",
+        object_type="Secret",
+        subscription_id="sub-1",
+        expiration_date=NOW + timedelta(days=20),
+        days_remaining=20,
+        owner="owner@contoso.com",
+        distribution_email=None,
+        created_at=NOW - timedelta(days=30),
+        updated_at=NOW
+    )
+    fields.update(overrides)
+    return KeyVaultObjectRecord(**fields)
+
+
+def validated(record: KeyVaultObjectRecord) -> KeyVaultObjectResponse:
+    """The response model as the handler built it before model_construct"""
+    return KeyVaultObjectResponse(
+        object_name=record.object_name,
+        object_type=record.object_type,
+        vault_name=record.vault_name,
+        subscription_id=record.subscription_id,
+        expiration_date=record.expiration_date,
+        days_remaining=record.days_remaining,
+        owner=record.owner,
+        distribution_email=record.distribution_email,
+        issuer=record.issuer,
+        thumbprint=record.thumbprint,
+        created_at=record.created_at,
+        updated_at=record.updated_at
+    )
+
+
+def page_json(items) -> dict:
+    page = PaginatedResponse.model_construct(items=items, total_count=len(items), page=1, page_size=50, has_next=False)
+    return json.loads(page.model_dump_json())
+
+
+RECORDS = [
+    make_record(),
+    make_record(object_name="api-cert", object_type="Certificate", issuer="CN=Zertifizierungsstelle Ä", thumbprint="ab12"),
+    make_record(owner="Owner@Contoso.COM", distribution_email="Team List <Team@Contoso.COM>"),
+    make_record(owner="  padded@contoso.com "),
+    make_record(owner=None, expiration_date=None, days_remaining=None),
+    make_record(expiration_date=NOW + timedelta(days=3, microseconds=1500), updated_at=NOW.replace(tzinfo=None)),
+]
+
+
+class FakeTableClient:
+    def __init__(self, records):
+        self.records = records
+
+    async def query_entities(self, filters=None, page=1, page_size=50):
+        return {"records": self.records, "total_count": 120, "page": page, "page_size": page_size, "has_next": True}
+
+
+def make_client(records) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_table_client] = lambda: FakeTableClient(records)
+
+    @app.get("/baseline", response_model=PaginatedResponse)
+    async def baseline():
+        # What the handler returned before: validated models, serialized by FastAPI
+        return PaginatedResponse(
+            items=[validated(record) for record in records], total_count=120, page=2, page_size=6, has_next=True
+        )
+
+    return TestClient(app)
+
+
+def test_matches_validated_serialization():
+    expected = page_json([validated(record) for record in RECORDS])
+    assert page_json([to_object_response(record) for record in RECORDS]) == expected
+    assert expected["items"][2]["owner"] == "Owner@contoso.com"
+    assert expected["items"][2]["distribution_email"] == "Team@contoso.com"
+
+
+def test_response_bytes_match_response_model_serialization():
+    client = make_client(RECORDS)
+    response = client.get("/api/keyvault/objects", params={"page": 2, "page_size": 6})
+    baseline = client.get("/baseline")
+    assert response.status_code == baseline.status_code == 200
+    assert response.content == baseline.content
+    assert response.headers["content-type"] == baseline.headers["content-type"]
+
+
+def test_openapi_documents_the_page_model():
+    schema = make_client([]).app.openapi()
+    content = schema["paths"]["/api/keyvault/objects"]["get"]["responses"]["200"]["content"]
+    assert content["application/json"]["schema"]["$ref"].startswith("#/components/schemas/PaginatedResponse")
+
+
+@pytest.mark.parametrize("overrides", [
+    {"object_type": None},
+    {"object_type": "Key"},
+    {"owner": "not-an-email"},
+    {"distribution_email": ""},
+    {"created_at": None},
+])
+def test_invalid_rows_fail_the_page(overrides):
+    record = make_record(**overrides)
+    with pytest.raises(ValueError):
+        to_object_response(record)
+    # As with response model validation: the page is not returned short
+    response = make_client([make_record(), record]).get("/api/keyvault/objects")
+    assert response.status_code == 500
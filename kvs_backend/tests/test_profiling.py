@@ -0,0 +1,105 @@
+# tests/test_profiling.py
+import asyncio
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src import profiling
+from src.profiling import PROFILE_HEADER, PipelineSampler, profiling_middleware, require_admin_token
+
+TOKEN = "s3cret"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_OUTPUT_DIR", None)
+    app = FastAPI()
+    app.middleware("http")(profiling_middleware)
+
+    @app.get("/data")
+    async def data():
+        return {"value": 1}
+
+    @app.get("/admin", dependencies=[Depends(require_admin_token)])
+    async def admin():
+        return {"admin": True}
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            yield b"event: kpi\ndata: {}\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_profile_header_gate(client):
+    assert client.get("/data").json() == {"value": 1}
+    assert client.get("/data", headers={PROFILE_HEADER: "wrong"}).json() == {"value": 1}
+    # Query strings end up in access logs: not accepted
+    assert client.get("/data", params={"profile": TOKEN}).json() == {"value": 1}
+    profiled = client.get("/data", headers={PROFILE_HEADER: TOKEN})
+    assert profiled.headers["content-type"].startswith("text/html")
+
+
+def test_event_streams_are_not_profiled(client):
+    response = client.get("/events", headers={PROFILE_HEADER: TOKEN})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.content == b"event: kpi\ndata: {}\n\n"
+
+
+def test_admin_token(client, monkeypatch):
+    assert client.get("/admin").status_code == 403
+    assert client.get("/admin", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin", headers={"X-Admin-Token": TOKEN}).json() == {"admin": True}
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", None)
+    assert client.get("/admin", headers={"X-Admin-Token": TOKEN}).status_code == 404
+    assert client.get("/data", headers={PROFILE_HEADER: TOKEN}).json() == {"value": 1}
+
+
+def busy_pipeline_step(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def busy_request_handler(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_attributes_samples_to_the_pipeline_task():
+    sampler = PipelineSampler(0.002)
+
+    async def pipeline():
+        sampler.enter("sync")
+        try:
+            for _ in range(20):
+                busy_pipeline_step(0.005)
+                await asyncio.sleep(0.005)
+        finally:
+            sampler.exit("sync")
+
+    async def request():
+        # Shares the loop thread with the pipeline but is not part of it
+        for _ in range(40):
+            busy_request_handler(0.005)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        await asyncio.gather(pipeline(), request())
+
+    asyncio.run(scenario())
+    stacks = sampler.collapsed("sync")
+    assert "test_profiling.py:pipeline" in stacks
+    assert "busy_pipeline_step" in stacks
+    assert "busy_request_handler" not in stacks
+    assert "test_profiling.py:request" not in stacks
+    sampler.reset("sync")
+    assert sampler.collapsed("sync") == ""
@@ -0,0 +1,86 @@
+# tests/test_query_planner.py
+import asyncio
+
+import pytest
+
+from src.clients.query_planner import ALERT_COLUMNS, odata_string, plan_query, prefix_range
+from src.clients.sqlite_client import SqliteTableClient
+from src.models.records import KeyVaultObjectRecord
+from src.models.schemas import ObjectType, QueryFilters
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("vault", "'vault'"),
+    ("O'Brien", "'O''Brien'"),
+    ("''", "''''''"),
+    ("' or true or '", "''' or true or '''"),
+    ("", "''"),
+])
+def test_odata_string_quoting(value, expected):
+    assert odata_string(value) == expected
+
+
+@pytest.mark.parametrize("prefix", ["api", "a", "db-", "z", "key~"])
+def test_prefix_range(prefix):
+    low, high = prefix_range(prefix)
+    assert low == prefix
+    for name in [prefix, prefix + "-key", prefix + "￿", prefix + "zzz"]:
+        assert low <= name < high
+    for name in [prefix[:-1], prefix[:-1] + chr(ord(prefix[-1]) - 1) + "zzz", high, high + "a"]:
+        assert not (low <= name < high)
+
+
+@pytest.mark.parametrize("filters, kind", [
+    (None, "scan"),
+    (QueryFilters(owner="owner@contoso.com"), "scan"),
+    (QueryFilters(vault_name="vault"), "partition"),
+    (QueryFilters(vault_name="vault", object_name="key"), "point"),
+    (QueryFilters(vault_name="vault", object_name="key", owner="owner@contoso.com"), "range"),
+    (QueryFilters(vault_name="vault", name_prefix="api"), "range"),
+    # RowKey conditions without a PartitionKey read every partition
+    (QueryFilters(object_name="key"), "scan"),
+    (QueryFilters(name_prefix="api"), "scan"),
+])
+def test_plan_kinds(filters, kind):
+    assert plan_query(filters).kind == kind
+
+
+def test_prefix_range_at_the_last_code_point():
+    top = chr(0x10FFFF)
+    assert prefix_range("api" + top) == ("api" + top, "apj")
+    assert prefix_range("api" + top + top) == ("api" + top + top, "apj")
+    assert prefix_range(top) == (top, None)
+    plan = plan_query(QueryFilters(vault_name="vault", name_prefix="api" + top))
+    assert plan.filter == (
+        f"PartitionKey eq 'vault' and RowKey ge 'api{top}' and RowKey lt 'apj' "
+        f"and object_name ge 'api{top}' and object_name lt 'apj'"
+    )
+    # Nothing sorts after U+10FFFF...: only a lower bound
+    plan = plan_query(QueryFilters(vault_name="vault", name_prefix=top + top))
+    assert plan.filter == f"PartitionKey eq 'vault' and RowKey ge '{top}{top}' and object_name ge '{top}{top}'"
+
+
+def test_snapshot_prefix_query_at_the_last_code_point(tmp_path):
+    top = chr(0x10FFFF)
+    client = SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+    asyncio.run(client.batch_upsert([
+        KeyVaultObjectRecord(vault_name="vault", object_name=name, object_type="Secret", subscription_id="sub-1")
+        for name in ["api", "api" + top, "api" + top + "-key", "api" + top + top, "apj", top, top + top, top + "a"]
+    ]))
+
+    def names(prefix):
+        result = asyncio.run(client.query_entities(QueryFilters(name_prefix=prefix)))
+        return sorted(r.object_name for r in result["records"])
+
+    assert names("api" + top) == ["api" + top, "api" + top + "-key", "api" + top + top]
+    assert names(top) == [top, top + "a", top + top]
+    assert names(top + top) == [top + top]
+    client.snapshot.close()
+
+
+def test_plans_keep_row_key_conditions():
+    plan = plan_query(QueryFilters(object_name="it's", object_type=ObjectType.SECRET), select=ALERT_COLUMNS)
+    assert plan.filter == "(RowKey eq 'it''s_Secret') and object_type eq 'Secret'"
+    assert plan.select == ALERT_COLUMNS
+    plan = plan_query(QueryFilters(vault_name="vault", object_name="key"))
+    assert plan.keys == (("vault", "key_Secret"), ("vault", "key_Certificate"))
@@ -0,0 +1,205 @@
+# tests/test_sharded_sync.py
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+import pytest
+
+from src.services.keyvault_service import new_sync_stats
+from src.services.sharded_sync import (
+    DONE, FAILED, RUNNING, Shard, ShardedSync, ShardStore, SqliteShardStore, TableShardStore
+)
+
+VAULTS = [f"vault-{i:02d}" for i in range(10)]
+
+
+class FakeTableClient:
+    def __init__(self):
+        self.completed = 0
+
+    async def reconcile_snapshot(self):
+        pass
+
+
+class FakeKeyVaultClient:
+    def __init__(self, vaults):
+        self.vaults = vaults
+
+    async def list_key_vaults(self, sub_id):
+        return [{"name": name, "vault_uri": f"https://{name}.vault.azure.net/"} for name in self.vaults]
+
+
+class FakeKeyVaultService:
+    """Records which vaults each worker synced"""
+
+    def __init__(self, synced: Counter, fail: bool = False, vaults=VAULTS):
+        self.kv_client = FakeKeyVaultClient(vaults)
+        self.table_client = FakeTableClient()
+        self.synced = synced
+        self.fail = fail
+
+    async def list_target_subscriptions(self, subscription_ids=None):
+        return [{"subscription_id": "sub-1"}]
+
+    async def sync_vaults(self, vaults):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("throttled")
+        self.synced.update(vault["name"] for vault in vaults)
+        stats = new_sync_stats()
+        stats["vaults_processed"] = len(vaults)
+        return stats
+
+    async def remove_deleted_vaults(self, listed, complete_sync=False):
+        self.table_client.completed += complete_sync
+        return new_sync_stats()
+
+
+def make_sync(path, synced: Counter, holder: str, **service) -> ShardedSync:
+    # One store per worker, like separate processes sharing the file
+    sharded_sync = ShardedSync(FakeKeyVaultService(synced, **service), SqliteShardStore(path))
+    sharded_sync.holder = holder
+    sharded_sync.shard_size = 2
+    sharded_sync.poll_interval = 0.01
+    return sharded_sync
+
+
+def test_shard_store_is_abstract():
+    with pytest.raises(TypeError):
+        ShardStore()
+
+
+def test_two_workers_claim_each_shard_once(tmp_path):
+    path = str(tmp_path / "shards.sqlite")
+    synced = Counter()
+    coordinator = make_sync(path, synced, "coordinator")
+    worker = make_sync(path, synced, "worker")
+
+    async def scenario():
+        workers = []
+        result = await coordinator.run(on_planned=lambda run_id: workers.append(asyncio.create_task(worker.work(run_id))))
+        return result, await workers[0]
+
+    result, worker_done = asyncio.run(scenario())
+    shards = coordinator.store.list_shards(result["run_id"])
+    assert len(shards) == result["shards"] == 5
+    assert all(shard.status == DONE and shard.attempts == 1 for shard in shards)
+    assert synced == Counter(VAULTS)
+    assert result["vaults_processed"] == len(VAULTS) and result["errors"] == []
+    assert worker_done == Counter(shard.holder for shard in shards)["worker"]
+    assert coordinator.keyvault_service.table_client.completed == 1
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    path = str(tmp_path / "shards.sqlite")
+    store = SqliteShardStore(path)
+    store.create_run("run-1", [Shard("run-1", "shard-00000", [{"name": "vault-00", "vault_uri": "", "subscription_id": "sub-1"}])])
+    # A worker that claims the shard and dies
+    abandoned = store.claim("run-1", "dead-worker", timedelta(seconds=0.05), max_attempts=3)
+    assert abandoned is not None and abandoned.status == RUNNING
+    synced = Counter()
+    survivor = make_sync(path, synced, "survivor")
+    assert asyncio.run(survivor.work("run-1")) == 1
+
+    shard = store.list_shards("run-1")[0]
+    assert (shard.status, shard.holder, shard.attempts) == (DONE, "survivor", 2)
+    assert synced == Counter(["vault-00"])
+    # The dead worker cannot renew or complete the shard it lost
+    assert not store.renew(abandoned, timedelta(seconds=60))
+    assert not store.complete(abandoned, {})
+
+
+def test_shard_fails_after_max_attempts(tmp_path):
+    path = str(tmp_path / "shards.sqlite")
+    coordinator = make_sync(path, Counter(), "coordinator", fail=True, vaults=VAULTS[:2])
+    coordinator.lease_ttl = timedelta(seconds=0.05)
+    coordinator.max_attempts = 2
+    result = asyncio.run(coordinator.run())
+    shard = coordinator.store.list_shards(result["run_id"])[0]
+    assert (shard.status, shard.attempts) == (FAILED, 2)
+    assert result["errors"] == ["Shard shard-00000 failed after 2 attempts"]
+    assert coordinator.keyvault_service.table_client.completed == 0
+
+
+def test_table_store_quotes_the_run_id():
+    class RecordingTable:
+        def query_entities(self, query_filter):
+            self.query_filter = query_filter
+            return []
+
+    table = RecordingTable()
+    assert TableShardStore(lambda: table).list_shards("run'1") == []
+    assert table.query_filter == "PartitionKey eq 'run''1'"
+
+
+class ProcessKeyVaultService:
+    """Appends "<holder> <event> <vault>" to a shared log; hangs on vaults in hang_on"""
+
+    def __init__(self, log_path: str, holder: str, hang_on=()):
+        self.log_path = log_path
+        self.holder = holder
+        self.hang_on = set(hang_on)
+
+    def _log(self, line: str) -> None:
+        with open(self.log_path, "a") as log:
+            log.write(line + "\n")
+
+    async def sync_vaults(self, vaults):
+        for vault in vaults:
+            if vault["name"] in self.hang_on:
+                self._log(f"{self.holder} started {vault['name']}")
+                await asyncio.Event().wait()
+            self._log(f"{self.holder} synced {vault['name']}")
+        stats = new_sync_stats()
+        stats["vaults_processed"] = len(vaults)
+        return stats
+
+
+def run_worker(path: str, log_path: str, holder: str, hang_on=()) -> None:
+    # Entry point of a spawned worker process, like sync_worker.serve
+    sharded_sync = ShardedSync(ProcessKeyVaultService(log_path, holder, hang_on), SqliteShardStore(path))
+    sharded_sync.holder = holder
+    sharded_sync.lease_ttl = timedelta(seconds=0.5)
+    sharded_sync.poll_interval = 0.05
+    asyncio.run(sharded_sync.work("run-1"))
+
+
+def read_log(log_path: str) -> list:
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path) as log:
+        return log.read().splitlines()
+
+
+def test_killed_worker_process_is_replaced(tmp_path):
+    path, log_path = str(tmp_path / "shards.sqlite"), str(tmp_path / "synced.log")
+    store = SqliteShardStore(path)
+    store.create_run("run-1", [
+        Shard("run-1", f"shard-{i:05d}", [{"name": name, "vault_uri": "", "subscription_id": "sub-1"}])
+        for i, name in enumerate(VAULTS[:6])
+    ])
+    context = multiprocessing.get_context("spawn")
+    victim = context.Process(target=run_worker, args=(path, log_path, "victim", {"vault-00"}))
+    victim.start()
+    try:
+        deadline = time.monotonic() + 60
+        while "victim started vault-00" not in read_log(log_path):
+            assert time.monotonic() < deadline and victim.is_alive()
+            time.sleep(0.02)
+        survivor = context.Process(target=run_worker, args=(path, log_path, "survivor"))
+        survivor.start()
+        # Killed mid-shard: no cleanup, its lease is left to lapse
+        victim.kill()
+        survivor.join(60)
+        assert survivor.exitcode == 0
+    finally:
+        victim.kill()
+
+    shards = store.list_shards("run-1")
+    assert all(shard.status == DONE and shard.holder == "survivor" for shard in shards)
+    assert (shards[0].shard_id, shards[0].attempts) == ("shard-00000", 2)
+    synced = [line.split(" synced ")[1] for line in read_log(log_path) if " synced " in line]
+    assert Counter(synced) == Counter(VAULTS[:6])
@@ -0,0 +1,118 @@
+# tests/test_snapshot_store.py
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.clients.snapshot_store import SCHEMA_VERSION, InventorySnapshot
+from src.models.records import AlertLogEntry, KeyVaultObjectRecord
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def make_record(name: str, days: int = 100, **fields) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name="vault", object_name=name, object_type="Secret", subscription_id="sub-1",
+        expiration_date=NOW + timedelta(days=days), days_remaining=days,
+        created_at=NOW - timedelta(days=30), updated_at=NOW - timedelta(days=1), **fields
+    )
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.sqlite"))
+    yield snapshot
+    snapshot.close()
+
+
+def stored(snapshot) -> dict:
+    return {r.object_name: r for r in snapshot.query(None, 1, 100)["records"]}
+
+
+def test_generation_is_bumped_with_the_last_write(snapshot):
+    assert snapshot.sync_state() == {"generation": 0, "synced_at": None}
+    snapshot.upsert_records([make_record("a"), make_record("b")], NOW)
+    snapshot.delete_records([("vault", "a_Secret")])
+    assert snapshot.sync_state()["generation"] == 0
+    snapshot.delete_records([("vault", "b_Secret")], complete_sync=True)
+    state = snapshot.sync_state()
+    assert state["generation"] == 1 and state["synced_at"] is not None
+    snapshot.delete_records([], complete_sync=True)
+    assert snapshot.sync_state()["generation"] == 2
+    assert stored(snapshot) == {}
+
+
+def test_failed_final_write_does_not_bump_the_generation(snapshot):
+    snapshot.upsert_records([make_record("a")], NOW)
+    with pytest.raises(sqlite3.Error):
+        # Malformed key: the transaction rolls back as a whole
+        snapshot.delete_records([("vault",)], complete_sync=True)
+    assert snapshot.sync_state()["generation"] == 0
+    assert set(stored(snapshot)) == {"a"}
+
+
+def test_merge_fields_keeps_other_columns(snapshot):
+    snapshot.upsert_records([make_record("a", owner="owner@contoso.com", last_alert_sent=NOW)], NOW)
+    snapshot.merge_fields([make_record("a", days=42, owner=None), make_record("missing")], ["days_remaining"])
+    records = stored(snapshot)
+    assert set(records) == {"a"}
+    assert records["a"].days_remaining == 42
+    assert records["a"].owner == "owner@contoso.com" and records["a"].last_alert_sent == NOW
+    snapshot.merge_fields([make_record("a", last_alert_sent=NOW + timedelta(hours=1))], ["last_alert_sent"])
+    assert stored(snapshot)["a"].last_alert_sent == NOW + timedelta(hours=1)
+    with pytest.raises(ValueError):
+        snapshot.merge_fields([make_record("a")], ["row_key"])
+
+
+def test_reconcile_keeps_rows_written_during_the_scan(snapshot):
+    snapshot.upsert_records([make_record("kept"), make_record("stale"), make_record("gone")], NOW - timedelta(hours=1))
+
+    def pages():
+        # The scan read these before a sync wrote "kept" through
+        page = [make_record("kept", days=100), make_record("stale", days=50), make_record("new")]
+        snapshot.upsert_records([make_record("kept", days=7)], datetime.now(timezone.utc))
+        yield page
+
+    assert snapshot.reconcile(pages()) == 3
+    records = stored(snapshot)
+    assert set(records) == {"kept", "stale", "new"}
+    assert records["kept"].days_remaining == 7
+    assert records["stale"].days_remaining == 50
+    assert snapshot.is_ready
+
+
+def test_incompatible_schema_is_discarded(tmp_path):
+    path = str(tmp_path / "snapshot.sqlite")
+    snapshot = InventorySnapshot(path)
+    snapshot.upsert_records([make_record("a")], NOW)
+    snapshot.append_changes([("added", "vault", "a_Secret")], NOW, 100)
+    snapshot.append_alert_log([AlertLogEntry.for_record(make_record("a"), "owner@contoso.com", NOW)])
+    snapshot.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version=99")
+    conn.close()
+    snapshot = InventorySnapshot(path)
+    assert stored(snapshot) == {}
+    assert snapshot.change_seq_range() == (0, 0)
+    assert snapshot.read_alert_log(NOW - timedelta(days=1)) == []
+    snapshot.close()
+
+
+def test_version_one_is_upgraded_in_place(tmp_path):
+    path = str(tmp_path / "snapshot.sqlite")
+    snapshot = InventorySnapshot(path)
+    snapshot.upsert_records([make_record("a")], NOW)
+    snapshot.close()
+    conn = sqlite3.connect(path)
+    conn.executescript("PRAGMA user_version=1; DROP TABLE changes; DROP TABLE alert_log;")
+    conn.close()
+
+    snapshot = InventorySnapshot(path)
+    assert set(stored(snapshot)) == {"a"}
+    snapshot.append_changes([("added", "vault", "a_Secret")], NOW, 100)
+    assert snapshot.change_seq_range() == (1, 1)
+    snapshot.close()
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION == 2
+    conn.close()
@@ -0,0 +1,121 @@
+# tests/test_sqlite_client.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.clients.sqlite_client import SqliteTableClient
+from src.models.records import KeyVaultObjectRecord
+from src.models.schemas import ExpirationWindow, ObjectType, QueryFilters
+from src.services.leader_election import create_elector
+from src.services.sharded_sync import create_shard_store
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def make_record(vault: str, name: str, object_type: str = "Secret", days: int = 100, **fields) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name=vault,
+        object_name=name,
+        object_type=object_type,
+        subscription_id="sub-1",
+        expiration_date=NOW + timedelta(days=days),
+        days_remaining=days,
+        owner=fields.pop("owner", "owner@contoso.com"),
+        created_at=NOW - timedelta(days=30),
+        updated_at=NOW,
+        **fields
+    )
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = SqliteTableClient(str(tmp_path / "inventory.sqlite"))
+    records = [
+        make_record("vault-a", "api-key", days=10),
+        make_record("vault-a", "api-cert", "Certificate", days=45, owner="certs@contoso.com"),
+        make_record("vault-a", "db-password", days=200),
+        make_record("vault-b", "api-token", days=25, owner="certs@contoso.com"),
+        make_record("vault-b", "storage-key", days=75),
+    ]
+    asyncio.run(client.batch_upsert(records))
+    yield client
+    client.snapshot.close()
+
+
+def query(client, page: int = 1, page_size: int = 50, **filters):
+    return asyncio.run(client.query_entities(QueryFilters(**filters), page, page_size))
+
+
+def names(result) -> list:
+    return sorted(record.object_name for record in result["records"])
+
+
+def test_batch_upsert_and_query_all(client):
+    result = query(client)
+    assert result["total_count"] == 5
+    assert names(result) == ["api-cert", "api-key", "api-token", "db-password", "storage-key"]
+    stored = next(r for r in result["records"] if r.object_name == "api-key")
+    assert stored.expiration_date == NOW + timedelta(days=10)
+    assert stored.vault_name == "vault-a" and stored.object_type == "Secret"
+
+
+def test_upsert_entity_merges_last_alert_sent(client):
+    alerted = make_record("vault-a", "api-key", days=10, last_alert_sent=NOW)
+    asyncio.run(client.upsert_entity(alerted))
+    # A sync writes the record again without last_alert_sent: it is kept
+    asyncio.run(client.upsert_entity(make_record("vault-a", "api-key", days=9)))
+    result = query(client, vault_name="vault-a", object_name="api-key")
+    assert result["total_count"] == 1
+    assert result["records"][0].days_remaining == 9
+    assert result["records"][0].last_alert_sent == NOW
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"vault_name": "vault-b"}, ["api-token", "storage-key"]),
+    ({"owner": "certs@contoso.com"}, ["api-cert", "api-token"]),
+    ({"object_type": ObjectType.CERTIFICATE}, ["api-cert"]),
+    ({"expiration_window": ExpirationWindow.DAYS_30}, ["api-key", "api-token"]),
+    ({"expiration_window": ExpirationWindow.DAYS_60, "vault_name": "vault-a"}, ["api-cert", "api-key"]),
+    ({"search_text": "key"}, ["api-key", "storage-key"]),
+    ({"object_name": "api-cert"}, ["api-cert"]),
+    ({"name_prefix": "api-"}, ["api-cert", "api-key", "api-token"]),
+    ({"name_prefix": "api-t", "vault_name": "vault-b"}, ["api-token"]),
+])
+def test_query_filters(client, filters, expected):
+    assert names(query(client, **filters)) == expected
+
+
+def test_query_paging(client):
+    pages = [query(client, page=page, page_size=2) for page in (1, 2, 3)]
+    assert [len(p["records"]) for p in pages] == [2, 2, 1]
+    assert [p["has_next"] for p in pages] == [True, True, False]
+    assert all(p["total_count"] == 5 for p in pages)
+    seen = [r.object_name for p in pages for r in p["records"]]
+    assert sorted(seen) == ["api-cert", "api-key", "api-token", "db-password", "storage-key"]
+
+
+def test_kpi_summary(client):
+    asyncio.run(client.upsert_entity(make_record("vault-b", "api-token", days=25, last_alert_sent=NOW)))
+    assert asyncio.run(client.get_kpi_summary()) == {
+        "total_secrets": 4,
+        "total_certificates": 1,
+        "expiring_30_days": 2,
+        "expiring_60_days": 3,
+        "alerts_sent_today": 1
+    }
+
+
+def test_batch_delete(client):
+    asyncio.run(client.batch_delete([make_record("vault-a", "api-key"), make_record("vault-b", "storage-key")]))
+    assert names(query(client)) == ["api-cert", "api-token", "db-password"]
+    assert asyncio.run(client.get_kpi_summary())["total_secrets"] == 2
+
+
+def test_table_only_settings_are_rejected(client, monkeypatch):
+    monkeypatch.setenv("LEADER_LEASE", "table")
+    with pytest.raises(ValueError, match="LEADER_LEASE=table"):
+        create_elector(client)
+    monkeypatch.setenv("SHARD_STORE", "table")
+    with pytest.raises(ValueError, match="SHARD_STORE=table"):
+        create_shard_store(client)
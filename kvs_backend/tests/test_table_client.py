@@ -0,0 +1,50 @@
+# tests/test_table_client.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from azure.data.tables import UpdateMode
+
+from src.clients.snapshot_store import InventorySnapshot
+from src.clients.table_client import AzureTableClient
+from src.models.records import KeyVaultObjectRecord
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def make_record(vault: str, name: str, days: int = 100) -> KeyVaultObjectRecord:
+    return KeyVaultObjectRecord(
+        vault_name=vault, object_name=name, object_type="Secret", subscription_id="sub-1",
+        expiration_date=NOW + timedelta(days=days), days_remaining=days, owner="owner@contoso.com"
+    )
+
+
+class RecordingTable:
+    def __init__(self):
+        self.transactions = []
+
+    def submit_transaction(self, actions):
+        self.transactions.append(list(actions))
+
+
+def test_batch_merge_sends_only_keys_and_fields(tmp_path):
+    snapshot = InventorySnapshot(str(tmp_path / "snapshot.sqlite"))
+    client = AzureTableClient(credential=None, snapshot=snapshot)
+    table = RecordingTable()
+    client._table_client = table
+    records = [make_record("vault-a", f"s{i}", days=5) for i in range(150)] + [make_record("vault-b", "x", days=5)]
+    snapshot.upsert_records([make_record("vault-a", "s0"), make_record("vault-b", "x")], NOW)
+
+    asyncio.run(client.batch_merge(records, ["days_remaining"]))
+
+    # One partition per transaction, at most 100 actions each
+    assert [len(actions) for actions in table.transactions] == [100, 50, 1]
+    for actions in table.transactions:
+        assert len({entity["PartitionKey"] for _, entity, _ in actions}) == 1
+        for operation, entity, options in actions:
+            assert operation == "upsert" and options == {"mode": UpdateMode.MERGE}
+            assert set(entity) == {"PartitionKey", "RowKey", "days_remaining"}
+    # Written through to the snapshot without touching the other columns
+    stored = {r.object_name: r for r in snapshot.query(None, 1, 10)["records"]}
+    assert {name: r.days_remaining for name, r in stored.items()} == {"s0": 5, "x": 5}
+    assert stored["s0"].owner == "owner@contoso.com"
+    snapshot.close()